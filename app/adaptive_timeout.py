@@ -0,0 +1,69 @@
+"""
+Adaptive Timeouts for Chaos Mesh Demo
+Derives a dependency's read timeout from its observed latency distribution
+"""
+import os
+import threading
+
+# Configuration
+TIMEOUT_PERCENTILE = float(os.getenv("TIMEOUT_PERCENTILE", "99"))
+TIMEOUT_MULTIPLIER = float(os.getenv("TIMEOUT_MULTIPLIER", "3"))
+TIMEOUT_FLOOR = float(os.getenv("TIMEOUT_FLOOR", "0.5"))
+TIMEOUT_MIN_SAMPLES = int(os.getenv("TIMEOUT_MIN_SAMPLES", "20"))
+
+
+class LatencyTracker:
+    """
+    Ring buffer of recent successful call latencies (seconds).
+
+    The timeout is percentile × multiplier, clamped to [floor, ceiling].
+    Until `min_samples` calls have been seen the ceiling is used. The
+    percentile is recomputed every `refresh_every` samples rather than on
+    each call, so reading the timeout stays O(1).
+    """
+
+    def __init__(self, percentile=TIMEOUT_PERCENTILE, multiplier=TIMEOUT_MULTIPLIER,
+                 floor=TIMEOUT_FLOOR, ceiling=30.0,
+                 min_samples=TIMEOUT_MIN_SAMPLES, size=512, refresh_every=32):
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.refresh_every = refresh_every
+        self._samples = [0.0] * size
+        self._count = 0
+        self._quantile = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples[self._count % len(self._samples)] = seconds
+            self._count += 1
+            if self._count >= self.min_samples and (
+                    self._quantile is None or self._count % self.refresh_every == 0):
+                self._quantile = self._compute()
+
+    def _compute(self):
+        filled = sorted(self._samples[:min(self._count, len(self._samples))])
+        rank = int(round(self.percentile / 100.0 * (len(filled) - 1)))
+        return filled[rank]
+
+    def quantile(self):
+        """Latest computed percentile in seconds, or None while warming up"""
+        return self._quantile
+
+    def timeout(self):
+        if self._quantile is None:
+            return self.ceiling
+        return min(self.ceiling, max(self.floor, self._quantile * self.multiplier))
+
+    def snapshot(self):
+        quantile = self._quantile
+        return {
+            "samples": self._count,
+            f"p{self.percentile:g}_ms": round(quantile * 1000, 2) if quantile is not None else None,
+            "timeout_ms": round(self.timeout() * 1000, 2),
+            "floor_ms": round(self.floor * 1000, 2),
+            "ceiling_ms": round(self.ceiling * 1000, 2)
+        }
@@ -6,47 +6,129 @@ from flask import Flask, request, jsonify
 import requests
 import time
 import os
-import logging
+import math
+import contextvars
+import concurrent.futures
+
+import bulkhead
+import compression
+import concurrency_limit
+import logs
+import metrics
+import payloads
+import responses
+import streaming
+import tracing
+import wire
+from backend_client import get_client
+from circuit_breaker import CircuitOpenError
+from hedging import HEDGE_DATA
+from response_cache import ResponseCache
+from single_flight import flight_key
 
 app = Flask(__name__)
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+logs.setup(service="frontend")
+logger = logs.get_logger(__name__)
 
 # Configuration
-BACKEND_SERVICE = os.getenv("BACKEND_SERVICE", "http://backend-service:5001")
+backend = get_client()
+data_cache = ResponseCache()
+CHAIN_MODE = os.getenv("CHAIN_MODE", "sequential")
+CHAIN_DEADLINE = float(os.getenv("CHAIN_DEADLINE", "10"))
+CHAIN_MAX_CALLS = int(os.getenv("CHAIN_MAX_CALLS", "10"))
+chain_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("CHAIN_FANOUT_WORKERS", "32")),
+    thread_name_prefix="chain-fanout"
+)
+
+# Route groups, each isolated in its own bulkhead. The bulkheads run
+# first, then the adaptive limiter gates the backend-dependent group
+ROUTE_GROUPS = {
+    "health": "health",
+    "status": "health",
+    "metrics": "health",
+    "traces": "health",
+    "home": "cheap",
+    "process_data": "cheap",
+    "get_data": "dependent",
+    "chain_call": "dependent",
+    "slow_endpoint": "slow",
+}
+metrics.init_app(app, service="frontend")
+tracing.init_app(app, service="frontend")
+logs.init_app(app, service="frontend")
+streaming.init_app(app)
+compression.init_app(app)
+responses.init_app(app)
+bulkheads = bulkhead.from_spec()
+bulkhead.init_app(app, bulkheads, ROUTE_GROUPS, default="cheap")
+limiter = concurrency_limit.AdaptiveLimiter()
+if concurrency_limit.LIMIT_ENABLED:
+    concurrency_limit.init_app(app, limiter, exempt={
+        endpoint for endpoint, group in ROUTE_GROUPS.items() if group != "dependent"})
+    dependent = bulkheads.get("dependent")
+    if dependent is not None and dependent.size < limiter.max_limit + limiter.queue_size:
+        logger.warning("Bulkhead 'dependent' has %d slots, fewer than LIMIT_MAX + "
+                       "LIMIT_QUEUE_SIZE (%d): it sheds before the adaptive limiter does",
+                       dependent.size, limiter.max_limit + limiter.queue_size)
+
+# Bodies that never change, encoded once
+HEALTH = responses.StaticJSON({"status": "healthy", "service": "frontend"})
+HOME = responses.StaticJSON({
+    "message": "Chaos Mesh Demo App",
+    "endpoints": [
+        "/health - Health check",
+        "/api/data - Get data (calls backend)",
+        "/api/process - Process data with POST",
+        "/api/slow - Intentionally slow endpoint",
+        "/api/chain - Chain call to backend"
+    ]
+})
 
 @app.route("/health")
 def health():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "frontend"})
+    return HEALTH.response()
 
 @app.route("/")
 def home():
-    return jsonify({
-        "message": "Chaos Mesh Demo App",
-        "endpoints": [
-            "/health - Health check",
-            "/api/data - Get data (calls backend)",
-            "/api/process - Process data with POST",
-            "/api/slow - Intentionally slow endpoint",
-            "/api/chain - Chain call to backend"
-        ]
-    })
+    return HOME.response()
+
+# /api/data query arguments passed on to the backend's /data
+DATA_PARAMS = ("items", "size", "seed")
+
+def _fetch_data(params=None):
+    """Fetch backend /data; error statuses raise so the cache can serve stale"""
+    deadline = time.monotonic() + backend.read_timeout
+    return backend.get_json("/data", params=params, hedge=HEDGE_DATA, deadline=deadline,
+                            raw=wire.WIRE_PASSTHROUGH)
 
 @app.route("/api/data")
 def get_data():
     """Endpoint that calls backend service - good for testing network delays"""
     start_time = time.time()
+    bypass = "no-cache" in request.headers.get("Cache-Control", "")
+    try:
+        payloads.params(request.args)
+    except payloads.ParamError as e:
+        return jsonify({"error": str(e)}), 400
+    params = {name: request.args[name] for name in DATA_PARAMS if name in request.args}
     try:
-        response = requests.get(f"{BACKEND_SERVICE}/data", timeout=30)
+        payload, cache_meta = data_cache.get(flight_key("/data", params),
+                                             lambda: _fetch_data(params), bypass=bypass)
         elapsed = time.time() - start_time
-        return jsonify({
+        return wire.json_response({
             "source": "frontend",
-            "backend_response": response.json(),
+            "backend_response": payload,
+            "cache": cache_meta,
             "latency_ms": round(elapsed * 1000, 2)
         })
+    except CircuitOpenError as e:
+        retry_after = max(1, int(e.retry_after + 0.5))
+        return jsonify({"error": str(e), "circuit": "open"}), 503, {"Retry-After": str(retry_after)}
     except requests.exceptions.Timeout:
-        return jsonify({"error": "Backend timeout", "latency_ms": 30000}), 504
+        elapsed = time.time() - start_time
+        return jsonify({"error": "Backend timeout", "latency_ms": round(elapsed * 1000, 2)}), 504
     except requests.exceptions.RequestException as e:
         return jsonify({"error": str(e)}), 503
 
@@ -55,10 +137,16 @@ def process_data():
     """
     POST endpoint - good for testing HTTP body modification
     Chaos Mesh can modify the request/response body
+
+    An application/x-ndjson body is processed one record at a time and
+    answered with one NDJSON line per record plus a summary line.
     """
+    if streaming.is_ndjson(request.mimetype):
+        return streaming.stream_records(_process_record, tail=_process_summary)
+
     data = request.get_json() or {}
-    logger.info(f"Received data: {data}")
-    
+    logger.info("Received %d fields: %s", len(data), logs.clip(data))
+
     # Process the data
     result = {
         "received": data,
@@ -68,6 +156,22 @@ def process_data():
     }
     return jsonify(result)
 
+def _process_record(record, size):
+    return {
+        "received": record,
+        "processed": True,
+        "message": f"Processed {len(record) if isinstance(record, dict) else 1} fields"
+    }
+
+def _process_summary(reader):
+    logger.info("Streamed %d records (%d bytes)", reader.records, reader.bytes)
+    return {
+        "processed": True,
+        "records": reader.records,
+        "bytes": reader.bytes,
+        "timestamp": time.time()
+    }
+
 @app.route("/api/slow")
 def slow_endpoint():
     """Endpoint with configurable delay - compare with chaos-injected delays"""
@@ -78,31 +182,89 @@ def slow_endpoint():
         "intentional_delay_ms": delay * 1000
     })
 
+@app.route("/api/status")
+def status():
+    """Resilience-layer counters for this worker"""
+    return jsonify({
+        "cache": data_cache.snapshot(),
+        "single_flight": backend.flight.snapshot(),
+        "dns": backend.dns.snapshot(),
+        "compression": compression.COMPRESSOR.snapshot(),
+        "logging": logs.snapshot(),
+        "breaker": backend.breaker.snapshot(),
+        "timeout": backend.latency.snapshot(),
+        "hedging": backend.hedging.snapshot(),
+        "retries": backend.retries.snapshot(),
+        "limiter": limiter.snapshot(),
+        "bulkheads": {name: b.snapshot() for name, b in bulkheads.items()}
+    })
+
+def _chain_step(call, deadline):
+    """One backend call of /api/chain, reported in chain_results form"""
+    start = time.time()
+    try:
+        payload = backend.get_json("/data", deadline=deadline, coalesce=False,
+                                   raw=wire.WIRE_PASSTHROUGH)
+        elapsed = time.time() - start
+        return {
+            "call": call,
+            "status": "success",
+            "latency_ms": round(elapsed * 1000, 2),
+            "data": payload
+        }
+    except Exception as e:
+        return {
+            "call": call,
+            "status": "failed",
+            "error": str(e)
+        }
+
 @app.route("/api/chain")
 def chain_call():
     """
     Makes multiple calls to backend - good for testing partial failures
+
+    ?mode=fanout sends the calls concurrently under one shared ?deadline
+    (seconds); calls still running when it expires are reported as timed out.
     """
+    mode = request.args.get("mode", CHAIN_MODE)
+    if mode != "fanout":
+        results = [_chain_step(i + 1, None) for i in range(3)]
+        return wire.json_response({"chain_results": results})
+
+    try:
+        calls = max(1, min(int(request.args.get("calls", 3)), CHAIN_MAX_CALLS))
+        deadline = float(request.args.get("deadline", CHAIN_DEADLINE))
+    except ValueError as e:
+        return jsonify({"error": f"calls must be an integer and deadline a number: {e}"}), 400
+    if not (deadline > 0 and math.isfinite(deadline)):
+        return jsonify({"error": "deadline must be a positive number of seconds"}), 400
+    start = time.time()
+    expires = time.monotonic() + deadline
+    futures = [chain_pool.submit(contextvars.copy_context().run, _chain_step, i + 1, expires)
+               for i in range(calls)]
+    done, _ = concurrent.futures.wait(futures, timeout=deadline)
+
     results = []
-    for i in range(3):
-        try:
-            start = time.time()
-            resp = requests.get(f"{BACKEND_SERVICE}/data", timeout=10)
-            elapsed = time.time() - start
-            results.append({
-                "call": i + 1,
-                "status": "success",
-                "latency_ms": round(elapsed * 1000, 2),
-                "data": resp.json()
-            })
-        except Exception as e:
+    for i, future in enumerate(futures):
+        if future in done:
+            results.append(future.result())
+        else:
+            future.cancel()
             results.append({
                 "call": i + 1,
-                "status": "failed",
-                "error": str(e)
+                "status": "timeout",
+                "error": f"Chain deadline of {deadline}s exceeded"
             })
-    
-    return jsonify({"chain_results": results})
+
+    return wire.json_response({
+        "chain_results": results,
+        "mode": "fanout",
+        "deadline_ms": round(deadline * 1000, 2),
+        "partial": len(done) < calls,
+        "latency_ms": round((time.time() - start) * 1000, 2)
+    })
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Development server; use `python serve.py frontend` for real traffic
+    app.run(host="0.0.0.0", port=5000, debug=os.getenv("FLASK_DEBUG") == "1")
@@ -0,0 +1,261 @@
+"""
+Chaos Mesh Demo Application (asyncio)
+aiohttp version of app.py - same routes and JSON shapes, but slow and
+chaos-delayed requests wait on the event loop instead of holding a thread
+"""
+from aiohttp import web
+import aiohttp
+import asyncio
+import time
+import os
+import math
+
+import compression
+import logs
+import metrics
+import payloads
+import responses
+import streaming
+import tracing
+import wire
+from async_backend_client import AsyncBackendClient
+from circuit_breaker import CircuitOpenError
+from hedging import HEDGE_DATA
+from response_cache import ResponseCache
+from single_flight import flight_key
+
+logs.setup(service="frontend")
+logger = logs.get_logger(__name__)
+
+# Configuration
+CHAIN_MODE = os.getenv("CHAIN_MODE", "sequential")
+CHAIN_DEADLINE = float(os.getenv("CHAIN_DEADLINE", "10"))
+CHAIN_MAX_CALLS = int(os.getenv("CHAIN_MAX_CALLS", "10"))
+
+routes = web.RouteTableDef()
+
+# /api/data query arguments passed on to the backend's /data
+DATA_PARAMS = ("items", "size", "seed")
+
+# Bodies that never change, encoded once
+HEALTH = responses.StaticJSON({"status": "healthy", "service": "frontend"})
+HOME = responses.StaticJSON({
+    "message": "Chaos Mesh Demo App",
+    "endpoints": [
+        "/health - Health check",
+        "/api/data - Get data (calls backend)",
+        "/api/process - Process data with POST",
+        "/api/slow - Intentionally slow endpoint",
+        "/api/chain - Chain call to backend"
+    ]
+})
+
+
+@routes.get("/health")
+async def health(request):
+    """Health check endpoint"""
+    return HEALTH.aiohttp_response(request)
+
+
+@routes.get("/")
+async def home(request):
+    return HOME.aiohttp_response(request)
+
+
+@routes.get("/api/data")
+async def get_data(request):
+    """Endpoint that calls backend service - good for testing network delays"""
+    backend = request.app["backend"]
+    start_time = time.time()
+    bypass = "no-cache" in request.headers.get("Cache-Control", "")
+    try:
+        payloads.params(request.query)
+    except payloads.ParamError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    params = {name: request.query[name] for name in DATA_PARAMS if name in request.query}
+
+    async def fetch():
+        # Error statuses raise so the cache can serve stale
+        deadline = time.monotonic() + backend.read_timeout
+        return await backend.get_json("/data", params=params, hedge=HEDGE_DATA,
+                                      deadline=deadline, raw=wire.WIRE_PASSTHROUGH)
+
+    try:
+        payload, cache_meta = await request.app["data_cache"].get_async(
+            flight_key("/data", params), fetch, bypass=bypass)
+        elapsed = time.time() - start_time
+        return wire.aiohttp_json_response({
+            "source": "frontend",
+            "backend_response": payload,
+            "cache": cache_meta,
+            "latency_ms": round(elapsed * 1000, 2)
+        })
+    except CircuitOpenError as e:
+        retry_after = max(1, int(e.retry_after + 0.5))
+        return web.json_response({"error": str(e), "circuit": "open"}, status=503,
+                                 headers={"Retry-After": str(retry_after)})
+    except asyncio.TimeoutError:
+        elapsed = time.time() - start_time
+        return web.json_response(
+            {"error": "Backend timeout", "latency_ms": round(elapsed * 1000, 2)},
+            status=504)
+    except (aiohttp.ClientError, ValueError) as e:
+        return web.json_response({"error": str(e)}, status=503)
+
+
+@routes.post("/api/process")
+async def process_data(request):
+    """POST endpoint - good for testing HTTP body modification"""
+    if streaming.is_ndjson(request.content_type):
+        return await streaming.aiohttp_stream_records(request, _process_record,
+                                                      tail=_process_summary)
+    data = (await request.json() if request.can_read_body else None) or {}
+    logger.info("Received %d fields: %s", len(data), logs.clip(data))
+
+    result = {
+        "received": data,
+        "processed": True,
+        "timestamp": time.time(),
+        "message": f"Processed {len(data)} fields"
+    }
+    return web.json_response(result)
+
+
+def _process_record(record, size):
+    return {
+        "received": record,
+        "processed": True,
+        "message": f"Processed {len(record) if isinstance(record, dict) else 1} fields"
+    }
+
+
+def _process_summary(reader):
+    logger.info("Streamed %d records (%d bytes)", reader.records, reader.bytes)
+    return {
+        "processed": True,
+        "records": reader.records,
+        "bytes": reader.bytes,
+        "timestamp": time.time()
+    }
+
+
+@routes.get("/api/slow")
+async def slow_endpoint(request):
+    """Endpoint with configurable delay - compare with chaos-injected delays"""
+    delay = float(request.query.get("delay", 0.1))
+    await asyncio.sleep(delay)
+    return web.json_response({
+        "message": "Slow response",
+        "intentional_delay_ms": delay * 1000
+    })
+
+
+@routes.get("/api/status")
+async def status(request):
+    """Resilience-layer counters for this worker"""
+    backend = request.app["backend"]
+    return web.json_response({
+        "cache": request.app["data_cache"].snapshot(),
+        "single_flight": backend.flight.snapshot(),
+        "dns": backend.dns.snapshot(),
+        "compression": compression.COMPRESSOR.snapshot(),
+        "logging": logs.snapshot(),
+        "breaker": backend.breaker.snapshot(),
+        "timeout": backend.latency.snapshot(),
+        "hedging": backend.hedging.snapshot(),
+        "retries": backend.retries.snapshot()
+    })
+
+
+async def _chain_step(backend, call, deadline):
+    """One backend call of /api/chain, reported in chain_results form"""
+    start = time.time()
+    try:
+        payload = await backend.get_json("/data", deadline=deadline, coalesce=False,
+                                         raw=wire.WIRE_PASSTHROUGH)
+        elapsed = time.time() - start
+        return {
+            "call": call,
+            "status": "success",
+            "latency_ms": round(elapsed * 1000, 2),
+            "data": payload
+        }
+    except Exception as e:
+        return {
+            "call": call,
+            "status": "failed",
+            "error": str(e)
+        }
+
+
+@routes.get("/api/chain")
+async def chain_call(request):
+    """
+    Makes multiple calls to backend - good for testing partial failures
+
+    ?mode=fanout runs the calls concurrently under one shared ?deadline.
+    """
+    backend = request.app["backend"]
+    mode = request.query.get("mode", CHAIN_MODE)
+    if mode != "fanout":
+        results = [await _chain_step(backend, i + 1, None) for i in range(3)]
+        return wire.aiohttp_json_response({"chain_results": results})
+
+    try:
+        calls = max(1, min(int(request.query.get("calls", 3)), CHAIN_MAX_CALLS))
+        deadline = float(request.query.get("deadline", CHAIN_DEADLINE))
+    except ValueError as e:
+        return web.json_response(
+            {"error": f"calls must be an integer and deadline a number: {e}"}, status=400)
+    if not (deadline > 0 and math.isfinite(deadline)):
+        return web.json_response({"error": "deadline must be a positive number of seconds"},
+                                 status=400)
+    start = time.time()
+    expires = time.monotonic() + deadline
+    tasks = [asyncio.ensure_future(_chain_step(backend, i + 1, expires)) for i in range(calls)]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+
+    results = []
+    for i, task in enumerate(tasks):
+        if task in done:
+            results.append(task.result())
+        else:
+            results.append({
+                "call": i + 1,
+                "status": "timeout",
+                "error": f"Chain deadline of {deadline}s exceeded"
+            })
+
+    return wire.aiohttp_json_response({
+        "chain_results": results,
+        "mode": "fanout",
+        "deadline_ms": round(deadline * 1000, 2),
+        "partial": bool(pending),
+        "latency_ms": round((time.time() - start) * 1000, 2)
+    })
+
+
+async def _close_backend(app):
+    await app["backend"].close()
+
+
+def create_app(backend=None):
+    app = web.Application(client_max_size=streaming.MAX_JSON_BODY)
+    app["backend"] = backend or AsyncBackendClient()
+    app["data_cache"] = ResponseCache()
+    app.add_routes(routes)
+    app.on_cleanup.append(_close_backend)
+    metrics.aiohttp_setup(app, service="frontend")
+    logs.aiohttp_setup(app, service="frontend")
+    tracing.aiohttp_setup(app, service="frontend")
+    compression.aiohttp_setup(app)
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    # logs.aiohttp_setup writes the (sampled) access line
+    web.run_app(app, host="0.0.0.0", port=5000, access_log=None)
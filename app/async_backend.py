@@ -0,0 +1,159 @@
+"""
+Backend Service for Chaos Mesh Demo (asyncio)
+aiohttp version of backend.py with the same routes and JSON shapes
+"""
+from aiohttp import web
+import time
+import random
+import asyncio
+
+import compression
+import deadline
+import logs
+import metrics
+import payloads
+import responses
+import streaming
+import tracing
+import wire
+
+logs.setup(service="backend")
+
+routes = web.RouteTableDef()
+
+HEALTH = responses.StaticJSON({"status": "healthy", "service": "backend"})
+
+
+@web.middleware
+async def deadline_middleware(request, handler):
+    """Drop requests whose caller's deadline has already passed"""
+    request["deadline"] = deadline.parse(request.headers.get(deadline.DEADLINE_HEADER))
+    if request["deadline"] is not None:
+        deadline.stats.count("with_deadline")
+        if deadline.expired(request["deadline"]):
+            return web.json_response(deadline.reject("on_arrival"), status=504)
+    try:
+        return await handler(request)
+    except deadline.DeadlineExpired as e:
+        return web.json_response(deadline.reject(e.stage), status=504)
+
+
+def check_deadline(request, stage="before_work"):
+    if deadline.expired(request.get("deadline")):
+        raise deadline.DeadlineExpired(stage)
+
+
+@routes.get("/health")
+async def health(request):
+    return HEALTH.aiohttp_response(request)
+
+
+@routes.get("/status")
+async def status(request):
+    """Deadline-propagation, compression and payload-cache counters for this worker"""
+    return web.json_response({
+        "deadline": deadline.stats.snapshot(),
+        "compression": compression.COMPRESSOR.snapshot(),
+        "logging": logs.snapshot(),
+        "payloads": payloads.CACHE.snapshot()
+    })
+
+
+@routes.get("/data")
+async def get_data(request):
+    """
+    Returns sample data - target for network delay experiments (JSON or
+    MessagePack); same ?items=, ?size= and ?seed= as backend.py
+    """
+    check_deadline(request)
+    try:
+        shape = payloads.params(request.query)
+    except payloads.ParamError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    if shape is not None:
+        fmt = wire.negotiate(request.headers.get("Accept"))
+        data = payloads.CACHE.cached(*shape, fmt)
+        if data is None:
+            # Large payloads take a while to generate; keep the loop serving
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, payloads.CACHE.get, *shape, fmt)
+            check_deadline(request, "after_work")
+        return wire.aiohttp_respond(request, {
+            "service": "backend",
+            "timestamp": time.time(),
+            "data": data
+        }, fmt=fmt)
+    return wire.aiohttp_respond(request, {
+        "service": "backend",
+        "timestamp": time.time(),
+        "data": {
+            "items": [
+                {"id": 1, "name": "Item A", "value": random.randint(1, 100)},
+                {"id": 2, "name": "Item B", "value": random.randint(1, 100)},
+                {"id": 3, "name": "Item C", "value": random.randint(1, 100)}
+            ],
+            "total": 3
+        }
+    })
+
+
+@routes.post("/process")
+async def process(request):
+    """Process incoming data; NDJSON bodies are read one record at a time"""
+    check_deadline(request)
+    if streaming.is_ndjson(request.content_type):
+        try:
+            reader = await streaming.aiohttp_consume_records(request, lambda record, size: None)
+        except streaming.BodyError as e:
+            return web.json_response({"error": str(e)}, status=e.status)
+        return web.json_response({
+            "service": "backend",
+            "processed": True,
+            "records": reader.records,
+            "input_size": reader.bytes,
+            "result": "OK"
+        })
+    data = (await request.json() if request.can_read_body else None) or {}
+    return web.json_response({
+        "service": "backend",
+        "processed": True,
+        "input_size": len(str(data)),
+        "result": "OK"
+    })
+
+
+@routes.post("/echo")
+async def echo(request):
+    """Echo back the request - useful for seeing body modifications"""
+    check_deadline(request)
+    if streaming.is_ndjson(request.content_type):
+        # Request line first, then every record as it arrives
+        return await streaming.aiohttp_stream_records(request, lambda record, size: record, head={
+            "method": request.method,
+            "headers": dict(request.headers),
+            "args": dict(request.query)
+        })
+    return web.json_response({
+        "method": request.method,
+        "headers": dict(request.headers),
+        "body": await request.json() if request.can_read_body else None,
+        "args": dict(request.query)
+    })
+
+
+def create_app():
+    app = web.Application(middlewares=[deadline_middleware],
+                          client_max_size=streaming.MAX_JSON_BODY)
+    app.add_routes(routes)
+    metrics.aiohttp_setup(app, service="backend")
+    logs.aiohttp_setup(app, service="backend")
+    tracing.aiohttp_setup(app, service="backend")
+    compression.aiohttp_setup(app)
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    # logs.aiohttp_setup writes the (sampled) access line
+    web.run_app(app, host="0.0.0.0", port=5001, access_log=None)
@@ -0,0 +1,154 @@
+"""
+Async Backend Client for Chaos Mesh Demo
+aiohttp counterpart of backend_client.BackendClient for the asyncio services
+"""
+import time
+import asyncio
+import aiohttp
+
+import dns_cache
+import tracing
+import wire
+from adaptive_timeout import LatencyTracker
+from circuit_breaker import CircuitBreaker
+from deadline import DEADLINE_HEADER, header_value
+from hedging import HedgePolicy
+from metrics import REGISTRY as metrics
+from retry import RetryPolicy
+from backend_client import (
+    BACKEND_SERVICE,
+    BACKEND_POOL_SIZE,
+    BACKEND_CONNECT_TIMEOUT,
+    BACKEND_READ_TIMEOUT,
+)
+from single_flight import AsyncSingleFlight, flight_key
+from tracing import TRACER as tracer, TRACE_HEADER
+
+
+def _retryable(error):
+    """Transport errors, timeouts and 5xx are worth another attempt"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+
+class AsyncBackendClient:
+    """
+    Keep-alive client for the backend service, one per event loop.
+
+    The aiohttp session is bound to the loop it was created on, so it is
+    opened lazily on first use and closed from the application's cleanup hook.
+    """
+
+    def __init__(self, base_url=BACKEND_SERVICE, pool_size=BACKEND_POOL_SIZE,
+                 connect_timeout=BACKEND_CONNECT_TIMEOUT,
+                 read_timeout=BACKEND_READ_TIMEOUT, dns=None):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session = None
+        self.dns = dns_cache.DNSCache() if dns is None else dns
+        self.flight = AsyncSingleFlight()
+        self.breaker = CircuitBreaker("backend")
+        self.latency = LatencyTracker(ceiling=read_timeout)
+        self.hedging = HedgePolicy(ceiling=read_timeout)
+        self.retries = RetryPolicy(_retryable)
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            # aiohttp's own DNS cache has neither stale-on-error nor answer checks
+            connector = aiohttp.TCPConnector(limit=self.pool_size, use_dns_cache=False,
+                                             resolver=dns_cache.aiohttp_resolver(self.dns))
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[tracing.aiohttp_trace_config()])
+        return self._session
+
+    def timeout(self, read_timeout=None):
+        adaptive = self.latency.timeout()
+        if read_timeout is not None:
+            adaptive = min(adaptive, read_timeout)
+        return aiohttp.ClientTimeout(total=adaptive,
+                                     sock_connect=min(self.connect_timeout, adaptive))
+
+    async def _fetch_json(self, path, read_timeout, params, raw):
+        self.breaker.before_call()
+        timeout = self.timeout(read_timeout)
+        span = tracer.start_span(f"GET {path}", "client")
+        headers = {DEADLINE_HEADER: header_value(timeout.total),
+                   TRACE_HEADER: span.header_value(),
+                   "Accept": wire.JSON if raw else wire.accept_header()}
+        marks = {}
+        start = time.monotonic()
+        try:
+            async with self.session.get(f"{self.base_url}{path}", timeout=timeout,
+                                        params=params, headers=headers,
+                                        trace_request_ctx=marks) as resp:
+                body = await resp.read()
+        except asyncio.TimeoutError:
+            elapsed = time.monotonic() - start
+            metrics.observe_upstream("backend", path, "timeout", elapsed)
+            span.finish("timeout")
+            self.latency.record(elapsed)
+            self.breaker.record_failure()
+            raise
+        except aiohttp.ClientError:
+            metrics.observe_upstream("backend", path, "error", time.monotonic() - start)
+            span.finish("error")
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled: a losing hedge, the fan-out deadline or a client
+            # that went away. No outcome, but a half-open probe is given back
+            span.finish("cancelled")
+            self.breaker.release_probe()
+            raise
+        span.phases = tracing.aiohttp_phases(marks, time.perf_counter())
+        span.attrs = {"connection": "new" if "connect" in span.phases else "reused"}
+        span.finish(resp.status)
+        elapsed = time.monotonic() - start
+        metrics.observe_upstream("backend", path, resp.status, elapsed)
+        if resp.status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            self.latency.record(elapsed)
+            self.hedging.latency.record(elapsed)
+        resp.raise_for_status()
+        return wire.decode(body, resp.headers.get("Content-Type"), raw)
+
+    async def get_json(self, path, read_timeout=None, params=None, coalesce=True,
+                       hedge=False, retry=True, deadline=None, raw=False):
+        """
+        GET a backend path and decode its JSON (or MessagePack) body; error
+        statuses raise. Same layering and `raw` passthrough as
+        BackendClient.get_json: coalescing, then retries bounded by the
+        monotonic `deadline`, then optional hedging.
+        """
+        url = f"{self.base_url}{path}"
+
+        def fetch(remaining):
+            timeout = read_timeout
+            if remaining is not None:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"Deadline exceeded before GET {path}")
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            return self._fetch_json(path, timeout, params, raw)
+
+        attempt = fetch
+        if hedge:
+            attempt = lambda remaining: self.hedging.call_async(lambda: fetch(remaining))
+        if retry:
+            call = lambda: self.retries.call_async(attempt, deadline)
+        else:
+            call = lambda: attempt(RetryPolicy.remaining(deadline))
+        if not coalesce:
+            return await call()
+        key = flight_key(url, params)
+        return await self.flight.do(f"raw:{key}" if raw else key, call)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
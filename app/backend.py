@@ -7,16 +7,64 @@ import time
 import random
 import os
 
+import compression
+import deadline
+import logs
+import metrics
+import payloads
+import responses
+import streaming
+import tracing
+import wire
+
 app = Flask(__name__)
+logs.setup(service="backend")
+metrics.init_app(app, service="backend")
+tracing.init_app(app, service="backend")
+logs.init_app(app, service="backend")
+streaming.init_app(app)
+compression.init_app(app)
+responses.init_app(app)
+deadline.init_app(app)
+
+HEALTH = responses.StaticJSON({"status": "healthy", "service": "backend"})
 
 @app.route("/health")
 def health():
-    return jsonify({"status": "healthy", "service": "backend"})
+    return HEALTH.response()
+
+@app.route("/status")
+def status():
+    """Deadline-propagation, compression and payload-cache counters for this worker"""
+    return jsonify({
+        "deadline": deadline.stats.snapshot(),
+        "compression": compression.COMPRESSOR.snapshot(),
+        "logging": logs.snapshot(),
+        "payloads": payloads.CACHE.snapshot()
+    })
 
 @app.route("/data")
 def get_data():
-    """Returns sample data - target for network delay experiments"""
-    return jsonify({
+    """
+    Returns sample data - target for network delay experiments (JSON or
+    MessagePack). ?items=, ?size= (bytes) and ?seed= ask for a synthetic
+    payload of that shape instead; those are memoized once encoded.
+    """
+    deadline.check()
+    try:
+        shape = payloads.params(request.args)
+    except payloads.ParamError as e:
+        return jsonify({"error": str(e)}), 400
+    if shape is not None:
+        fmt = wire.negotiate(request.headers.get("Accept"))
+        data = payloads.CACHE.get(*shape, fmt)
+        deadline.check("after_work")
+        return wire.respond({
+            "service": "backend",
+            "timestamp": time.time(),
+            "data": data
+        }, fmt=fmt)
+    return wire.respond({
         "service": "backend",
         "timestamp": time.time(),
         "data": {
@@ -31,7 +79,17 @@ def get_data():
 
 @app.route("/process", methods=["POST"])
 def process():
-    """Process incoming data"""
+    """Process incoming data; NDJSON bodies are read one record at a time"""
+    deadline.check()
+    if streaming.is_ndjson(request.mimetype):
+        reader = streaming.consume_records(lambda record, size: None)
+        return jsonify({
+            "service": "backend",
+            "processed": True,
+            "records": reader.records,
+            "input_size": reader.bytes,
+            "result": "OK"
+        })
     data = request.get_json() or {}
     return jsonify({
         "service": "backend",
@@ -43,6 +101,14 @@ def process():
 @app.route("/echo", methods=["POST"])
 def echo():
     """Echo back the request - useful for seeing body modifications"""
+    deadline.check()
+    if streaming.is_ndjson(request.mimetype):
+        # Request line first, then every record as it arrives
+        return streaming.stream_records(lambda record, size: record, head={
+            "method": request.method,
+            "headers": dict(request.headers),
+            "args": dict(request.args)
+        })
     return jsonify({
         "method": request.method,
         "headers": dict(request.headers),
@@ -51,4 +117,5 @@ def echo():
     })
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001, debug=True)
+    # Development server; use `python serve.py backend` for real traffic
+    app.run(host="0.0.0.0", port=5001, debug=os.getenv("FLASK_DEBUG") == "1")
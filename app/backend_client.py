@@ -0,0 +1,230 @@
+"""
+Backend Client for Chaos Mesh Demo
+Shared, pooled HTTP client the frontend uses to reach the backend service
+"""
+import os
+import time
+import threading
+import concurrent.futures
+import requests
+from urllib3.util.request import ACCEPT_ENCODING
+
+import transport
+import wire
+from adaptive_timeout import LatencyTracker
+from circuit_breaker import CircuitBreaker
+from dns_cache import DNSCache
+from deadline import DEADLINE_HEADER, header_value
+from hedging import HedgePolicy
+from metrics import REGISTRY as metrics
+from retry import RetryPolicy
+from single_flight import SingleFlight, flight_key
+from tracing import TRACER as tracer, TRACE_HEADER
+
+# Configuration
+BACKEND_SERVICE = os.getenv("BACKEND_SERVICE", "http://backend-service:5001")
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "20"))
+BACKEND_CONNECT_TIMEOUT = float(os.getenv("BACKEND_CONNECT_TIMEOUT", "3.05"))
+BACKEND_READ_TIMEOUT = float(os.getenv("BACKEND_READ_TIMEOUT", "30"))
+
+
+def _retryable(error):
+    """Transport errors, timeouts and 5xx are worth another attempt"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class BackendClient:
+    """
+    Keep-alive client for the backend service.
+
+    Each worker process gets its own connection pool: the session is created
+    lazily and rebuilt when the client notices it is running in a forked
+    child, so gunicorn workers never share sockets with the master.
+    """
+
+    def __init__(self, base_url=BACKEND_SERVICE, pool_size=BACKEND_POOL_SIZE,
+                 connect_timeout=BACKEND_CONNECT_TIMEOUT,
+                 read_timeout=BACKEND_READ_TIMEOUT, dns=None):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+        self.dns = DNSCache(transport.resolve) if dns is None else dns
+        self.flight = SingleFlight()
+        self.breaker = CircuitBreaker("backend")
+        self.latency = LatencyTracker(ceiling=read_timeout)
+        self.hedging = HedgePolicy(ceiling=read_timeout)
+        self.retries = RetryPolicy(_retryable)
+        self._hedge_pool = None
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = transport.TimedHTTPAdapter(self.dns.resolve, pool_connections=1,
+                                             pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        # Every coding urllib3 can decode here (gzip, plus br / zstd when
+        # their packages are installed); the backend picks the cheapest
+        session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        session.headers["Accept"] = wire.accept_header()
+        return session
+
+    @property
+    def session(self):
+        """Session owned by the current process"""
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._new_session()
+                    self._pid = pid
+        return self._session
+
+    def timeout(self, read_timeout=None):
+        """
+        (connect, read) timeout tuple for a single call. The read timeout
+        follows the observed latency distribution; `read_timeout` only
+        lowers it, e.g. to fit a caller's remaining deadline.
+        """
+        adaptive = self.latency.timeout()
+        if read_timeout is not None:
+            adaptive = min(adaptive, read_timeout)
+        return (min(self.connect_timeout, adaptive), adaptive)
+
+    def get(self, path, read_timeout=None, **kwargs):
+        """
+        GET a backend path over the pooled session, guarded by the circuit
+        breaker: raises CircuitOpenError without touching the network while
+        the breaker is open. Transport errors and 5xx count as failures.
+        The read timeout is sent along as the backend's deadline, and the
+        call is recorded as a client span with its phases timed.
+        """
+        self.breaker.before_call()
+        timeout = self.timeout(read_timeout)
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers[DEADLINE_HEADER] = header_value(timeout[1])
+        span = tracer.start_span(f"GET {path}", "client")
+        headers[TRACE_HEADER] = span.header_value()
+        phases = span.phases = transport.capture()
+        start = time.monotonic()
+        try:
+            # Streamed so that the wait for the first byte and the body
+            # transfer can be timed apart; reading .content releases the
+            # connection back to the pool
+            response = self.session.get(f"{self.base_url}{path}", timeout=timeout,
+                                        headers=headers, stream=True, **kwargs)
+            first_byte = time.monotonic()
+            response.content
+        except requests.exceptions.Timeout:
+            # A timed-out call is a lower bound on latency; recording it lets
+            # the timeout grow when the backend slows down
+            elapsed = time.monotonic() - start
+            metrics.observe_upstream("backend", path, "timeout", elapsed)
+            span.finish("timeout")
+            self.latency.record(elapsed)
+            self.breaker.record_failure()
+            raise
+        except requests.exceptions.RequestException:
+            metrics.observe_upstream("backend", path, "error", time.monotonic() - start)
+            span.finish("error")
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Anything else ends the call without an outcome; a half-open
+            # probe is given back so the breaker can probe again
+            span.finish("cancelled")
+            self.breaker.release_probe()
+            raise
+        done = time.monotonic()
+        elapsed = done - start
+        phases["ttfb"] = first_byte - start - phases.get("dns", 0.0) - phases.get("connect", 0.0)
+        phases["transfer"] = done - first_byte
+        span.attrs = {"connection": "new" if "connect" in phases else "reused"}
+        span.finish(response.status_code)
+        metrics.observe_upstream("backend", path, response.status_code, elapsed)
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            self.latency.record(elapsed)
+            self.hedging.latency.record(elapsed)
+        return response
+
+    @property
+    def hedge_pool(self):
+        if self._hedge_pool is None:
+            with self._lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.pool_size * 2, thread_name_prefix="backend-hedge")
+        return self._hedge_pool
+
+    def get_json(self, path, read_timeout=None, params=None, hedge=False,
+                 retry=True, deadline=None, coalesce=True, raw=False):
+        """
+        GET a backend path and decode its JSON (or MessagePack) body; error
+        statuses raise. With `raw`, JSON is requested and returned undecoded
+        as wire.RawJSON, for callers that only wrap it in their own answer.
+
+        Unless `coalesce` is off, concurrent calls for the same URL and
+        parameters share one upstream request. With `hedge`, a slow attempt
+        is raced against a second one (idempotent requests only). With
+        `retry`, retryable failures are retried under the shared retry
+        budget. `deadline` is a time.monotonic() value that bounds every
+        attempt's timeout and the backoff between attempts.
+        """
+        def fetch(remaining):
+            timeout = read_timeout
+            if remaining is not None:
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(f"Deadline exceeded before GET {path}")
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            headers = {"Accept": wire.JSON} if raw else None
+            response = self.get(path, read_timeout=timeout, params=params, headers=headers)
+            response.raise_for_status()
+            try:
+                return wire.decode(response.content, response.headers.get("Content-Type"), raw)
+            except ValueError as e:
+                raise requests.exceptions.InvalidJSONError(str(e), response=response) from e
+
+        attempt = fetch
+        if hedge:
+            attempt = lambda remaining: self.hedging.call(lambda: fetch(remaining), self.hedge_pool)
+        if retry:
+            call = lambda: self.retries.call(attempt, deadline)
+        else:
+            call = lambda: attempt(RetryPolicy.remaining(deadline))
+        if not coalesce:
+            return call()
+        key = flight_key(f"{self.base_url}{path}", params)
+        return self.flight.do(f"raw:{key}" if raw else key, call)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            if self._hedge_pool is not None:
+                self._hedge_pool.shutdown(wait=False)
+            self._session = None
+            self._pid = None
+            self._hedge_pool = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide backend client shared by all frontend routes"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BackendClient()
+    return _client
@@ -0,0 +1,103 @@
+"""
+Bulkheads for Chaos Mesh Demo
+Isolated concurrency slots per route group, so slow or chaos-delayed
+routes cannot take every server thread away from health checks.
+The bulkheads run first; the adaptive limiter (concurrency_limit.py) only
+sees backend-dependent requests the `dependent` bulkhead admitted. That
+bulkhead therefore holds LIMIT_MAX + LIMIT_QUEUE_SIZE slots and no queue,
+so the limiter does the shedding and the bulkhead is only a backstop.
+"""
+import os
+import threading
+
+from flask import g, request, jsonify
+
+# Configuration: group=slots/queue, comma separated
+BULKHEADS = os.getenv("BULKHEADS", "health=4/16,cheap=8/8,dependent=32/0,slow=4/4")
+BULKHEAD_QUEUE_TIMEOUT = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT", "0.25"))
+
+
+class Bulkhead:
+    """Fixed number of concurrent slots with a bounded, timed wait queue"""
+
+    def __init__(self, name, size, queue_size=0, queue_timeout=BULKHEAD_QUEUE_TIMEOUT):
+        self.name = name
+        self.size = size
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._cond = threading.Condition()
+        self.stats = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    def _has_room(self):
+        return self.in_flight < self.size
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if allowed; False means rejected"""
+        with self._cond:
+            if not self._has_room():
+                if self.queued >= self.queue_size:
+                    self.stats["rejected_queue_full"] += 1
+                    return False
+                self.queued += 1
+                try:
+                    if not self._cond.wait_for(self._has_room, timeout=self.queue_timeout):
+                        self.stats["rejected_timeout"] += 1
+                        return False
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, **{
+                "size": self.size,
+                "in_flight": self.in_flight,
+                "queue_depth": self.queued,
+                "queue_size": self.queue_size
+            })
+
+
+def from_spec(spec=BULKHEADS, queue_timeout=BULKHEAD_QUEUE_TIMEOUT):
+    """Build {group: Bulkhead} from a "group=slots/queue,..." string"""
+    bulkheads = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, sizes = item.partition("=")
+        size, _, queue = sizes.partition("/")
+        bulkheads[name] = Bulkhead(name, int(size), int(queue or 0), queue_timeout)
+    return bulkheads
+
+
+# Flask integration
+
+def init_app(app, bulkheads, groups, default):
+    """
+    Run each request inside the bulkhead of its route group. `groups`
+    maps endpoint names to group names; other endpoints use `default`.
+    Groups missing from `bulkheads` are not isolated.
+    """
+
+    @app.before_request
+    def _enter_bulkhead():
+        bulkhead = bulkheads.get(groups.get(request.endpoint, default))
+        if bulkhead is None:
+            return None
+        if not bulkhead.acquire():
+            response = jsonify({"error": f"Bulkhead '{bulkhead.name}' is full"})
+            return response, 503, {"Retry-After": "1"}
+        g.bulkhead = bulkhead
+        return None
+
+    @app.teardown_request
+    def _leave_bulkhead(error):
+        bulkhead = g.pop("bulkhead", None)
+        if bulkhead is not None:
+            bulkhead.release()
@@ -0,0 +1,152 @@
+"""
+Circuit Breaker for Chaos Mesh Demo
+Per-dependency breaker with closed, open and half-open states over a
+rolling error-rate window
+"""
+import os
+import time
+import threading
+
+# Configuration
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "10"))
+BREAKER_MIN_REQUESTS = int(os.getenv("BREAKER_MIN_REQUESTS", "20"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "5"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit breaker for {name} is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class RollingWindow:
+    """Success/failure counts over the last `window` seconds, kept in buckets"""
+
+    def __init__(self, window=BREAKER_WINDOW, buckets=10):
+        self.buckets = buckets
+        self.bucket_width = window / buckets
+        self._ticks = [-1] * buckets
+        self._ok = [0] * buckets
+        self._failed = [0] * buckets
+
+    def record(self, ok, now):
+        tick = int(now / self.bucket_width)
+        i = tick % self.buckets
+        if self._ticks[i] != tick:
+            self._ticks[i] = tick
+            self._ok[i] = 0
+            self._failed[i] = 0
+        if ok:
+            self._ok[i] += 1
+        else:
+            self._failed[i] += 1
+
+    def totals(self, now):
+        oldest = int(now / self.bucket_width) - self.buckets
+        ok = failed = 0
+        for i in range(self.buckets):
+            if self._ticks[i] > oldest:
+                ok += self._ok[i]
+                failed += self._failed[i]
+        return ok, failed
+
+    def reset(self):
+        self._ticks = [-1] * self.buckets
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass and outcomes feed the rolling window; the breaker
+    opens once the window holds at least `min_requests` calls and the error
+    rate reaches `error_rate`.
+    Open: calls fail fast with CircuitOpenError for `open_seconds`.
+    Half-open: up to `half_open_probes` trial calls pass; a success closes
+    the breaker, a failure opens it again. A call admitted by before_call()
+    must end in record_success(), record_failure() or release_probe().
+    """
+
+    def __init__(self, name, window=BREAKER_WINDOW, min_requests=BREAKER_MIN_REQUESTS,
+                 error_rate=BREAKER_ERROR_RATE, open_seconds=BREAKER_OPEN_SECONDS,
+                 half_open_probes=BREAKER_HALF_OPEN_PROBES):
+        self.name = name
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.window = RollingWindow(window)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.stats = {"rejected": 0, "opened": 0}
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(self.name, self.open_seconds)
+                self._probes += 1
+
+    def release_probe(self):
+        """
+        Give back a half-open probe whose call ended without an outcome
+        (cancelled), so that the next call can probe instead
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self.stats["opened"] += 1
+
+    def record_success(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self.window.reset()
+            self.window.record(True, now)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._open(now)
+                return
+            self.window.record(False, now)
+            if self.state == CLOSED:
+                ok, failed = self.window.totals(now)
+                total = ok + failed
+                if total >= self.min_requests and failed / total >= self.error_rate:
+                    self._open(now)
+
+    def snapshot(self):
+        with self._lock:
+            ok, failed = self.window.totals(time.monotonic())
+            total = ok + failed
+            return dict(self.stats, **{
+                "name": self.name,
+                "state": self.state,
+                "window_requests": total,
+                "window_error_rate": round(failed / total, 4) if total else 0.0
+            })
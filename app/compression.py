@@ -0,0 +1,196 @@
+"""
+Response Compression for Chaos Mesh Demo
+Accept-Encoding negotiation with gzip and, when the zstandard package is
+installed, the much cheaper zstd; small or streamed responses go out as is
+"""
+import os
+import zlib
+import asyncio
+import threading
+from functools import lru_cache
+
+from flask import request
+
+try:
+    import zstandard
+except ImportError:  # optional: only gzip is offered without it
+    zstandard = None
+
+# Configuration
+COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+COMPRESS_ZSTD_LEVEL = int(os.getenv("COMPRESS_ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/msgpack", "text/")
+
+# Bodies this large are compressed off the event loop in the aiohttp services
+EXECUTOR_SIZE = 256 * 1024
+
+
+def parse_accept_encoding(header):
+    """{coding: q} from an Accept-Encoding header"""
+    codings = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+@lru_cache(maxsize=256)
+def _pick(codings, accept_encoding):
+    # Clients send a handful of distinct headers, so parse each one once
+    accepted = parse_accept_encoding(accept_encoding)
+    for coding in codings:
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compressible(content_type):
+    return content_type is not None and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def etag_variant(etag, coding):
+    """ETag of the `coding`-compressed variant ("abc" becomes "abc-gzip")"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{coding}"'
+    return etag
+
+
+class Compressor:
+    """
+    Picks the cheapest coding the client accepts (zstd, then gzip) and
+    compresses bodies of at least `min_size` bytes with it. `level` is the
+    gzip level (1-9); zstd uses `zstd_level`.
+    """
+
+    def __init__(self, min_size=COMPRESS_MIN_SIZE, level=COMPRESS_LEVEL,
+                 zstd_level=COMPRESS_ZSTD_LEVEL, enabled=COMPRESS_ENABLED):
+        self.min_size = min_size
+        self.level = level
+        self.zstd_level = zstd_level
+        self.enabled = enabled
+        self.codings = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+        # ZstdCompressor objects must not be shared between threads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {"compressed": 0, "too_small": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def negotiate(self, accept_encoding):
+        """Coding to use for a client sending `accept_encoding`, or None"""
+        if not self.enabled or not accept_encoding:
+            return None
+        return _pick(self.codings, accept_encoding)
+
+    def compress(self, coding, data):
+        if coding == "zstd":
+            compressor = getattr(self._local, "zstd", None)
+            if compressor is None:
+                compressor = self._local.zstd = zstandard.ZstdCompressor(level=self.zstd_level)
+            return compressor.compress(data)
+        # wbits=31 writes a gzip header and trailer
+        return zlib.compress(data, self.level, wbits=31)
+
+    def worth_it(self, size):
+        """False (and counted) for bodies too small to gain anything"""
+        if size >= self.min_size:
+            return True
+        with self._lock:
+            self.stats["too_small"] += 1
+        return False
+
+    def record(self, coding, size_in, size_out):
+        with self._lock:
+            self.stats["compressed"] += 1
+            self.stats[coding] = self.stats.get(coding, 0) + 1
+            self.stats["bytes_in"] += size_in
+            self.stats["bytes_out"] += size_out
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["ratio"] = round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else None
+        stats["codings"] = list(self.codings) if self.enabled else []
+        stats["min_size"] = self.min_size
+        return stats
+
+
+COMPRESSOR = Compressor()
+
+
+# Flask integration
+
+def init_app(app, compressor=COMPRESSOR):
+    """Compress eligible responses according to the request's Accept-Encoding"""
+
+    @app.after_request
+    def _compress(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or "Content-Encoding" in response.headers
+                or not compressible(response.mimetype)):
+            return response
+        # Checked first: a body that is never compressed does not vary either
+        length = response.content_length
+        if length is not None and not compressor.worth_it(length):
+            return response
+        response.vary.add("Accept-Encoding")
+        coding = compressor.negotiate(request.headers.get("Accept-Encoding"))
+        if coding is None:
+            return response
+        data = response.get_data()
+        if length is None and not compressor.worth_it(len(data)):
+            return response
+        body = compressor.compress(coding, data)
+        compressor.record(coding, len(data), len(body))
+        response.set_data(body)
+        response.headers["Content-Encoding"] = coding
+        if "ETag" in response.headers:
+            response.headers["ETag"] = etag_variant(response.headers["ETag"], coding)
+        return response
+
+
+# aiohttp integration
+
+def aiohttp_setup(app, compressor=COMPRESSOR):
+    """Compress eligible aiohttp responses; large bodies off the event loop"""
+    from aiohttp import web
+
+    @web.middleware
+    async def compression_middleware(request, handler):
+        response = await handler(request)
+        if (type(response) is not web.Response or not isinstance(response.body, bytes)
+                or response.status < 200 or response.status in (204, 304)
+                or "Content-Encoding" in response.headers
+                or not compressible(response.content_type)):
+            return response
+        data = response.body
+        if not compressor.worth_it(len(data)):
+            return response
+        response.headers.add("Vary", "Accept-Encoding")
+        coding = compressor.negotiate(request.headers.get("Accept-Encoding"))
+        if coding is None:
+            return response
+        if len(data) >= EXECUTOR_SIZE:
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(None, compressor.compress, coding, data)
+        else:
+            body = compressor.compress(coding, data)
+        compressor.record(coding, len(data), len(body))
+        response.body = body
+        response.headers["Content-Encoding"] = coding
+        if "ETag" in response.headers:
+            response.headers["ETag"] = etag_variant(response.headers["ETag"], coding)
+        return response
+
+    app.middlewares.append(compression_middleware)
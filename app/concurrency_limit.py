@@ -0,0 +1,158 @@
+"""
+Adaptive Concurrency Limiter for Chaos Mesh Demo
+AIMD limit on in-flight requests driven by measured latency, with a
+bounded wait queue and fast 503 load shedding
+"""
+import os
+import time
+import threading
+
+from flask import g, request, jsonify
+
+# Configuration
+LIMIT_ENABLED = os.getenv("LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+LIMIT_INITIAL = float(os.getenv("LIMIT_INITIAL", "20"))
+LIMIT_MIN = float(os.getenv("LIMIT_MIN", "4"))
+LIMIT_MAX = float(os.getenv("LIMIT_MAX", "24"))
+LIMIT_TOLERANCE = float(os.getenv("LIMIT_TOLERANCE", "2.0"))
+LIMIT_BACKOFF = float(os.getenv("LIMIT_BACKOFF", "0.9"))
+LIMIT_QUEUE_SIZE = int(os.getenv("LIMIT_QUEUE_SIZE", "8"))
+LIMIT_QUEUE_TIMEOUT = float(os.getenv("LIMIT_QUEUE_TIMEOUT", "0.5"))
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    A completion slower than `tolerance` × its route's baseline latency (a
+    slow moving average), or one that timed out, multiplies the limit by
+    `backoff`.
+    Otherwise, while the limit is actually being used, it grows by
+    1 / limit, i.e. by about one slot per limit's worth of requests.
+    Requests over the limit wait in a queue of at most `queue_size` for up
+    to `queue_timeout` seconds before being rejected.
+    """
+
+    def __init__(self, initial=LIMIT_INITIAL, min_limit=LIMIT_MIN, max_limit=LIMIT_MAX,
+                 tolerance=LIMIT_TOLERANCE, backoff=LIMIT_BACKOFF,
+                 queue_size=LIMIT_QUEUE_SIZE, queue_timeout=LIMIT_QUEUE_TIMEOUT):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.baselines = {}
+        self._last_decrease = 0.0
+        self.in_flight = 0
+        self.queued = 0
+        self._cond = threading.Condition()
+        self.stats = {"admitted": 0, "queued_total": 0, "rejected_queue_full": 0,
+                      "rejected_timeout": 0}
+
+    def _has_room(self):
+        return self.in_flight < max(1, int(self.limit))
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if needed; False means shed"""
+        with self._cond:
+            if self._has_room():
+                self.in_flight += 1
+                self.stats["admitted"] += 1
+                return True
+            if self.queued >= self.queue_size:
+                self.stats["rejected_queue_full"] += 1
+                return False
+            self.queued += 1
+            self.stats["queued_total"] += 1
+            try:
+                if not self._cond.wait_for(self._has_room, timeout=self.queue_timeout):
+                    self.stats["rejected_timeout"] += 1
+                    return False
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return True
+
+    def _update(self, key, latency, failed):
+        baseline = None
+        if latency is not None:
+            baseline = self.baselines.get(key)
+            if baseline is None:
+                baseline = latency
+            else:
+                # Slow moving average: reacts to sudden latency jumps while
+                # still learning a permanent shift after a few hundred requests
+                baseline += (latency - baseline) * 0.01
+            self.baselines[key] = baseline
+
+        now = time.monotonic()
+        if failed or (latency is not None and latency > baseline * self.tolerance):
+            # At most one decrease per round trip, so one burst of slow
+            # completions does not collapse the limit to the floor
+            if now - self._last_decrease > (latency or 0.0):
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif latency is not None and self.in_flight + 1 >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def release(self, latency=None, failed=False, key=None):
+        """
+        Free a slot. `latency` (seconds) feeds the limit, compared with the
+        baseline kept for `key` (the route); pass None for requests whose
+        duration says nothing about overload.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self._update(key, latency, failed)
+            self._cond.notify()
+
+    def retry_after(self):
+        return max(1, int(self.queue_timeout + 0.5))
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, **{
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queue_depth": self.queued,
+                "queue_size": self.queue_size,
+                "baseline_ms": {key: round(value * 1000, 3) for key, value in self.baselines.items()}
+            })
+
+
+# Flask integration
+
+def init_app(app, limiter, exempt=()):
+    """
+    Gate every request through `limiter`, except endpoints in `exempt` and
+    requests that match no route (404s, which never reach a dependency).
+    """
+
+    @app.before_request
+    def _admit():
+        if request.endpoint is None or request.endpoint in exempt:
+            return None
+        if not limiter.acquire():
+            response = jsonify({"error": "Overloaded, request shed", "limit": round(limiter.limit, 2)})
+            return response, 503, {"Retry-After": str(limiter.retry_after())}
+        g.limiter_start = time.monotonic()
+        return None
+
+    @app.after_request
+    def _record_status(response):
+        # Only timeouts signal overload; fast 503s (breaker open, backend
+        # down) must not shrink the limit for unrelated routes
+        g.limiter_failed = response.status_code == 504
+        return response
+
+    @app.teardown_request
+    def _release(error):
+        start = g.pop("limiter_start", None)
+        if start is None:
+            return
+        limiter.release(time.monotonic() - start,
+                        failed=error is not None or g.pop("limiter_failed", False),
+                        key=request.endpoint)
@@ -0,0 +1,91 @@
+"""
+Deadline Propagation for Chaos Mesh Demo
+The frontend sends its remaining time budget with every backend call; the
+backend drops requests whose caller has already given up
+"""
+import time
+import threading
+
+from flask import g, request, jsonify
+
+# Remaining budget in milliseconds, relative so clock skew between pods
+# (see 03-time-chaos.yaml) cannot corrupt it
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+EXPIRED_BODY = {"error": "Deadline exceeded"}
+
+
+class DeadlineExpired(Exception):
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded {stage}")
+        self.stage = stage
+
+
+class DeadlineStats:
+    """Counts of requests checked and work skipped per stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"with_deadline": 0, "work_avoided": 0}
+
+    def count(self, stat):
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+stats = DeadlineStats()
+
+
+def header_value(timeout):
+    """Header value for an outgoing call with `timeout` seconds left"""
+    return str(max(0, int(timeout * 1000)))
+
+
+def parse(value, now=None):
+    """Absolute time.monotonic() deadline from a header value, or None"""
+    if not value:
+        return None
+    try:
+        remaining_ms = float(value)
+    except ValueError:
+        return None
+    return (now if now is not None else time.monotonic()) + remaining_ms / 1000.0
+
+
+def expired(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def reject(stage):
+    """Count skipped work and build the cheap 504 returned instead"""
+    stats.count("work_avoided")
+    stats.count(f"expired_{stage}")
+    return dict(EXPIRED_BODY, stage=stage)
+
+
+# Flask integration
+
+def init_app(app):
+    """Check the deadline on arrival and turn DeadlineExpired into a 504"""
+
+    @app.before_request
+    def _check_on_arrival():
+        g.deadline = parse(request.headers.get(DEADLINE_HEADER))
+        if g.deadline is not None:
+            stats.count("with_deadline")
+            if expired(g.deadline):
+                return jsonify(reject("on_arrival")), 504
+
+    @app.errorhandler(DeadlineExpired)
+    def _expired(e):
+        return jsonify(reject(e.stage)), 504
+
+
+def check(stage="before_work"):
+    """Raise DeadlineExpired if the current request's caller has given up"""
+    if expired(g.get("deadline")):
+        raise DeadlineExpired(stage)
@@ -0,0 +1,247 @@
+"""
+DNS Cache for Chaos Mesh Demo
+Last-known-good cache for backend hostname lookups, so DNS chaos (latency,
+random answers, spoofing) reaches the frontend on refresh, not on every call
+"""
+import os
+import time
+import socket
+import asyncio
+import functools
+import ipaddress
+import threading
+
+from single_flight import SingleFlight
+
+# Configuration
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "30"))
+DNS_CACHE_MAX_STALE = float(os.getenv("DNS_CACHE_MAX_STALE", "3600"))
+DNS_SLOW_LOOKUP = float(os.getenv("DNS_SLOW_LOOKUP", "1.0"))
+DNS_CONFIRM_CHANGES = int(os.getenv("DNS_CONFIRM_CHANGES", "2"))
+DNS_ALLOWED_NETWORKS = os.getenv("DNS_ALLOWED_NETWORKS", "")
+DNS_ROUND_ROBIN = os.getenv("DNS_ROUND_ROBIN", "false").lower() in ("1", "true", "yes")
+
+
+def getaddrinfo(host, port):
+    """Default lookup: every TCP address of (host, port)"""
+    return socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+
+
+@functools.lru_cache(maxsize=64)
+def _is_ip(host):
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+def _ips(addresses):
+    return frozenset(address[4][0] for address in addresses)
+
+
+class _Entry:
+    __slots__ = ("addresses", "ips", "stored_at", "candidate", "confirmations", "next")
+
+    def __init__(self, addresses, stored_at):
+        self.addresses = addresses
+        self.ips = _ips(addresses)
+        self.stored_at = stored_at
+        self.candidate = None
+        self.confirmations = 0
+        self.next = 0
+
+
+class DNSCache:
+    """
+    Caches `lookup(host, port)` answers (getaddrinfo() lists).
+
+    An entry younger than `ttl` is served as is. An older one keeps being
+    served while a background refresh runs, for up to `max_stale` more
+    seconds, so once a host has resolved, a slow or failing resolver is
+    never in the request path. A refreshed answer only replaces the entry
+    if it looks sane: not empty, inside `allowed_networks` when set, and -
+    if it shares no address with the current answer - returned
+    `confirm_changes` times in a row, which random answers never are.
+    With `round_robin`, each call rotates the addresses so new connections
+    spread over all A records.
+    """
+
+    def __init__(self, lookup=getaddrinfo, ttl=DNS_CACHE_TTL, max_stale=DNS_CACHE_MAX_STALE,
+                 slow_lookup=DNS_SLOW_LOOKUP, confirm_changes=DNS_CONFIRM_CHANGES,
+                 allowed_networks=DNS_ALLOWED_NETWORKS, round_robin=DNS_ROUND_ROBIN):
+        self.lookup = lookup
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.slow_lookup = slow_lookup
+        self.confirm_changes = confirm_changes
+        self.allowed_networks = [ipaddress.ip_network(network.strip())
+                                 for network in allowed_networks.split(",") if network.strip()]
+        self.round_robin = round_robin
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.flight = SingleFlight()
+        self.stats = {"resolves": 0, "hits": 0, "stale_hits": 0, "misses": 0,
+                      "lookups": 0, "lookup_errors": 0, "slow_lookups": 0,
+                      "suspicious_answers": 0, "changes_adopted": 0, "max_lookup_ms": 0.0}
+
+    def resolve(self, host, port):
+        """getaddrinfo()-style answer for (host, port), from the cache when possible"""
+        answer = self.cached(host, port)
+        return answer if answer is not None else self.fetch(host, port)
+
+    def cached(self, host, port):
+        """Answer without blocking, or None when the resolver has to be asked"""
+        if self.ttl <= 0 or _is_ip(host):
+            return None
+        key = (host, port)
+        with self._lock:
+            self.stats["resolves"] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry.stored_at
+                if age < self.ttl:
+                    self.stats["hits"] += 1
+                    return self._answer(entry)
+                if age < self.ttl + self.max_stale:
+                    self.stats["stale_hits"] += 1
+                    self._refresh_in_background(key)
+                    return self._answer(entry)
+            self.stats["misses"] += 1
+        return None
+
+    def fetch(self, host, port):
+        """Ask the resolver now; raises socket.gaierror if it fails or lies"""
+        if self.ttl <= 0 or _is_ip(host):
+            return self.lookup(host, port)
+        # Callers missing together (e.g. at startup) share one lookup
+        entry = self.flight.do((host, port),
+                               lambda: self._store((host, port), self._lookup(host, port)))
+        if entry is None:
+            raise socket.gaierror(socket.EAI_FAIL, f"Suspicious DNS answer for {host}")
+        with self._lock:
+            return self._answer(entry)
+
+    def _answer(self, entry):
+        addresses = entry.addresses
+        if self.round_robin and len(addresses) > 1:
+            start = entry.next
+            entry.next = (start + 1) % len(addresses)
+            addresses = addresses[start:] + addresses[:start]
+        return addresses
+
+    def _lookup(self, host, port):
+        start = time.monotonic()
+        try:
+            return list(self.lookup(host, port))
+        except OSError:
+            self._count("lookup_errors")
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.stats["lookups"] += 1
+                self.stats["max_lookup_ms"] = max(self.stats["max_lookup_ms"],
+                                                  round(elapsed * 1000, 2))
+                if elapsed >= self.slow_lookup:
+                    self.stats["slow_lookups"] += 1
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _sane(self, addresses):
+        if not addresses:
+            return False
+        for ip in _ips(addresses):
+            address = ipaddress.ip_address(ip.split("%")[0])
+            if address.is_unspecified or address.is_multicast:
+                return False
+            if self.allowed_networks and not any(address in network
+                                                 for network in self.allowed_networks):
+                return False
+        return True
+
+    def _store(self, key, addresses):
+        """Adopt a fresh answer; returns the entry, or None if it was rejected"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._sane(addresses):
+                self.stats["suspicious_answers"] += 1
+                return None
+            current = self._entries.get(key)
+            ips = _ips(addresses)
+            if (current is not None and not ips & current.ips
+                    and now - current.stored_at < self.ttl + self.max_stale):
+                # A completely different answer: keep the known-good one
+                # until the new answer has been seen often enough
+                if current.candidate == ips:
+                    current.confirmations += 1
+                else:
+                    current.candidate, current.confirmations = ips, 1
+                if current.confirmations < self.confirm_changes:
+                    self.stats["suspicious_answers"] += 1
+                    return None
+                self.stats["changes_adopted"] += 1
+            entry = self._entries[key] = _Entry(addresses, now)
+            return entry
+
+    def _refresh(self, key):
+        try:
+            self._store(key, self._lookup(*key))
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_in_background(self, key):
+        # Called with the lock held
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key,),
+                         name="dns-refresh", daemon=True).start()
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            served = self.stats["hits"] + self.stats["stale_hits"]
+            return dict(self.stats, **{
+                "ttl": self.ttl,
+                "hit_rate": round(served / self.stats["resolves"], 4) if self.stats["resolves"] else None,
+                "entries": {
+                    f"{host}:{port}": {
+                        "addresses": sorted(entry.ips),
+                        "age_s": round(now - entry.stored_at, 2)
+                    }
+                    for (host, port), entry in self._entries.items()
+                }
+            })
+
+
+# aiohttp integration
+
+def aiohttp_resolver(cache):
+    """aiohttp resolver answering from `cache`; misses run in the default executor"""
+    from aiohttp.abc import AbstractResolver
+
+    class CachedResolver(AbstractResolver):
+        async def resolve(self, host, port=0, family=socket.AF_INET):
+            addresses = cache.cached(host, port)
+            if addresses is None:
+                loop = asyncio.get_running_loop()
+                addresses = await loop.run_in_executor(None, cache.fetch, host, port)
+            return [
+                {"hostname": host, "host": address[0], "port": address[1],
+                 "family": address_family, "proto": proto,
+                 "flags": socket.AI_NUMERICHOST | socket.AI_NUMERICSERV}
+                for address_family, _, proto, _, address in addresses
+                if family in (0, address_family)
+            ]
+
+        async def close(self):
+            pass
+
+    return CachedResolver()
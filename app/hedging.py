@@ -0,0 +1,130 @@
+"""
+Hedged Requests for Chaos Mesh Demo
+Sends a second attempt for a slow idempotent GET and keeps whichever
+attempt answers first
+"""
+import os
+import asyncio
+import threading
+import contextvars
+import concurrent.futures
+
+from adaptive_timeout import LatencyTracker
+from token_bucket import TokenBucket
+
+# Configuration
+HEDGE_DATA = os.getenv("HEDGE_DATA", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.005"))
+
+
+class HedgePolicy:
+    """
+    Hedging decision and counters for one dependency.
+
+    The hedge delay is the `percentile` of recent attempt latencies (no
+    hedging until enough samples exist). Every hedged call deposits
+    `max_ratio` of a token and every hedge spends one, so at most roughly
+    `max_ratio` of calls are ever duplicated.
+    """
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, max_ratio=HEDGE_MAX_RATIO,
+                 min_delay=HEDGE_MIN_DELAY, ceiling=30.0):
+        self.latency = LatencyTracker(percentile=percentile, multiplier=1.0,
+                                      floor=min_delay, ceiling=ceiling)
+        self.budget = TokenBucket(max_ratio)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "hedges_sent": 0, "hedges_won": 0, "budget_denied": 0}
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def delay(self):
+        """Seconds to wait before hedging, or None while warming up"""
+        if self.latency.quantile() is None:
+            return None
+        return self.latency.timeout()
+
+    def _admit_hedge(self):
+        if self.budget.try_acquire():
+            self._count("hedges_sent")
+            return True
+        self._count("budget_denied")
+        return False
+
+    def call(self, fn, executor):
+        """
+        Run `fn` on `executor`, hedging it once if it is still running after
+        the hedge delay. The losing attempt is cancelled if it has not
+        started; a blocking request already on the wire cannot be
+        interrupted, so it is left to finish within its own timeout and its
+        result is dropped.
+        """
+        self._count("calls")
+        self.budget.deposit()
+        delay = self.delay()
+        if delay is None:
+            return fn()
+
+        # Attempts run in the caller's context so they stay in its trace
+        primary = executor.submit(contextvars.copy_context().run, fn)
+        done, _ = concurrent.futures.wait([primary], timeout=delay)
+        if done or not self._admit_hedge():
+            return primary.result()
+
+        hedge = executor.submit(contextvars.copy_context().run, fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is hedge:
+                        self._count("hedges_won")
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def call_async(self, fn):
+        """asyncio variant of call(); the losing attempt is cancelled outright"""
+        self._count("calls")
+        self.budget.deposit()
+        delay = self.delay()
+        if delay is None:
+            return await fn()
+
+        primary = asyncio.ensure_future(fn())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._admit_hedge():
+            return await primary
+
+        hedge = asyncio.ensure_future(fn())
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedges_won")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        delay = self.delay()
+        stats["hedge_delay_ms"] = round(delay * 1000, 2) if delay is not None else None
+        stats["hedge_ratio"] = round(
+            stats["hedges_sent"] / stats["calls"], 4) if stats["calls"] else 0.0
+        return stats
@@ -0,0 +1,365 @@
+"""
+Logging for Chaos Mesh Demo
+Request threads only put records on a bounded queue; a background thread
+formats and writes them as JSON lines, with long values truncated and
+chatty routes sampled per request
+"""
+import os
+import sys
+import time
+import queue
+import random
+import itertools
+import logging
+import logging.handlers
+import threading
+import contextvars
+
+from flask import g, request
+
+import responses
+import tracing
+
+# Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_ACCESS = os.getenv("LOG_ACCESS", "true").lower() in ("1", "true", "yes")
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "/health=0.01,/metrics=0.01,/traces=0.01")
+LOG_MAX_LENGTH = int(os.getenv("LOG_MAX_LENGTH", "1024"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(route)s] %(message)s"
+
+# LogRecord attributes that are not `extra=` fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "service", "route",
+                                                    "trace_id"}
+
+_request = contextvars.ContextVar("log_request", default=None)
+
+access_log = logging.getLogger("access")
+
+
+def truncate(text, limit=None):
+    limit = LOG_MAX_LENGTH if limit is None else limit
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text)} chars)"
+
+
+CLIP_ITEMS = 16
+
+
+class clip:
+    """
+    Log argument that renders `value` cheaply however big it is: only its
+    first CLIP_ITEMS items if it is a container, cut to LOG_MAX_LENGTH.
+    Rendering happens on the writer thread, and only if the record is kept.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        value = self.value
+        if isinstance(value, dict) and len(value) > CLIP_ITEMS:
+            value = dict(itertools.islice(value.items(), CLIP_ITEMS))
+        elif isinstance(value, (list, tuple)) and len(value) > CLIP_ITEMS:
+            value = value[:CLIP_ITEMS]
+        return truncate(repr(value))
+
+    __repr__ = __str__
+
+
+class RequestContext:
+    __slots__ = ("service", "route", "keep")
+
+    def __init__(self, service, route, keep):
+        self.service = service
+        self.route = route
+        self.keep = keep
+
+
+class Sampler:
+    """
+    Per-route sampling from a "route=rate,..." string, decided once per
+    request so a sampled request keeps all of its lines; "*" sets the rate
+    of unlisted routes (default 1)
+    """
+
+    def __init__(self, spec=LOG_SAMPLING):
+        self.rates = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            route, _, rate = item.rpartition("=")
+            self.rates[route] = float(rate)
+        self.default = self.rates.pop("*", 1.0)
+        self._lock = threading.Lock()
+        self.stats = {"kept": 0, "sampled_out": 0}
+
+    def keep(self, route):
+        rate = self.rates.get(route, self.default)
+        keep = rate >= 1 or random.random() < rate
+        with self._lock:
+            self.stats["kept" if keep else "sampled_out"] += 1
+        return keep
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+SAMPLER = Sampler()
+
+
+class SampledLogger(logging.Logger):
+    """
+    Logger that does not even build records below WARNING for requests
+    that were sampled out; get_logger() creates one
+    """
+
+    def isEnabledFor(self, level):
+        if level < logging.WARNING:
+            context = _request.get()
+            if context is not None and not context.keep:
+                return False
+        return super().isEnabledFor(level)
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields become keys of their own"""
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "service": getattr(record, "service", None) or self.service,
+            "logger": record.name,
+            "msg": truncate(record.getMessage()),
+        }
+        for key in ("route", "trace_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = truncate(value) if isinstance(value, str) else value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return responses.json_bytes(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, fmt=TEXT_FORMAT):
+        super().__init__(fmt, defaults={"route": "-"})
+
+    def formatMessage(self, record):
+        record.message = truncate(record.message)
+        return super().formatMessage(record)
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The stock put_nowait() fails on a full queue; wait for the writer
+        # thread to make room instead
+        self.queue.put(self._sentinel)
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to `target` on a writer thread. Enqueueing never blocks:
+    when the queue is full the record is dropped and counted. Messages are
+    formatted on the writer thread, so log arguments must not be mutated
+    after the call. The thread does not survive a gunicorn fork; each
+    process starts its own on first use.
+    """
+
+    def __init__(self, target, capacity=LOG_QUEUE_SIZE):
+        super().__init__(None)
+        self.target = target
+        self.capacity = capacity
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"queued": 0, "dropped": 0}
+
+    def filter(self, record):
+        # Runs in the caller's thread, where the request context is still set
+        context = _request.get()
+        span = tracing.current()
+        record.trace_id = span.trace_id if span is not None else None
+        if context is not None:
+            record.service = context.service
+            record.route = context.route
+            # Only loggers from get_logger() are SampledLoggers
+            if not context.keep and record.levelno < logging.WARNING:
+                return False
+        return super().filter(record)
+
+    def prepare(self, record):
+        # Only the traceback cannot wait: its frames would be kept alive
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+            stat = "queued"
+        except queue.Full:
+            stat = "dropped"
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _start(self):
+        with self._start_lock:
+            pid = os.getpid()
+            if self._pid == pid:
+                return
+            # A forked child inherits the parent's queue but not its thread
+            self.queue = queue.Queue(self.capacity)
+            self.listener = _Listener(self.queue, self.target, respect_handler_level=True)
+            self.listener.start()
+            self._pid = pid
+
+    def close(self):
+        # Drain what is queued before the process exits
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return dict(stats, pending=self.queue.qsize() if self.queue is not None else 0,
+                    capacity=self.capacity)
+
+
+HANDLER = None
+
+
+def setup(service, level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """
+    Route the root logger through a BackgroundHandler writing to stderr
+    (or `stream`); calling it again replaces the previous handler.
+    """
+    global HANDLER
+    root = logging.getLogger()
+    if HANDLER is not None:
+        root.removeHandler(HANDLER)
+        HANDLER.close()
+    target = logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(JSONFormatter(service) if fmt == "json" else TextFormatter())
+    HANDLER = BackgroundHandler(target)
+    root.addHandler(HANDLER)
+    root.setLevel(level)
+    return HANDLER
+
+
+def get_logger(name):
+    """
+    logging.getLogger(name) as a SampledLogger, leaving the class of other
+    libraries' loggers alone; call it at import time. A logger that
+    already exists is returned as is.
+    """
+    manager = logging.Logger.manager
+    previous = manager.loggerClass
+    manager.setLoggerClass(SampledLogger)
+    try:
+        return logging.getLogger(name)
+    finally:
+        manager.loggerClass = previous
+
+
+def snapshot():
+    if HANDLER is None:
+        return None
+    sampler = SAMPLER.snapshot()
+    return dict(HANDLER.snapshot(), requests_kept=sampler["kept"],
+                requests_sampled_out=sampler["sampled_out"])
+
+
+def _access(context, method, path, status, seconds):
+    # 5xx lines are warnings, so sampling never hides them
+    if not context.keep and status < 500:
+        return
+    access_log.log(logging.WARNING if status >= 500 else logging.INFO,
+                   "%s %s %d", method, path, status,
+                   extra={"status": status, "duration_ms": round(seconds * 1000, 3)})
+
+
+# Flask integration
+
+def init_app(app, service, sampler=SAMPLER):
+    """
+    Tag every record logged during a request with its service, route and
+    trace ID, apply the route's sampling rate and write an access line.
+    Call this after tracing.init_app.
+    """
+
+    @app.before_request
+    def _log_start():
+        rule = request.url_rule
+        route = rule.rule if rule is not None else "unmatched"
+        g.log_start = time.perf_counter()
+        g.log_token = _request.set(RequestContext(service, route, sampler.keep(route)))
+
+    @app.after_request
+    def _log_status(response):
+        g.log_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _log_finish(error):
+        token = g.pop("log_token", None)
+        if token is None:
+            return
+        if LOG_ACCESS:
+            _access(_request.get(), request.method, request.path, g.pop("log_status", 500),
+                    time.perf_counter() - g.pop("log_start"))
+        _request.reset(token)
+
+
+# aiohttp integration
+
+def aiohttp_setup(app, service, sampler=SAMPLER):
+    """
+    Request context, sampling and access lines for an aiohttp application.
+    Call this before tracing.aiohttp_setup, so that the tracing middleware
+    wraps this one and the trace ID is still current.
+    """
+    from aiohttp import web
+
+    @web.middleware
+    async def logging_middleware(request, handler):
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else "unmatched"
+        start = time.perf_counter()
+        context = RequestContext(service, route, sampler.keep(route))
+        token = _request.set(context)
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            if LOG_ACCESS:
+                _access(context, request.method, request.path, status, time.perf_counter() - start)
+            _request.reset(token)
+
+    app.middlewares.insert(0, logging_middleware)
@@ -0,0 +1,228 @@
+"""
+Metrics for Chaos Mesh Demo
+Per-route request counts, in-flight gauges and log-bucketed latency
+histograms, exposed in Prometheus text format on /metrics
+"""
+import math
+import time
+import threading
+
+from flask import g, request, Response
+
+# Histogram bucket upper bounds: 100us doubling up to ~52s, then +Inf
+BUCKET_START = 0.0001
+BUCKET_COUNT = 20
+BUCKETS = [BUCKET_START * 2 ** i for i in range(BUCKET_COUNT)]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def bucket_index(seconds):
+    """Index of the smallest bucket bound >= seconds, in O(1) via frexp"""
+    if seconds <= BUCKET_START:
+        return 0
+    mantissa, exponent = math.frexp(seconds / BUCKET_START)
+    index = exponent if mantissa > 0.5 else exponent - 1
+    return index if index < BUCKET_COUNT else BUCKET_COUNT
+
+
+class _Shard:
+    """One thread's private counters; only that thread ever writes them"""
+    __slots__ = ("thread", "requests", "upstream", "in_flight")
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.requests = {}
+        self.upstream = {}
+        self.in_flight = {}
+
+
+def _observe(table, key, seconds):
+    # [count, sum, bucket_0 .. bucket_n, +Inf]
+    hist = table.get(key)
+    if hist is None:
+        hist = table[key] = [0, 0.0] + [0] * (BUCKET_COUNT + 1)
+    hist[0] += 1
+    hist[1] += seconds
+    hist[2 + bucket_index(seconds)] += 1
+
+
+def _merge_into(target, table):
+    for key, hist in table.items():
+        merged = target.get(key)
+        if merged is None:
+            target[key] = list(hist)
+        else:
+            for i, value in enumerate(hist):
+                merged[i] += value
+
+
+class Metrics:
+    """
+    Registry with one lock-free shard per thread. Recording touches only the
+    caller's shard; render() merges all shards, folding those of finished
+    threads into a retired total so short-lived threads do not accumulate.
+    """
+
+    def __init__(self):
+        self.service = "unknown"
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard(None)
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                if len(self._shards) % 256 == 0:
+                    self._retire_dead()
+        return shard
+
+    def _retire_dead(self):
+        alive = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                _merge_into(self._retired.requests, shard.requests)
+                _merge_into(self._retired.upstream, shard.upstream)
+                for route, value in shard.in_flight.items():
+                    self._retired.in_flight[route] = self._retired.in_flight.get(route, 0) + value
+        self._shards = alive
+
+    def request_started(self, route):
+        in_flight = self._shard().in_flight
+        in_flight[route] = in_flight.get(route, 0) + 1
+
+    def request_finished(self, route, method, status, seconds):
+        shard = self._shard()
+        shard.in_flight[route] = shard.in_flight.get(route, 0) - 1
+        _observe(shard.requests, (route, method, str(status)), seconds)
+
+    def observe_upstream(self, target, path, outcome, seconds):
+        """Record one outgoing call; `outcome` is a status code or error kind"""
+        _observe(self._shard().upstream, (target, path, str(outcome)), seconds)
+
+    def collect(self):
+        with self._lock:
+            self._retire_dead()
+            requests, upstream, in_flight = {}, {}, {}
+            for shard in [self._retired] + self._shards:
+                _merge_into(requests, dict(shard.requests))
+                _merge_into(upstream, dict(shard.upstream))
+                for route, value in list(shard.in_flight.items()):
+                    in_flight[route] = in_flight.get(route, 0) + value
+        return requests, upstream, in_flight
+
+    def render(self):
+        """Prometheus text exposition of everything recorded so far"""
+        requests, upstream, in_flight = self.collect()
+        lines = []
+        service = f'service="{self.service}"'
+
+        lines.append("# HELP http_server_requests_total Requests handled, by route, method and status.")
+        lines.append("# TYPE http_server_requests_total counter")
+        for (route, method, status), hist in sorted(requests.items()):
+            lines.append(f'http_server_requests_total{{{service},route="{route}",'
+                         f'method="{method}",status="{status}"}} {hist[0]}')
+
+        lines.append("# HELP http_server_requests_in_flight Requests currently being handled.")
+        lines.append("# TYPE http_server_requests_in_flight gauge")
+        for route, value in sorted(in_flight.items()):
+            lines.append(f'http_server_requests_in_flight{{{service},route="{route}"}} {value}')
+
+        _render_histogram(lines, "http_server_request_duration_seconds",
+                          "Request latency, by route, method and status.",
+                          ("route", "method", "status"), requests, service)
+        _render_histogram(lines, "http_client_request_duration_seconds",
+                          "Upstream call latency, by target, path and outcome.",
+                          ("target", "path", "outcome"), upstream, service)
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(lines, name, help_text, label_names, table, service):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, hist in sorted(table.items()):
+        labels = service + "".join(f',{label}="{value}"' for label, value in zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip(BUCKETS, hist[2:]):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist[0]}')
+        lines.append(f"{name}_sum{{{labels}}} {hist[1]:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {hist[0]}")
+
+
+REGISTRY = Metrics()
+
+
+# Flask integration
+
+def _route():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def init_app(app, service, registry=REGISTRY):
+    """
+    Instrument every request and serve /metrics. Call this before other
+    before_request hooks so that requests they reject are counted too.
+    """
+    registry.service = service
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_start = time.perf_counter()
+        registry.request_started(_route())
+
+    @app.after_request
+    def _metrics_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(error):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            registry.request_finished(_route(), request.method, g.pop("metrics_status", 500),
+                                      time.perf_counter() - start)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+# aiohttp integration
+
+def aiohttp_setup(app, service, registry=REGISTRY):
+    """Instrument an aiohttp application and serve /metrics"""
+    from aiohttp import web
+
+    registry.service = service
+
+    @web.middleware
+    async def metrics_middleware(request, handler):
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else "unmatched"
+        start = time.perf_counter()
+        registry.request_started(route)
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            registry.request_finished(route, request.method, status, time.perf_counter() - start)
+
+    async def metrics(request):
+        return web.Response(text=registry.render(), headers={"Content-Type": CONTENT_TYPE})
+
+    app.middlewares.insert(0, metrics_middleware)
+    app.router.add_get("/metrics", metrics)
@@ -0,0 +1,125 @@
+"""
+Synthetic Payloads for Chaos Mesh Demo
+Seeded /data payloads of a requested item count and size, memoized as
+encoded bytes in a size-bounded LRU so generating them costs nothing twice
+"""
+import os
+import random
+import threading
+from collections import OrderedDict
+
+import wire
+from single_flight import SingleFlight
+
+# Configuration
+DATA_MAX_ITEMS = int(os.getenv("DATA_MAX_ITEMS", "100000"))
+DATA_MAX_SIZE = int(os.getenv("DATA_MAX_SIZE", str(64 * 1024 * 1024)))
+PAYLOAD_CACHE_BYTES = int(os.getenv("PAYLOAD_CACHE_BYTES", str(128 * 1024 * 1024)))
+
+# Encoded size of an item before its filler: {"id":..,"name":"Item ..","value":..,"payload":""},
+ITEM_OVERHEAD = 64
+
+
+class ParamError(ValueError):
+    pass
+
+
+def params(args):
+    """
+    (items, size, seed) from /data query arguments, or None when none of
+    them is given. `size` is the approximate encoded size of the data in
+    bytes; without `items` it gets one item per KiB.
+    """
+    if not any(name in args for name in ("items", "size", "seed")):
+        return None
+    try:
+        size = int(args.get("size", 0))
+        items = int(args.get("items", max(1, size // 1024) if size else 3))
+        seed = int(args.get("seed", 0))
+    except ValueError as e:
+        raise ParamError(f"items, size and seed must be integers: {e}") from e
+    if not 1 <= items <= DATA_MAX_ITEMS:
+        raise ParamError(f"items must be between 1 and {DATA_MAX_ITEMS}")
+    if not 0 <= size <= DATA_MAX_SIZE:
+        raise ParamError(f"size must be between 0 and {DATA_MAX_SIZE}")
+    return items, size, seed
+
+
+def generate(items, size, seed):
+    """The `data` section for a parameter set; equal inputs give equal output"""
+    rng = random.Random(seed)
+    filler = max(0, size // items - ITEM_OVERHEAD) // 2
+    return {
+        "items": [
+            {"id": i + 1, "name": f"Item {i + 1}", "value": rng.randint(1, 100),
+             "payload": rng.randbytes(filler).hex()}
+            for i in range(items)
+        ],
+        "total": items
+    }
+
+
+def encode(data, fmt):
+    """Encoded `data` wrapped so that wire.dumps() splices it in as is"""
+    if fmt == "msgpack":
+        return wire.RawMsgpack(wire.dumps(data, fmt))
+    return wire.RawJSON(wire.dumps(data, fmt))
+
+
+class PayloadCache:
+    """
+    LRU of encoded payloads keyed by (items, size, seed, format), bounded
+    by the total bytes held. Payloads larger than the whole budget are
+    generated every time. Concurrent misses for the same key generate once.
+    """
+
+    def __init__(self, max_bytes=PAYLOAD_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.flight = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "uncacheable": 0}
+
+    def cached(self, items, size, seed, fmt="json"):
+        """The encoded payload if it is cached, else None; never generates"""
+        key = (items, size, seed, fmt)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+            return body
+
+    def get(self, items, size, seed, fmt="json"):
+        """The encoded payload, generated on a miss"""
+        body = self.cached(items, size, seed, fmt)
+        if body is not None:
+            return body
+        key = (items, size, seed, fmt)
+        return self.flight.do(key, lambda: self._fill(key))
+
+    def _fill(self, key):
+        items, size, seed, fmt = key
+        body = encode(generate(items, size, seed), fmt)
+        with self._lock:
+            self.stats["misses"] += 1
+            if len(body) > self.max_bytes:
+                self.stats["uncacheable"] += 1
+                return body
+            if key not in self._entries:
+                self._entries[key] = body
+                self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.stats["evictions"] += 1
+        return body
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self.bytes,
+                        max_bytes=self.max_bytes)
+
+
+CACHE = PayloadCache()
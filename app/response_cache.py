@@ -0,0 +1,190 @@
+"""
+Response Cache for Chaos Mesh Demo
+In-process LRU cache with TTL, stale-while-revalidate and stale-on-error,
+used by the frontends in front of backend calls
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+# Configuration
+DATA_CACHE_TTL = float(os.getenv("DATA_CACHE_TTL", "2"))
+DATA_CACHE_SWR = float(os.getenv("DATA_CACHE_SWR", "10"))
+DATA_CACHE_STALE_IF_ERROR = float(os.getenv("DATA_CACHE_STALE_IF_ERROR", "300"))
+DATA_CACHE_MAX_ENTRIES = int(os.getenv("DATA_CACHE_MAX_ENTRIES", "256"))
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at")
+
+    def __init__(self, value, stored_at):
+        self.value = value
+        self.stored_at = stored_at
+
+
+class ResponseCache:
+    """
+    Cache of decoded backend responses keyed by request.
+
+    An entry younger than `ttl` is served as-is. Up to `ttl + swr` it is
+    still served, but a background refresh is started. Older entries are
+    refetched inline; if that fetch fails, the entry is served anyway as
+    long as it is younger than `ttl + stale_if_error`. get_async() is the
+    asyncio variant, refreshing in a task instead of a thread.
+    """
+
+    def __init__(self, ttl=DATA_CACHE_TTL, swr=DATA_CACHE_SWR,
+                 stale_if_error=DATA_CACHE_STALE_IF_ERROR,
+                 max_entries=DATA_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.swr = swr
+        self.stale_if_error = stale_if_error
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "stale_on_error": 0,
+                      "misses": 0, "refreshes": 0, "evictions": 0}
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = _Entry(value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _refresh(self, key, fetch):
+        try:
+            self._store(key, fetch())
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _refresh_async(self, key, fetch):
+        try:
+            self._store(key, await fetch())
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _claim_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.stats["refreshes"] += 1
+            return True
+
+    def _refresh_in_background(self, key, fetch):
+        if self._claim_refresh(key):
+            threading.Thread(target=self._refresh, args=(key, fetch),
+                             name="cache-refresh", daemon=True).start()
+
+    def _refresh_in_task(self, key, fetch):
+        if self._claim_refresh(key):
+            # The loop only keeps weak references to tasks
+            task = asyncio.ensure_future(self._refresh_async(key, fetch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _meta(state, entry=None):
+        age = time.monotonic() - entry.stored_at if entry is not None else 0.0
+        return {
+            "hit": entry is not None,
+            "state": state,
+            "age_ms": round(age * 1000, 2)
+        }
+
+    def get(self, key, fetch, bypass=False):
+        """
+        Return (value, cache_meta) for `key`, calling `fetch()` when the
+        cached copy is missing or too old. Exceptions from `fetch` propagate
+        only when there is no usable stale copy.
+        """
+        if bypass or not self.enabled:
+            return fetch(), self._meta("bypass")
+
+        entry, state = self._cached(key)
+        if state == "stale":
+            self._refresh_in_background(key, fetch)
+        if state is not None:
+            return entry.value, self._meta(state, entry)
+
+        try:
+            value = fetch()
+        except Exception:
+            if not self._usable_on_error(entry):
+                raise
+            return entry.value, self._meta("stale-on-error", entry)
+        return self._fetched(key, value)
+
+    async def get_async(self, key, fetch, bypass=False):
+        """get() for a coroutine function `fetch`"""
+        if bypass or not self.enabled:
+            return await fetch(), self._meta("bypass")
+
+        entry, state = self._cached(key)
+        if state == "stale":
+            self._refresh_in_task(key, fetch)
+        if state is not None:
+            return entry.value, self._meta(state, entry)
+
+        try:
+            value = await fetch()
+        except Exception:
+            if not self._usable_on_error(entry):
+                raise
+            return entry.value, self._meta("stale-on-error", entry)
+        return self._fetched(key, value)
+
+    def _cached(self, key):
+        """(entry, "fresh" | "stale") when the entry can be served, else (entry, None)"""
+        entry = self._lookup(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                self._count("hits")
+                return entry, "fresh"
+            if age < self.ttl + self.swr:
+                self._count("stale_hits")
+                return entry, "stale"
+        return entry, None
+
+    def _usable_on_error(self, entry):
+        if entry is None or time.monotonic() - entry.stored_at >= self.ttl + self.stale_if_error:
+            return False
+        self._count("stale_on_error")
+        return True
+
+    def _fetched(self, key, value):
+        self._count("misses")
+        self._store(key, value)
+        return value, self._meta("miss")
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries))
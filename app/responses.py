@@ -0,0 +1,114 @@
+"""
+Fast Responses for Chaos Mesh Demo
+Bodies that never change serialized once with precomputed headers and
+ETags, and orjson behind Flask's JSON provider for everything else
+"""
+import json
+import hashlib
+
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: the standard json module is used without it
+    orjson = None
+
+JSON = "application/json"
+
+if orjson is not None:
+    # Datetimes and dataclasses go through `default`, as with Flask's provider
+    _ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                       | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+
+def json_bytes(obj, default=None, sort_keys=False, indent=False):
+    """Compact (or indented) JSON for `obj` as bytes, through orjson if installed"""
+    if orjson is not None:
+        options = _ORJSON_OPTIONS
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=options)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits; json copes with those
+    if indent:
+        return json.dumps(obj, default=default, sort_keys=sort_keys, indent=2).encode()
+    return json.dumps(obj, default=default, sort_keys=sort_keys,
+                      separators=(",", ":")).encode()
+
+
+def json_loads(data):
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # NaN, huge integers and other inputs only json accepts
+    return json.loads(data)
+
+
+class StaticJSON:
+    """
+    A JSON body that never changes, encoded once along with its ETag.
+    Requests whose If-None-Match carries the tag (or a compressed variant
+    of it) get an empty 304.
+    """
+
+    def __init__(self, obj):
+        self.body = json_bytes(obj)
+        digest = hashlib.sha1(self.body).hexdigest()[:16]
+        self.etag = f'"{digest}"'
+        # Matches "<digest>", W/"<digest>" and "<digest>-gzip" alike
+        self._tag = f'"{digest}'
+        self.headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+
+    def matches(self, if_none_match):
+        return bool(if_none_match) and (self._tag in if_none_match
+                                        or if_none_match.strip() == "*")
+
+    def response(self):
+        """Flask response for the current request"""
+        if self.matches(request.headers.get("If-None-Match")):
+            return Response(status=304, headers=self.headers)
+        return Response(self.body, headers=self.headers, mimetype=JSON)
+
+    def aiohttp_response(self, request):
+        """aiohttp response for `request`"""
+        from aiohttp import web
+
+        if self.matches(request.headers.get("If-None-Match")):
+            return web.Response(status=304, headers=self.headers)
+        return web.Response(body=self.body, headers=self.headers, content_type=JSON)
+
+
+# Flask integration
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    DefaultJSONProvider on orjson: same types, key sorting and debug
+    indentation, but non-ASCII is written as UTF-8 rather than escaped
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return json_bytes(obj, self.default, self.sort_keys).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return json_loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = json_bytes(obj, self.default, self.sort_keys, indent)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Serve jsonify() and request.get_json() through orjson when it is installed"""
+    if orjson is not None:
+        app.json = FastJSONProvider(app)
@@ -0,0 +1,116 @@
+"""
+Retry Engine for Chaos Mesh Demo
+Exponential backoff with full jitter, deadline awareness and a global
+token-bucket retry budget
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+
+from token_bucket import TokenBucket
+
+# Configuration
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.05"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "1.0"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+RETRY_BUDGET_BURST = float(os.getenv("RETRY_BUDGET_BURST", "10"))
+
+
+class RetryPolicy:
+    """
+    Retries an attempt function while its errors are retryable.
+
+    Each successful call deposits `budget_ratio` of a token and each retry
+    spends one, so under heavy loss retries dry up at roughly
+    `budget_ratio` × successes instead of multiplying the load. A retry is
+    also skipped when its backoff would overrun the caller's deadline.
+    """
+
+    def __init__(self, retryable, max_attempts=RETRY_MAX_ATTEMPTS,
+                 base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY,
+                 budget_ratio=RETRY_BUDGET_RATIO, budget_burst=RETRY_BUDGET_BURST):
+        self.retryable = retryable
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = TokenBucket(budget_ratio, budget_burst)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "recovered": 0,
+                      "budget_denied": 0, "deadline_denied": 0}
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def backoff(self, retry):
+        """Full jitter: uniform in [0, min(max_delay, base * 2^retry)]"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    @staticmethod
+    def remaining(deadline):
+        return None if deadline is None else deadline - time.monotonic()
+
+    def _next_delay(self, error, retry, deadline):
+        """Backoff before the next attempt, or None to give up"""
+        if retry + 1 >= self.max_attempts or not self.retryable(error):
+            return None
+        delay = self.backoff(retry)
+        remaining = self.remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            self._count("deadline_denied")
+            return None
+        if not self.budget.try_acquire():
+            self._count("budget_denied")
+            return None
+        self._count("retries")
+        return delay
+
+    def _succeeded(self, retry):
+        self.budget.deposit()
+        if retry:
+            self._count("recovered")
+
+    def call(self, attempt, deadline=None):
+        """
+        Run `attempt(remaining)` until it succeeds or retrying stops making
+        sense. `remaining` is the time left before the monotonic `deadline`
+        (None without one); the last error is re-raised.
+        """
+        self._count("calls")
+        retry = 0
+        while True:
+            try:
+                result = attempt(self.remaining(deadline))
+            except Exception as e:
+                delay = self._next_delay(e, retry, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                retry += 1
+                continue
+            self._succeeded(retry)
+            return result
+
+    async def call_async(self, attempt, deadline=None):
+        """asyncio variant of call(); `attempt` returns an awaitable"""
+        self._count("calls")
+        retry = 0
+        while True:
+            try:
+                result = await attempt(self.remaining(deadline))
+            except Exception as e:
+                delay = self._next_delay(e, retry, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                retry += 1
+                continue
+            self._succeeded(retry)
+            return result
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, budget_tokens=round(self.budget.tokens, 2))
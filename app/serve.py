@@ -0,0 +1,185 @@
+"""
+Server Launcher for Chaos Mesh Demo
+Runs a service under gunicorn with a sync, threaded or aiohttp worker class
+and worker/thread counts tuned to the CPU count and the service's I/O profile
+
+    python serve.py frontend                        # autotuned, preloaded
+    python serve.py backend --worker-class sync --workers 4
+    python serve.py frontend --print-config         # show the tuned settings
+    python serve.py frontend --reload               # graceful worker restart
+"""
+import os
+import sys
+import math
+import signal
+import argparse
+import importlib
+
+# Configuration
+SERVER_WORKER_CLASS = os.getenv("SERVER_WORKER_CLASS", "auto")
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0"))
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "0"))
+SERVER_PRELOAD = os.getenv("SERVER_PRELOAD", "true").lower() in ("1", "true", "yes")
+SERVER_TIMEOUT = int(os.getenv("SERVER_TIMEOUT", "60"))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "5"))
+SERVER_MAX_THREADS = int(os.getenv("SERVER_MAX_THREADS", "64"))
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "aiohttp": "aiohttp.GunicornWebWorker",
+}
+
+# Where each service lives, and its I/O profile: seconds spent waiting on
+# the network per second of CPU in a typical request. The frontend mostly
+# waits on the backend; the backend mostly computes. Both default to
+# gthread: sync workers cannot keep connections alive, and the frontend's
+# backend client relies on keep-alive.
+SERVICES = {
+    "frontend": {"wsgi": "app:app", "aiohttp": "async_app:app", "port": 5000,
+                 "worker_class": "gthread", "io_ratio": 8.0},
+    "backend": {"wsgi": "backend:app", "aiohttp": "async_backend:app", "port": 5001,
+                "worker_class": "gthread", "io_ratio": 0.5},
+}
+
+
+def cpu_count():
+    """CPUs this process may run on (honours affinity / cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def min_threads(service):
+    """
+    Fewest threads a frontend worker may have: requests of every other
+    group, queued ones included, must never hold every thread, so that
+    health checks still find one.
+    """
+    if service != "frontend":
+        return 1
+    import bulkhead
+    bulkheads = bulkhead.from_spec()
+    reserved = sum(b.size + b.queue_size for name, b in bulkheads.items()
+                   if name != "health")
+    health = bulkheads.get("health")
+    return reserved + (health.size if health is not None else 1)
+
+
+def autotune(service, worker_class="auto", workers=0, threads=0, cpus=None):
+    """
+    (worker class, workers, threads) for `service`; explicit non-zero
+    values are kept. Sync workers handle one request each, so there are
+    2 x CPUs + 1 of them. gthread runs one worker per CPU plus a spare,
+    each with 1 + io_ratio threads (one per CPU-second a request really
+    needs), raised to what the bulkheads require. aiohttp runs one event
+    loop per CPU.
+    """
+    profile = SERVICES[service]
+    cpus = cpus or cpu_count()
+    if worker_class == "auto":
+        worker_class = profile["worker_class"]
+    if worker_class == "sync":
+        return worker_class, workers or 2 * cpus + 1, 1
+    if worker_class == "aiohttp":
+        return worker_class, workers or cpus, 1
+    tuned = max(math.ceil(1 + profile["io_ratio"]), min_threads(service))
+    return worker_class, workers or cpus + 1, threads or min(tuned, SERVER_MAX_THREADS)
+
+
+def pidfile(service):
+    return os.getenv("SERVER_PIDFILE") or f"/tmp/chaos-demo-{service}.pid"
+
+
+def options(service, worker_class, workers, threads, bind, preload):
+    opts = {
+        "bind": bind,
+        "worker_class": WORKER_CLASSES[worker_class],
+        "workers": workers,
+        "threads": threads,
+        "preload_app": preload,
+        "timeout": SERVER_TIMEOUT,
+        "graceful_timeout": SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": SERVER_KEEPALIVE,
+        "pidfile": pidfile(service),
+        "proc_name": f"chaos-demo-{service}",
+        "errorlog": "-",
+        "loglevel": "info",
+    }
+    # Heartbeat files on a container's overlay filesystem can stall workers
+    if os.path.isdir("/dev/shm"):
+        opts["worker_tmp_dir"] = "/dev/shm"
+    return opts
+
+
+def load(target):
+    module, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def run(target, opts):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in opts.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load(target)
+
+    Server().run()
+
+
+def reload(service):
+    """
+    Gracefully restart the workers of a running launcher: new workers start,
+    old ones finish their in-flight requests (up to SERVER_GRACEFUL_TIMEOUT)
+    and exit. With preload the code is not re-imported; send USR2 to the
+    master for that.
+    """
+    with open(pidfile(service)) as f:
+        pid = int(f.read().strip())
+    os.kill(pid, signal.SIGHUP)
+    print(f"Sent SIGHUP to {service} master (pid {pid})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--worker-class", default=SERVER_WORKER_CLASS,
+                        choices=["auto"] + sorted(WORKER_CLASSES))
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="0 = autotune")
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS, help="0 = autotune")
+    parser.add_argument("--bind", help="host:port (default 0.0.0.0:<service port>)")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        default=SERVER_PRELOAD)
+    parser.add_argument("--print-config", action="store_true",
+                        help="print the tuned settings and exit")
+    parser.add_argument("--reload", action="store_true",
+                        help="gracefully restart the workers of a running launcher")
+    args = parser.parse_args(argv)
+
+    if args.reload:
+        return reload(args.service)
+
+    profile = SERVICES[args.service]
+    worker_class, workers, threads = autotune(args.service, args.worker_class,
+                                              args.workers, args.threads)
+    bind = args.bind or f"0.0.0.0:{profile['port']}"
+    target = profile["aiohttp" if worker_class == "aiohttp" else "wsgi"]
+    opts = options(args.service, worker_class, workers, threads, bind, args.preload)
+    if args.print_config:
+        print(f"{args.service}: {target} on {cpu_count()} CPU(s)")
+        for key, value in opts.items():
+            print(f"  {key:<18} {value}")
+        return None
+    sys.argv = sys.argv[:1]  # gunicorn parses sys.argv too
+    run(target, opts)
+
+
+if __name__ == "__main__":
+    main()
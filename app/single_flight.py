@@ -0,0 +1,134 @@
+"""
+Single-Flight Request Coalescing for Chaos Mesh Demo
+Concurrent identical backend calls share one upstream request
+"""
+import asyncio
+import threading
+
+
+class CoalescedCallError(Exception):
+    """A coalesced call's leader stopped without a result or a copyable error"""
+
+
+def _follower_error(error):
+    """
+    Fresh exception for one waiter: raising the leader's own object from
+    several threads would splice their tracebacks onto it
+    """
+    cls = type(error)
+    try:
+        # Not cls(*args): __init__ signatures differ from the args they store
+        clone = cls.__new__(cls, *error.args)
+        clone.args = error.args
+        clone.__dict__.update(error.__dict__)
+    except Exception:
+        clone = CoalescedCallError(f"Coalesced call failed: {error!r}")
+    return clone
+
+
+class _FlightStats:
+    """Counters shared by the thread and asyncio variants"""
+
+    def __init__(self):
+        self.stats = {"requests": 0, "upstream": 0, "coalesced": 0}
+
+    def snapshot(self):
+        stats = dict(self.stats)
+        stats["coalescing_ratio"] = round(
+            stats["coalesced"] / stats["requests"], 4) if stats["requests"] else 0.0
+        stats["in_flight"] = len(self._calls)
+        return stats
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(_FlightStats):
+    """
+    Thread-safe single-flight group for the Flask (threaded) server.
+    The first caller for a key runs `fn`; callers arriving while it is in
+    flight block and receive the same result, or a copy of its exception
+    chained to the original. If the leader is interrupted by something
+    other than an Exception, they get CoalescedCallError.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            self.stats["requests"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["upstream"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise _follower_error(call.error) from call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException as e:
+            call.error = CoalescedCallError(f"Coalesced call interrupted: {e!r}")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight(_FlightStats):
+    """
+    Single-flight group for asyncio servers.
+    The upstream call runs as its own task, so a caller being cancelled does
+    not cancel the request the other waiters depend on. Every waiter gets
+    its own copy of the task's exception.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._calls = {}
+
+    def _finish(self, key, task):
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, fn):
+        self.stats["requests"] += 1
+        task = self._calls.get(key)
+        if task is None:
+            self.stats["upstream"] += 1
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.stats["coalesced"] += 1
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            raise _follower_error(e) from e
+
+
+def flight_key(url, params=None):
+    """Coalescing key for a GET: URL plus sorted query parameters"""
+    if not params:
+        return url
+    return url + "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
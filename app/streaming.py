@@ -0,0 +1,199 @@
+"""
+Streaming Bodies for Chaos Mesh Demo
+NDJSON request bodies processed one record at a time with bounded memory,
+responses streamed back as they are produced, and body-size limits
+"""
+import os
+import json
+
+from flask import Request, Response, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Configuration
+MAX_JSON_BODY = int(os.getenv("MAX_JSON_BODY", str(1024 * 1024)))
+MAX_STREAM_BODY = int(os.getenv("MAX_STREAM_BODY", str(256 * 1024 * 1024)))
+MAX_RECORD_BYTES = int(os.getenv("MAX_RECORD_BYTES", str(64 * 1024)))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+NDJSON = "application/x-ndjson"
+NDJSON_TYPES = (NDJSON, "application/jsonl")
+
+
+class BodyError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def is_ndjson(mimetype):
+    return mimetype in NDJSON_TYPES
+
+
+def encode(record):
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+class RecordReader:
+    """
+    Splits a byte stream into JSON records, one per line. Only the current
+    partial line is kept between chunks, so memory stays bounded by the
+    chunk size plus `max_record`, whatever the body size.
+    """
+
+    def __init__(self, max_record=MAX_RECORD_BYTES, max_body=MAX_STREAM_BODY):
+        self.max_record = max_record
+        self.max_body = max_body
+        self.records = 0
+        self.bytes = 0
+        self._partial = b""
+
+    def feed(self, chunk):
+        """(record, size in bytes) for every line completed by `chunk`"""
+        self.bytes += len(chunk)
+        if self.bytes > self.max_body:
+            raise BodyError(f"Body exceeds {self.max_body} bytes", 413)
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > self.max_record:
+            raise BodyError(f"Record {self.records + 1} exceeds {self.max_record} bytes", 413)
+        return [self._decode(line) for line in lines if line.strip()]
+
+    def close(self):
+        """The last record, if the body did not end with a newline"""
+        line, self._partial = self._partial, b""
+        return [self._decode(line)] if line.strip() else []
+
+    def _decode(self, line):
+        self.records += 1
+        try:
+            return json.loads(line), len(line)
+        except ValueError as e:
+            raise BodyError(f"Record {self.records} is not valid JSON: {e}") from e
+
+
+def _consume_chunk(reader, chunk, process):
+    for record, size in reader.feed(chunk):
+        process(record, size)
+
+
+def _process_chunk(reader, chunk, process):
+    # One output write per input chunk instead of one per record
+    return b"".join(encode(process(record, size)) for record, size in reader.feed(chunk))
+
+
+# Flask integration
+
+class LimitedRequest(Request):
+    """Request whose body limit depends on its type; streamed NDJSON may be larger"""
+
+    @property
+    def max_content_length(self):
+        return MAX_STREAM_BODY if is_ndjson(self.mimetype) else MAX_JSON_BODY
+
+
+def init_app(app):
+    """Per-type body limits, with JSON errors instead of werkzeug's HTML pages"""
+    app.request_class = LimitedRequest
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def _too_large(e):
+        return jsonify({"error": "Request body too large",
+                        "limit": request.max_content_length}), 413
+
+    @app.errorhandler(BodyError)
+    def _bad_body(e):
+        return jsonify({"error": str(e)}), e.status
+
+
+def consume_records(process):
+    """
+    Pass every record of the current NDJSON request to `process(record,
+    size)` and return the RecordReader with the totals. For answers that
+    do not grow with the body; raises BodyError.
+    """
+    reader = RecordReader()
+    stream = request.stream
+    for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b""):
+        _consume_chunk(reader, chunk, process)
+    for record, size in reader.close():
+        process(record, size)
+    return reader
+
+
+def stream_records(process, head=None, tail=None):
+    """
+    Streamed NDJSON response for the current NDJSON request: an optional
+    `head` record, then `process(record, size)` for every input record,
+    then `tail(reader)` if given. Errors found after the response has
+    started end the stream with an {"error": ...} line.
+
+    The response is written while the body is still being read, so large
+    bodies need a client that reads and sends at the same time (curl,
+    aiohttp); one that uploads everything first (requests) stalls once
+    the socket buffers fill up.
+    """
+    def generate():
+        reader = RecordReader()
+        if head is not None:
+            yield encode(head)
+        try:
+            stream = request.stream
+            for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b""):
+                out = _process_chunk(reader, chunk, process)
+                if out:
+                    yield out
+            for record, size in reader.close():
+                yield encode(process(record, size))
+        except BodyError as e:
+            yield encode({"error": str(e), "status": e.status, "records": reader.records})
+            return
+        except RequestEntityTooLarge:
+            yield encode({"error": "Request body too large", "status": 413,
+                          "records": reader.records})
+            return
+        if tail is not None:
+            yield encode(tail(reader))
+
+    return Response(stream_with_context(generate()), content_type=NDJSON)
+
+
+# aiohttp integration
+
+async def aiohttp_consume_records(request, process):
+    """aiohttp variant of consume_records() for `request`"""
+    if request.content_length is not None and request.content_length > MAX_STREAM_BODY:
+        raise BodyError(f"Body exceeds {MAX_STREAM_BODY} bytes", 413)
+    reader = RecordReader()
+    async for chunk in request.content.iter_chunked(STREAM_CHUNK_SIZE):
+        _consume_chunk(reader, chunk, process)
+    for record, size in reader.close():
+        process(record, size)
+    return reader
+
+
+async def aiohttp_stream_records(request, process, head=None, tail=None):
+    """aiohttp variant of stream_records() for `request`"""
+    from aiohttp import web
+
+    if request.content_length is not None and request.content_length > MAX_STREAM_BODY:
+        raise web.HTTPRequestEntityTooLarge(max_size=MAX_STREAM_BODY,
+                                            actual_size=request.content_length)
+    response = web.StreamResponse(headers={"Content-Type": NDJSON})
+    await response.prepare(request)
+    reader = RecordReader()
+    if head is not None:
+        await response.write(encode(head))
+    try:
+        async for chunk in request.content.iter_chunked(STREAM_CHUNK_SIZE):
+            out = _process_chunk(reader, chunk, process)
+            if out:
+                await response.write(out)
+        for record, size in reader.close():
+            await response.write(encode(process(record, size)))
+        if tail is not None:
+            await response.write(encode(tail(reader)))
+    except BodyError as e:
+        await response.write(encode({"error": str(e), "status": e.status,
+                                     "records": reader.records}))
+    await response.write_eof()
+    return response
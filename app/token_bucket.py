@@ -0,0 +1,30 @@
+"""
+Token Bucket for Chaos Mesh Demo
+Caps extra traffic (hedges, retries) at a fraction of normal traffic
+"""
+import threading
+
+
+class TokenBucket:
+    """
+    Every deposit adds `ratio` tokens, up to `max_tokens`; every extra
+    request spends one whole token. Over time extra requests therefore stay
+    below `ratio` × deposits, with bursts bounded by `max_tokens`.
+    """
+
+    def __init__(self, ratio, max_tokens=10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_acquire(self):
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
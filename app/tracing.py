@@ -0,0 +1,292 @@
+"""
+Tracing for Chaos Mesh Demo
+Trace-ID propagation between services and spans for every backend call,
+with DNS / connect / first byte / transfer phases timed separately
+"""
+import os
+import json
+import time
+import queue
+import random
+import threading
+import contextvars
+import collections
+
+from flask import g, request, jsonify
+
+# Configuration
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "2048"))
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+
+# W3C trace context: 00-<trace id>-<parent span id>-<flags>
+TRACE_HEADER = "traceparent"
+TRACE_ID_HEADER = "X-Trace-Id"
+
+PHASES = ("dns", "connect", "ttfb", "transfer")
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def parse(value):
+    """(trace_id, parent_span_id) from a traceparent header, or None"""
+    if not value:
+        return None
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def current():
+    """Span active in this thread or asyncio task, or None"""
+    return _current.get()
+
+
+class Span:
+    """One timed operation; `phases` holds per-phase seconds for client spans"""
+    __slots__ = ("tracer", "name", "kind", "trace_id", "span_id", "parent_id",
+                 "start", "started", "duration", "status", "phases", "attrs")
+
+    def __init__(self, tracer, name, kind, trace_id, parent_id):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.phases = None
+        self.attrs = None
+
+    def header_value(self):
+        """traceparent value that makes this span the parent of the callee's"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def finish(self, status=None):
+        self.duration = time.perf_counter() - self.started
+        self.status = status
+        self.tracer.record(self)
+
+    def to_dict(self):
+        span = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "service": self.tracer.service,
+            "name": self.name,
+            "kind": self.kind,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+        }
+        if self.phases is not None:
+            span["phases_ms"] = {name: round(self.phases[name] * 1000, 3)
+                                 for name in PHASES if name in self.phases}
+        if self.attrs:
+            span["attrs"] = self.attrs
+        return span
+
+
+class Tracer:
+    """
+    Keeps the last `capacity` finished spans in a ring buffer and, with an
+    `export_path`, appends them as JSON lines from a background thread so
+    request threads never wait on the file.
+    """
+
+    def __init__(self, service="unknown", capacity=TRACE_BUFFER_SIZE, export_path=TRACE_EXPORT):
+        self.service = service
+        self.enabled = TRACE_ENABLED
+        self.buffer = collections.deque(maxlen=capacity)
+        self.export_path = export_path
+        self._queue = None
+        self._writer_pid = None
+        self._lock = threading.Lock()
+        self.stats = {"exported": 0, "export_errors": 0}
+
+    def start_span(self, name, kind="internal"):
+        """Start a child of the current span, or a new trace without one"""
+        parent = _current.get()
+        if parent is None:
+            return Span(self, name, kind, _new_id(128), None)
+        return Span(self, name, kind, parent.trace_id, parent.span_id)
+
+    def server_span(self, name, header):
+        """Span for an incoming request, continuing the caller's traceparent"""
+        remote = parse(header)
+        if remote is None:
+            return Span(self, name, "server", _new_id(128), None)
+        return Span(self, name, "server", remote[0], remote[1])
+
+    def record(self, span):
+        if not self.enabled:
+            return
+        # deque.append with maxlen is atomic, so recording takes no lock
+        self.buffer.append(span)
+        if self.export_path:
+            self._export_queue().put(span)
+
+    def _export_queue(self):
+        # The writer thread does not survive a gunicorn fork; start one per process
+        pid = os.getpid()
+        if self._writer_pid != pid:
+            with self._lock:
+                if self._writer_pid != pid:
+                    self._queue = queue.SimpleQueue()
+                    threading.Thread(target=self._write, args=(self._queue,),
+                                     name="trace-export", daemon=True).start()
+                    self._writer_pid = pid
+        return self._queue
+
+    def _write(self, spans):
+        while True:
+            batch = [spans.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(spans.get_nowait())
+                except queue.Empty:
+                    break
+            lines = "".join(json.dumps(span.to_dict()) + "\n" for span in batch)
+            try:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                self.stats["exported"] += len(batch)
+            except OSError:
+                self.stats["export_errors"] += len(batch)
+
+    def spans(self, trace_id=None, limit=None):
+        """Buffered spans, oldest first, optionally for one trace only"""
+        spans = [span for span in list(self.buffer)
+                 if trace_id is None or span.trace_id == trace_id]
+        if limit is not None:
+            spans = spans[-limit:]
+        return [span.to_dict() for span in spans]
+
+    def snapshot(self):
+        return dict(self.stats, enabled=self.enabled, buffered=len(self.buffer),
+                    capacity=self.buffer.maxlen, export=self.export_path or None)
+
+
+TRACER = Tracer()
+
+
+def _dump(tracer, args):
+    limit = args.get("limit")
+    return {
+        "tracing": tracer.snapshot(),
+        "spans": tracer.spans(args.get("trace_id"), int(limit) if limit else None),
+    }
+
+
+# Flask integration
+
+def init_app(app, service, tracer=TRACER):
+    """
+    Open a server span per request, continuing the caller's trace from its
+    traceparent header, and serve the buffered spans on /traces
+    (?trace_id= and ?limit= filter them)
+    """
+    tracer.service = service
+
+    @app.before_request
+    def _trace_start():
+        span = tracer.server_span(f"{request.method} {request.path}",
+                                  request.headers.get(TRACE_HEADER))
+        g.trace_span = span
+        g.trace_token = _current.set(span)
+
+    @app.after_request
+    def _trace_status(response):
+        span = g.get("trace_span")
+        if span is not None:
+            span.status = response.status_code
+            response.headers[TRACE_ID_HEADER] = span.trace_id
+        return response
+
+    @app.teardown_request
+    def _trace_finish(error):
+        span = g.pop("trace_span", None)
+        if span is not None:
+            _current.reset(g.pop("trace_token"))
+            span.finish(span.status if error is None else 500)
+
+    @app.route("/traces")
+    def traces():
+        return jsonify(_dump(tracer, request.args))
+
+
+# aiohttp integration
+
+def aiohttp_setup(app, service, tracer=TRACER):
+    """Server spans and /traces for an aiohttp application"""
+    from aiohttp import web
+
+    tracer.service = service
+
+    @web.middleware
+    async def tracing_middleware(request, handler):
+        span = tracer.server_span(f"{request.method} {request.path}",
+                                  request.headers.get(TRACE_HEADER))
+        token = _current.set(span)
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            response.headers[TRACE_ID_HEADER] = span.trace_id
+            return response
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            _current.reset(token)
+            span.finish(status)
+
+    async def traces(request):
+        return web.json_response(_dump(tracer, request.query))
+
+    app.middlewares.insert(0, tracing_middleware)
+    app.router.add_get("/traces", traces)
+
+
+def aiohttp_trace_config():
+    """
+    aiohttp TraceConfig that fills the dict passed as `trace_request_ctx`
+    with "dns", "connect" and "ttfb" seconds
+    """
+    import aiohttp
+
+    def at(key):
+        async def mark(session, ctx, params):
+            ctx.trace_request_ctx[key] = time.perf_counter()
+        return mark
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(at("request_start"))
+    config.on_dns_resolvehost_start.append(at("dns_start"))
+    config.on_dns_resolvehost_end.append(at("dns_end"))
+    config.on_connection_create_start.append(at("connect_start"))
+    config.on_connection_create_end.append(at("connect_end"))
+    config.on_request_end.append(at("headers"))
+    return config
+
+
+def aiohttp_phases(marks, done):
+    """Turn aiohttp_trace_config() marks into phase seconds; `done` ends transfer"""
+    phases = {}
+    dns = marks["dns_end"] - marks["dns_start"] if "dns_end" in marks else 0.0
+    if "connect_end" in marks:
+        # connection_create covers the DNS lookup as well
+        phases["dns"] = dns
+        phases["connect"] = marks["connect_end"] - marks["connect_start"] - dns
+    headers = marks.get("headers", done)
+    phases["ttfb"] = headers - marks["request_start"] - sum(phases.values())
+    phases["transfer"] = done - headers
+    return phases
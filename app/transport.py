@@ -0,0 +1,137 @@
+"""
+Instrumented Transport for Chaos Mesh Demo
+urllib3 connections that resolve and connect themselves, so DNS lookup and
+TCP connect can be timed separately for each new backend connection and
+the lookup can go through a cache
+"""
+import time
+import socket
+import threading
+
+from requests.adapters import HTTPAdapter, DEFAULT_POOLBLOCK
+from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.timeout import _DEFAULT_TIMEOUT
+
+_local = threading.local()
+
+
+def capture():
+    """
+    Collect the phases of connections opened by this thread from now on.
+    Returns the dict that receives "dns" and "connect" seconds; it stays
+    empty when the call reuses a pooled connection.
+    """
+    phases = _local.phases = {}
+    return phases
+
+
+def resolve(host, port):
+    """getaddrinfo() results for a connection to (host, port)"""
+    return socket.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM)
+
+
+class _TimedConnectionMixin:
+    """
+    Replaces urllib3's create_connection() with a timed resolve + connect;
+    `resolver(host, port)` must return getaddrinfo()-style results
+    """
+
+    def __init__(self, *args, resolver=resolve, **kwargs):
+        self.resolver = resolver
+        super().__init__(*args, **kwargs)
+
+    def _new_conn(self):
+        phases = getattr(_local, "phases", None)
+        start = time.perf_counter()
+        try:
+            addresses = self.resolver(self._dns_host.strip("[]"), self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter()
+        try:
+            sock = self._connect_any(addresses)
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+            ) from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+        finally:
+            if phases is not None:
+                phases["dns"] = resolved - start
+                phases["connect"] = time.perf_counter() - resolved
+        return sock
+
+    def _connect_any(self, addresses):
+        """Try each resolved address in order, like socket.create_connection()"""
+        error = OSError("getaddrinfo returns an empty list")
+        for family, socktype, proto, _, address in addresses:
+            sock = socket.socket(family, socktype, proto)
+            try:
+                for option in self.socket_options or ():
+                    sock.setsockopt(*option)
+                if self.timeout is not _DEFAULT_TIMEOUT:
+                    sock.settimeout(self.timeout)
+                if self.source_address:
+                    sock.bind(self.source_address)
+                sock.connect(address)
+                return sock
+            except OSError as e:
+                error = e
+                sock.close()
+        raise error
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedPoolManager(PoolManager):
+    """PoolManager whose pools open Timed connections using `resolver`"""
+
+    def __init__(self, resolver=resolve, **kwargs):
+        super().__init__(**kwargs)
+        self.resolver = resolver
+        self.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        # Passed straight to the connections rather than through
+        # connection_pool_kw, which would make it part of the pool key
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.conn_kw["resolver"] = self.resolver
+        return pool
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """requests adapter whose pools open Timed connections using `resolver`"""
+
+    def __init__(self, resolver=resolve, **kwargs):
+        # HTTPAdapter.__init__ builds the pool manager, so set this first
+        self.resolver = resolver
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=DEFAULT_POOLBLOCK, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = TimedPoolManager(self.resolver, num_pools=connections,
+                                            maxsize=maxsize, block=block, **pool_kwargs)
@@ -0,0 +1,165 @@
+"""
+Wire Encoding for Chaos Mesh Demo
+Accept-negotiated JSON or MessagePack bodies for frontend → backend calls,
+and raw JSON passthrough for responses the frontend only wraps
+"""
+import os
+
+from flask import Response, request
+
+from responses import json_bytes, json_loads
+
+try:
+    import msgpack
+except ImportError:  # optional: every hop stays JSON without it
+    msgpack = None
+
+# Configuration
+WIRE_FORMAT = os.getenv("WIRE_FORMAT", "msgpack")
+WIRE_PASSTHROUGH = os.getenv("WIRE_PASSTHROUGH", "true").lower() in ("1", "true", "yes")
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+FORMATS = ["json"] + (["msgpack"] if msgpack is not None else [])
+
+
+class RawJSON(bytes):
+    """An encoded JSON document that dumps_json() copies in verbatim"""
+
+
+class RawMsgpack(bytes):
+    """An encoded MessagePack value that dumps() copies in verbatim"""
+
+
+def mimetype(content_type):
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+def accept_header(fmt=WIRE_FORMAT):
+    """Accept header asking for `fmt`, with JSON as the fallback"""
+    if fmt == "msgpack" and msgpack is not None:
+        return f"{MSGPACK}, {JSON};q=0.5"
+    return JSON
+
+
+def negotiate(accept):
+    """'msgpack' if the client accepts it and it is available, else 'json'"""
+    if msgpack is None or not accept:
+        return "json"
+    for item in accept.split(","):
+        media, *params = item.split(";")
+        if mimetype(media) in MSGPACK_TYPES:
+            q = next((p.strip()[2:] for p in params if p.strip().startswith("q=")), "1")
+            try:
+                return "msgpack" if float(q) > 0 else "json"
+            except ValueError:
+                return "json"
+    return "json"
+
+
+def _splice(encode, obj, raw_type):
+    """
+    `encode(obj, default)` with every `raw_type` value in `obj` copied in
+    as it is: the encoder writes a placeholder string for each of them,
+    which is then swapped for the raw bytes.
+    """
+    raws = []
+    marker = f"\0raw{id(raws):x}:"
+
+    def placeholder(value):
+        if not isinstance(value, raw_type):
+            raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+        raws.append(value)
+        return f"{marker}{len(raws) - 1}\0"
+
+    out = encode(obj, placeholder)
+    for i, raw in enumerate(raws):
+        out = out.replace(encode(f"{marker}{i}\0", None), raw, 1)
+    return out
+
+
+def _packb(obj, default):
+    if default is None:
+        return msgpack.packb(obj)
+
+    # strict_types keeps RawMsgpack from being packed as plain bytes, so
+    # other subclasses (tuples, IntEnums...) need mapping back by hand
+    def strict(value):
+        if isinstance(value, RawMsgpack):
+            return default(value)
+        for base in (tuple, list, dict, bool, int, float, str, bytes):
+            if isinstance(value, base):
+                return list(value) if base is tuple else base(value)
+        return default(value)
+
+    return msgpack.packb(obj, default=strict, strict_types=True)
+
+
+def dumps(obj, fmt="json"):
+    """`obj` as JSON or MessagePack, with RawJSON / RawMsgpack values spliced in"""
+    if fmt == "msgpack":
+        return _splice(_packb, obj, RawMsgpack)
+    return dumps_json(obj)
+
+
+def dumps_json(obj):
+    """Compact JSON for `obj` with its RawJSON values copied in as they are"""
+    return _splice(lambda value, default: json_bytes(value, default=default), obj, RawJSON)
+
+
+def decode(body, content_type, raw=False):
+    """
+    Decode a body by its Content-Type. With `raw`, a JSON object is
+    returned undecoded as RawJSON; only its type and outer braces are
+    checked. Raises ValueError for bodies that do not fit.
+    """
+    media = mimetype(content_type)
+    if raw:
+        if media != JSON:
+            raise ValueError(f"Expected {JSON} for passthrough, got {media or 'no type'}")
+        stripped = body.strip()
+        if not (stripped.startswith(b"{") and stripped.endswith(b"}")):
+            raise ValueError("Passthrough body is not a JSON object")
+        return RawJSON(stripped)
+    if media in MSGPACK_TYPES:
+        if msgpack is None:
+            raise ValueError(f"Cannot decode {media}: msgpack is not installed")
+        return msgpack.unpackb(body)
+    return json_loads(body)
+
+
+# Flask integration
+
+def respond(obj, status=200, fmt=None):
+    """`obj` encoded in `fmt`, by default the one the request's Accept header prefers"""
+    fmt = fmt or negotiate(request.headers.get("Accept"))
+    response = Response(dumps(obj, fmt), status,
+                        mimetype=MSGPACK if fmt == "msgpack" else JSON)
+    response.vary.add("Accept")
+    return response
+
+
+def json_response(obj, status=200, headers=None):
+    """jsonify() counterpart that embeds RawJSON values without re-parsing"""
+    return Response(dumps_json(obj), status, headers, mimetype=JSON)
+
+
+# aiohttp integration
+
+def aiohttp_respond(request, obj, status=200, fmt=None):
+    """aiohttp variant of respond() for `request`"""
+    from aiohttp import web
+
+    fmt = fmt or negotiate(request.headers.get("Accept"))
+    return web.Response(body=dumps(obj, fmt), status=status, headers={"Vary": "Accept"},
+                        content_type=MSGPACK if fmt == "msgpack" else JSON)
+
+
+def aiohttp_json_response(obj, status=200, headers=None):
+    """aiohttp variant of json_response()"""
+    from aiohttp import web
+
+    return web.Response(body=dumps_json(obj), status=status, headers=headers,
+                        content_type=JSON)
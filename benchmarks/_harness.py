@@ -0,0 +1,273 @@
+"""
+Benchmark Harness
+Helpers for running the demo services in-process and driving load at them
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import make_server, ThreadedWSGIServer
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+# Keep the per-request access log out of the benchmark output
+logging.getLogger("werkzeug").setLevel(logging.ERROR)
+os.environ.setdefault("LOG_ACCESS", "false")
+
+
+class _PooledWSGIServer(ThreadedWSGIServer):
+    """WSGI server with a fixed number of request threads, like gunicorn gthread"""
+
+    def __init__(self, host, port, app, max_threads):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=max_threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+class LocalServer:
+    """
+    Threaded WSGI server on an ephemeral localhost port.
+    With max_threads the server stops spawning a thread per request and
+    queues connections behind a bounded pool instead.
+    """
+
+    def __init__(self, wsgi_app, host="127.0.0.1", port=0, max_threads=None):
+        if max_threads:
+            self.server = _PooledWSGIServer(host, port, wsgi_app, max_threads)
+        else:
+            self.server = make_server(host, port, wsgi_app, threaded=True)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class AsyncLocalServer:
+    """aiohttp application served from its own event loop thread"""
+
+    def __init__(self, aiohttp_app, host="127.0.0.1", port=0):
+        self.app = aiohttp_app
+        self.host = host
+        self.port = port
+        self.url = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    async def _start(self):
+        from aiohttp import web
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port, backlog=4096)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://{self.host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _command(service, mode, port):
+    if mode == "dev":
+        module = "app" if service == "frontend" else "backend"
+        return [sys.executable, "-m", "flask", "--app", module, "run",
+                "--host", "127.0.0.1", "--port", str(port)]
+    return [sys.executable, "serve.py", service, "--worker-class", mode,
+            "--bind", f"127.0.0.1:{port}"]
+
+
+class Server:
+    """
+    One service in a child process, stopped with SIGTERM: app/serve.py
+    with the given worker class, or Flask's development server for "dev"
+    """
+
+    def __init__(self, service, mode, env=None):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = dict(os.environ, **(env or {}), SERVER_PIDFILE=f"/tmp/bench-{service}-{self.port}.pid")
+        self.process = subprocess.Popen(_command(service, mode, self.port), cwd=APP_DIR, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def __enter__(self):
+        for _ in range(200):
+            try:
+                requests.get(f"{self.url}/health", timeout=1)
+                return self
+            except requests.exceptions.RequestException:
+                time.sleep(0.05)
+        raise RuntimeError(f"{self.url} did not come up")
+
+    def __exit__(self, *exc):
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(timeout=60)
+
+
+class ThrottledProxy:
+    """
+    TCP proxy in front of `target_url` that paces each direction to `rate`
+    bytes per second - a local stand-in for a NetworkChaos bandwidth limit
+    """
+
+    def __init__(self, target_url, rate, host="127.0.0.1", chunk=1460):
+        address = target_url.split("://", 1)[-1].rstrip("/")
+        target_host, _, target_port = address.rpartition(":")
+        self.target = (target_host, int(target_port))
+        self.rate = rate
+        self.chunk = chunk
+        self.listener = socket.create_server((host, 0))
+        self.url = f"http://{host}:{self.listener.getsockname()[1]}"
+        self.thread = threading.Thread(target=self._accept, daemon=True)
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(self.target)
+            for src, dst in ((client, upstream), (upstream, client)):
+                threading.Thread(target=self._pump, args=(src, dst), daemon=True).start()
+
+    def _pump(self, src, dst):
+        due = time.monotonic()
+        try:
+            while data := src.recv(self.chunk):
+                due = max(due, time.monotonic()) + len(data) / self.rate
+                time.sleep(max(0.0, due - time.monotonic()))
+                dst.sendall(data)
+            dst.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.listener.close()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run_load(call, total, concurrency):
+    """
+    Run `call` `total` times from `concurrency` threads.
+    Returns throughput, error count and per-call latencies in ms.
+    """
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            call()
+            ok = True
+        except Exception:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": total / elapsed if elapsed > 0 else 0.0,
+        "elapsed_s": elapsed,
+        "errors": errors,
+        "latencies": latencies,
+    }
+
+
+def run_async_load(url, total, concurrency, timeout=60):
+    """
+    Fire `total` GETs at `url` from one event loop with up to `concurrency`
+    in flight - far more than a thread-per-request client can hold.
+    """
+    import aiohttp
+
+    async def drive():
+        latencies = []
+        errors = 0
+        semaphore = asyncio.Semaphore(concurrency)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+
+            async def one():
+                nonlocal errors
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        async with session.get(url) as resp:
+                            await resp.read()
+                            ok = resp.status < 500
+                    except Exception:
+                        ok = False
+                    if ok:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    else:
+                        errors += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(total)))
+            elapsed = time.perf_counter() - start
+        return {
+            "rps": total / elapsed if elapsed > 0 else 0.0,
+            "elapsed_s": elapsed,
+            "errors": errors,
+            "latencies": latencies,
+        }
+
+    return asyncio.run(drive())
+
+
+def print_row(label, result):
+    lat = result["latencies"]
+    print(f"  {label:<28} {result['rps']:>9.1f} req/s   "
+          f"p50 {percentile(lat, 50):>7.2f}ms   p99 {percentile(lat, 99):>7.2f}ms   "
+          f"errors {result['errors']}")
@@ -0,0 +1,56 @@
+"""
+Sync vs Async Load Test
+Drives the Flask services (bounded thread pool, like a gunicorn gthread
+worker) and the aiohttp services with the same high-concurrency load.
+The sync frontend runs without its bulkheads and adaptive limiter, as the
+aiohttp frontend has neither and their fast 503s would count as throughput.
+"""
+import os
+import argparse
+
+# Read when app.py imports bulkhead and concurrency_limit
+os.environ["BULKHEADS"] = ""
+os.environ["LIMIT_ENABLED"] = "false"
+
+from _harness import LocalServer, AsyncLocalServer, run_async_load, print_row  # noqa: E402
+
+import backend  # noqa: E402
+import async_backend  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=32,
+                        help="request threads for the sync frontend")
+    parser.add_argument("--delay", type=float, default=0.2,
+                        help="delay for /api/slow in seconds")
+    args = parser.parse_args()
+
+    with LocalServer(backend.app) as sync_backend, \
+            AsyncLocalServer(async_backend.create_app()) as aio_backend:
+        os.environ["BACKEND_SERVICE"] = sync_backend.url
+        os.environ["BACKEND_POOL_SIZE"] = str(args.threads)
+        import app as sync_frontend
+        import async_app
+        from async_backend_client import AsyncBackendClient
+
+        aio_frontend_app = async_app.create_app(AsyncBackendClient(aio_backend.url))
+
+        with LocalServer(sync_frontend.app, max_threads=args.threads) as sync_server, \
+                AsyncLocalServer(aio_frontend_app) as aio_server:
+            print("=" * 80)
+            print(f"SYNC vs ASYNC - {args.requests} requests, {args.concurrency} in flight, "
+                  f"sync frontend has {args.threads} threads")
+            print("=" * 80)
+
+            for path in (f"/api/slow?delay={args.delay}", "/api/data"):
+                print(f"\n  GET {path}")
+                for label, server in (("sync (Flask)", sync_server), ("async (aiohttp)", aio_server)):
+                    result = run_async_load(f"{server.url}{path}", args.requests, args.concurrency)
+                    print_row(label, result)
+
+
+if __name__ == "__main__":
+    main()
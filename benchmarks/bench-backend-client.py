@@ -0,0 +1,65 @@
+"""
+Backend Client Benchmark
+Requests per second against a backend under app/serve.py (gthread, which
+keeps connections alive): one connection per call (the old module-level
+requests.get) versus the pooled keep-alive client, which must not open
+more connections than its pool holds
+"""
+import argparse
+
+import requests
+
+from _harness import Server, run_load, print_row
+
+import wire
+from backend_client import BackendClient
+
+# Like requests.get, ask for JSON: the client otherwise prefers MessagePack
+ACCEPT_JSON = {"Accept": wire.JSON}
+
+
+def connections_opened(session):
+    """New connections the session's urllib3 pools have made so far"""
+    total = 0
+    # The same adapter is usually mounted for both http:// and https://
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        pools = adapter.poolmanager.pools
+        total += sum(pools[key].num_connections for key in pools.keys())
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with Server("backend", "gthread") as server:
+        url = f"{server.url}/data"
+        client = BackendClient(server.url, pool_size=args.concurrency)
+
+        print("=" * 80)
+        print(f"BACKEND CLIENT BENCHMARK - {args.requests} requests, "
+              f"{args.concurrency} threads, {server.url} (gthread)")
+        print("=" * 80)
+
+        before = run_load(lambda: requests.get(url, timeout=30).json(),
+                          args.requests, args.concurrency)
+        print_row("before: requests.get", before)
+
+        after = run_load(lambda: client.get("/data", headers=ACCEPT_JSON).json(),
+                         args.requests, args.concurrency)
+        print_row("after: pooled client", after)
+        opened = connections_opened(client.session)
+
+        print(f"\n  Connections: {args.requests} before (one per call), {opened} after "
+              f"(pool of {args.concurrency})")
+        if before["rps"]:
+            print(f"  Speedup: {after['rps'] / before['rps']:.2f}x")
+        client.close()
+        assert opened <= args.concurrency, \
+            f"pooled client opened {opened} connections for a pool of {args.concurrency}"
+
+
+if __name__ == "__main__":
+    main()
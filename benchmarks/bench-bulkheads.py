@@ -0,0 +1,72 @@
+"""
+Bulkhead Benchmark
+/health and / latency while /api/slow floods a frontend that has a fixed
+pool of server threads (like gunicorn gthread), with and without bulkheads
+"""
+import time
+import argparse
+import threading
+
+import requests
+
+from _harness import LocalServer, run_async_load, print_row, percentile
+
+import app as frontend
+import bulkhead
+
+
+def probe(url, stop, latencies):
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            session.get(url, timeout=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--flood", type=int, default=200, help="concurrent /api/slow requests")
+    parser.add_argument("--delay", type=float, default=1.0)
+    args = parser.parse_args()
+
+    configured = dict(frontend.bulkheads)
+    with LocalServer(frontend.app, max_threads=args.threads) as server:
+        print("=" * 80)
+        print(f"BULKHEAD BENCHMARK - {args.flood} x /api/slow?delay={args.delay} "
+              f"against {args.threads} server threads")
+        print("=" * 80)
+
+        for enabled in (False, True):
+            frontend.bulkheads.clear()
+            if enabled:
+                frontend.bulkheads.update(configured)
+            label = "with bulkheads" if enabled else "no bulkheads"
+
+            stop = threading.Event()
+            probes = {"/health": [], "/": []}
+            threads = [threading.Thread(target=probe, args=(f"{server.url}{path}", stop, lat))
+                       for path, lat in probes.items()]
+            for t in threads:
+                t.start()
+            flood = run_async_load(f"{server.url}/api/slow?delay={args.delay}",
+                                   args.flood * 2, args.flood)
+            stop.set()
+            for t in threads:
+                t.join()
+
+            print(f"\n  {label}")
+            print_row("/api/slow (flood)", flood)
+            for path, lat in probes.items():
+                print(f"  {path:<28} p50 {percentile(lat, 50):>8.2f}ms   "
+                      f"p99 {percentile(lat, 99):>8.2f}ms   samples {len(lat)}")
+
+        frontend.bulkheads.update(configured)
+
+
+if __name__ == "__main__":
+    main()
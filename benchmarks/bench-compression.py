@@ -0,0 +1,143 @@
+"""
+Response Compression Benchmark
+CPU cost against bytes saved for each coding and level on a JSON payload,
+then end-to-end latency of the same payload through a bandwidth-throttled
+proxy (1 Mbps by default, like a NetworkChaos bandwidth action) with
+identity, gzip and zstd responses
+"""
+import time
+import zlib
+import random
+import argparse
+import statistics
+
+import requests
+from flask import Flask, jsonify, request
+
+from _harness import LocalServer, ThrottledProxy
+
+import compression
+from compression import Compressor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def items(kib, seed=7):
+    """JSON-ready records totalling roughly `kib` KiB, shaped like /data answers"""
+    rng = random.Random(seed)
+    records = []
+    size = 0
+    while size < kib * 1024:
+        record = {
+            "id": f"{rng.getrandbits(64):016x}",
+            "value": rng.randint(0, 10000),
+            "score": round(rng.random(), 6),
+            "status": rng.choice(["ok", "degraded", "failed"]),
+            "tags": rng.sample(["chaos", "mesh", "network", "pod", "io", "stress"], 2),
+            "timestamp": 1700000000 + rng.random() * 1e6,
+        }
+        records.append(record)
+        size += 140
+    return {"items": records, "count": len(records)}
+
+
+def payload_app(compressor):
+    app = Flask(__name__)
+    compression.init_app(app, compressor)
+
+    @app.get("/items")
+    def get_items():
+        return jsonify(items(int(request.args.get("kib", 100))))
+
+    return app
+
+
+def decode(coding, body):
+    if coding == "gzip":
+        return zlib.decompress(body, wbits=31)
+    if coding == "zstd":
+        return zstandard.ZstdDecompressor().decompress(body)
+    return body
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def cpu_table(kib, repeat):
+    import json
+    data = json.dumps(items(kib)).encode()
+    variants = [("gzip", level) for level in (1, 6, 9)]
+    if zstandard is not None:
+        variants += [("zstd", level) for level in (1, 3, 9)]
+    print(f"\n  CPU cost vs bytes saved - {len(data) / 1024:.0f} KiB JSON, best of {repeat}")
+    print(f"  {'coding':<10}{'level':>6}{'bytes':>10}{'ratio':>8}{'compress':>12}"
+          f"{'MB/s':>9}{'decompress':>12}")
+    print(f"  {'identity':<10}{'-':>6}{len(data):>10}{1.0:>8.3f}")
+    for coding, level in variants:
+        compressor = Compressor(level=level, zstd_level=level)
+        body, spent = timed(lambda: compressor.compress(coding, data), repeat)
+        _, unspent = timed(lambda: decode(coding, body), repeat)
+        print(f"  {coding:<10}{level:>6}{len(body):>10}{len(body) / len(data):>8.3f}"
+              f"{spent * 1000:>10.2f}ms{len(data) / 1e6 / spent:>9.0f}{unspent * 1000:>10.2f}ms")
+
+
+def fetch(url, coding):
+    headers = {"Accept-Encoding": coding}
+    start = time.perf_counter()
+    resp = requests.get(url, headers=headers, stream=True, timeout=120)
+    body = resp.raw.read(decode_content=False)
+    used = resp.headers.get("Content-Encoding", "identity")
+    decode(used, body)
+    return time.perf_counter() - start, len(body), used
+
+
+def latency_table(sizes, rate, repeat):
+    compressor = Compressor()
+    codings = ["identity", "gzip"] + (["zstd"] if zstandard is not None else [])
+    with LocalServer(payload_app(compressor)) as server, \
+            ThrottledProxy(server.url, rate) as proxy:
+        print(f"\n  Latency through a {rate * 8 / 1e6:g} Mbps link - median of {repeat}")
+        print(f"  {'payload':<10}{'coding':<10}{'wire bytes':>12}{'latency':>12}{'speedup':>10}")
+        for kib in sizes:
+            url = f"{proxy.url}/items?kib={kib}"
+            baseline = None
+            for coding in codings:
+                runs = [fetch(url, coding) for _ in range(repeat)]
+                median = statistics.median(run[0] for run in runs)
+                wire, used = runs[0][1], runs[0][2]
+                baseline = baseline or median
+                print(f"  {f'{kib} KiB':<10}{used:<10}{wire:>12}{median * 1000:>10.0f}ms"
+                      f"{baseline / median:>9.1f}x")
+    stats = compressor.snapshot()
+    print(f"\n  server: {stats['compressed']} compressed, ratio {stats['ratio']}, "
+          f"{stats['too_small']} too small")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kib", type=int, default=256, help="payload for the CPU table")
+    parser.add_argument("--sizes", default="4,32,128", help="payload sizes in KiB for the link")
+    parser.add_argument("--mbps", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("COMPRESSION BENCHMARK - gzip" + (" / zstd" if zstandard is not None else
+                                            " (zstandard not installed)"))
+    print("=" * 80)
+    cpu_table(args.kib, max(args.repeat, 5))
+    sizes = [int(size) for size in args.sizes.split(",")]
+    latency_table(sizes, args.mbps * 1e6 / 8, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+DNS Cache Benchmark
+Backend calls through a stub resolver that adds delay, fails or returns
+random / spoofed answers (like 01-dns-chaos.yaml), with and without the
+frontend's DNS cache. The backend runs under app/serve.py (gthread), so
+connections stay alive and only new ones resolve the name; the client
+drops its connections every --reconnect-every calls, as keep-alive expiry
+and backend restarts do
+"""
+import time
+import random
+import itertools
+import socket
+import argparse
+
+from _harness import Server, run_load, print_row
+
+from backend_client import BackendClient
+from dns_cache import DNSCache
+
+HOSTNAME = "backend-service"
+
+
+class StubResolver:
+    """getaddrinfo() stand-in for HOSTNAME whose behaviour can be switched"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.mode = "ok"
+
+    def __call__(self, host, port):
+        time.sleep(self.delay)
+        if self.mode == "fail":
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        ip = {
+            "ok": "127.0.0.1",
+            "random": f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}",
+            "spoof": "10.0.0.1",
+        }[self.mode]
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (ip, port))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds the resolver takes")
+    parser.add_argument("--ttl", type=float, default=0.5)
+    parser.add_argument("--reconnect-every", type=int, default=25)
+    args = parser.parse_args()
+
+    with Server("backend", "gthread") as server:
+        port = server.port
+        print("=" * 80)
+        print(f"DNS CACHE BENCHMARK - resolver delay {args.delay * 1000:.0f}ms, "
+              f"{args.requests} requests x {args.concurrency} threads")
+        print("=" * 80)
+
+        def load(client):
+            calls = itertools.count(1)
+
+            def call():
+                if next(calls) % args.reconnect_every == 0:
+                    client.session.close()
+                return client.get_json("/data", retry=False, coalesce=False)
+            return run_load(call, args.requests, args.concurrency)
+
+        resolver = StubResolver(args.delay)
+        uncached = BackendClient(f"http://{HOSTNAME}:{port}", read_timeout=5,
+                                 dns=DNSCache(resolver, ttl=0))
+        print_row("no cache", load(uncached))
+        uncached.close()
+
+        cache = DNSCache(resolver, ttl=args.ttl, allowed_networks="127.0.0.0/8")
+        client = BackendClient(f"http://{HOSTNAME}:{port}", read_timeout=5, dns=cache)
+        print_row("cache", load(client))
+
+        for mode in ("fail", "random", "spoof"):
+            resolver.mode = mode
+            time.sleep(args.ttl)
+            print_row(f"stale, resolver {mode}", load(client))
+
+        stats = cache.snapshot()
+        print(f"\n  hit rate {stats['hit_rate']:.2%}   lookups {stats['lookups']}   "
+              f"errors {stats['lookup_errors']}   suspicious {stats['suspicious_answers']}   "
+              f"slowest {stats['max_lookup_ms']}ms")
+        print(f"  entries {stats['entries']}")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Hedged Request Benchmark
+p50/p99 of backend /data calls with and without hedging, against a local
+backend that delays a small fraction of requests (jitter / packet-loss
+retransmits in 02-advanced-network-chaos.yaml)
+"""
+import time
+import random
+import argparse
+import itertools
+
+from flask import Flask, jsonify
+
+from _harness import LocalServer, run_load, print_row, percentile
+
+from backend_client import BackendClient
+
+
+def slow_backend(slow_fraction, slow_delay):
+    app = Flask("slow-backend")
+
+    @app.route("/data")
+    def data():
+        if random.random() < slow_fraction:
+            time.sleep(random.uniform(*slow_delay))
+        else:
+            time.sleep(random.uniform(0.002, 0.008))
+        return jsonify({"service": "backend", "timestamp": time.time()})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--slow-fraction", type=float, default=0.03)
+    args = parser.parse_args()
+
+    with LocalServer(slow_backend(args.slow_fraction, (0.15, 0.4))) as server:
+        print("=" * 80)
+        print(f"HEDGING BENCHMARK - {args.requests} requests, {args.slow_fraction:.0%} "
+              f"delayed 150-400ms")
+        print("=" * 80)
+
+        results = {}
+        for hedge in (False, True):
+            client = BackendClient(server.url, pool_size=args.concurrency * 2)
+            seq = itertools.count()
+            # Unique params keep single-flight from merging the calls
+            call = lambda: client.get_json("/data", params={"n": next(seq)}, hedge=hedge)
+            for _ in range(200):
+                try:
+                    call()
+                except Exception:
+                    pass
+            results[hedge] = run_load(call, args.requests, args.concurrency)
+            print_row("hedged" if hedge else "no hedging", results[hedge])
+            if hedge:
+                print(f"  hedging stats: {client.hedging.snapshot()}")
+            client.close()
+
+        before = percentile(results[False]["latencies"], 99)
+        after = percentile(results[True]["latencies"], 99)
+        if after:
+            print(f"\n  p99 improvement: {before:.1f}ms -> {after:.1f}ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Load Generator Scaling
+How much open-loop load loadgen.py can offer with 1, 2, 4 ... event-loop
+processes: achieved send rate, generator lag and in-flight-cap drops at a
+target rate beyond what one process can send. Without --url it loads
+/health of an aiohttp backend started with serve.py.
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import subprocess
+
+import requests
+
+from _harness import APP_DIR
+
+sys.path.insert(0, os.path.dirname(APP_DIR))
+import loadgen  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_backend():
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, SERVER_PIDFILE=f"/tmp/bench-loadgen-{port}.pid", LOG_ACCESS="false")
+    process = subprocess.Popen([sys.executable, "serve.py", "backend", "--worker-class", "aiohttp",
+                                "--bind", f"127.0.0.1:{port}"], cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            requests.get(f"{url}/health", timeout=1)
+            return process, f"{url}/health"
+        except requests.exceptions.RequestException:
+            time.sleep(0.05)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="URL to load instead of a local backend")
+    parser.add_argument("--rate", type=float, default=20000, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--processes", default=None,
+                        help="process counts to try (default 1, 2, 4 ... up to the CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=loadgen.LOAD_MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.processes:
+        counts = [int(n) for n in args.processes.split(",")]
+    else:
+        counts = [n for n in (1, 2, 4, 8, 16, 32, 64) if n < cpus] + [cpus]
+    server, url = (None, args.url) if args.url else start_backend()
+    print("=" * 80)
+    print(f"LOAD GENERATOR SCALING - {args.rate:.0f} req/s offered for {args.duration:g}s, "
+          f"{cpus} CPU(s)" + ("" if args.url else ", shared with the backend"))
+    print("=" * 80)
+    print(f"  {'processes':>9}{'sent/s':>10}{'of target':>11}{'dropped':>9}{'lag ms':>9}"
+          f"{'skew ms':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    try:
+        for count in counts:
+            result = loadgen.run(loadgen.constant(args.rate, args.duration),
+                                 [loadgen.Target("target", url)], processes=count,
+                                 max_in_flight=args.max_in_flight)
+            summary = result.summary()
+            sent_rate = summary["sent"] / args.duration
+            print(f"  {count:>9}{sent_rate:>10.0f}{sent_rate / args.rate:>11.0%}"
+                  f"{summary['dropped']:>9}{summary['max_lag_ms']:>9.1f}"
+                  f"{summary['start_skew_ms']:>9.2f}{summary['p50_ms']:>9.2f}"
+                  f"{summary['p99_ms']:>9.2f}")
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Logging Benchmark
+Latency of frontend POST /api/process called straight through WSGI from
+several threads, with logging off, as it was (f-string of the whole payload
+written synchronously under basicConfig) and through app/logs.py's queue,
+unsampled and sampled. Logs go to stderr's stand-in: a temporary file, or a
+pipe drained at a fixed rate like a log driver that cannot keep up.
+"""
+import io
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+from flask import request, jsonify
+from werkzeug.test import EnvironBuilder
+
+import _harness  # noqa: F401  (puts app/ on sys.path)
+from _harness import percentile
+
+import app as frontend
+import logs
+
+ROUTE = "/api/process"
+
+
+class Pipe:
+    """Write end of a pipe whose reader drains `rate` bytes per second"""
+
+    def __init__(self, rate):
+        read_fd, write_fd = os.pipe()
+        self.stream = open(write_fd, "w")
+        self.rate = rate
+        self.received = 0
+        self.reader = threading.Thread(target=self._drain, args=(read_fd,), daemon=True)
+        self.reader.start()
+
+    def _drain(self, fd):
+        with open(fd, "rb", buffering=0) as f:
+            while chunk := f.read(65536):
+                self.received += len(chunk)
+                time.sleep(len(chunk) / self.rate)
+
+    def close(self):
+        self.stream.close()
+        self.reader.join()
+        return self.received
+
+
+class File:
+    def __init__(self):
+        self.stream = tempfile.TemporaryFile("w+")
+
+    def close(self):
+        self.stream.flush()
+        written = self.stream.tell()
+        self.stream.close()
+        return written
+
+
+def old_process_data():
+    """process_data as it was before logs.py"""
+    data = request.get_json() or {}
+    frontend.logger.info(f"Received data: {data}")
+    return jsonify({"received": data, "processed": True, "timestamp": time.time(),
+                    "message": f"Processed {len(data)} fields"})
+
+
+def configure(mode, stream):
+    """Install the logging setup for `mode`; returns the view to serve"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    logs.HANDLER = None
+    logs.LOG_ACCESS = mode.startswith("queue")
+    logs.SAMPLER.rates.pop(ROUTE, None)
+    if mode == "off":
+        root.setLevel(logging.WARNING)
+        return frontend.process_data
+    if mode == "before":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        return old_process_data
+    logs.setup(service="frontend", stream=stream)
+    if mode == "queue 10%":
+        logs.SAMPLER.rates[ROUTE] = 0.1
+    return frontend.process_data
+
+
+def run(body, total, concurrency):
+    """Per-request latencies in ms from `concurrency` threads"""
+    environ = EnvironBuilder(method="POST", path=ROUTE, data=body,
+                             headers={"Content-Type": "application/json"}).get_environ()
+    latencies = []
+    lock = threading.Lock()
+
+    def start_response(status, response_headers, exc_info=None):
+        pass
+
+    def worker(count):
+        mine = []
+        for _ in range(count):
+            env = dict(environ)
+            env["wsgi.input"] = io.BytesIO(body)
+            start = time.perf_counter()
+            result = frontend.app(env, start_response)
+            b"".join(result)
+            result.close()
+            mine.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker, args=(total // concurrency,))
+               for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fields", type=int, default=50, help="fields in the POSTed object")
+    parser.add_argument("--value-size", type=int, default=200, help="chars per field value")
+    parser.add_argument("--modes", default="off,before,queue,queue 10%")
+    parser.add_argument("--sink-mbps", default="0,20",
+                        help="stderr stand-ins: 0 = a file, else a pipe drained at this rate")
+    args = parser.parse_args()
+
+    body = json.dumps({f"field_{i}": "x" * args.value_size for i in range(args.fields)}).encode()
+    print("=" * 80)
+    print(f"LOGGING BENCHMARK - POST {ROUTE} with a {len(body) / 1024:.1f} KB body, "
+          f"{args.requests} requests from {args.concurrency} threads")
+    print("=" * 80)
+    for mbps in (float(m) for m in args.sink_mbps.split(",")):
+        print(f"\n  stderr: {f'pipe drained at {mbps:g} MB/s' if mbps else 'file'}")
+        print(f"  {'mode':<12}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+              f"{'log bytes':>12}{'dropped':>9}")
+        for mode in args.modes.split(","):
+            sink = Pipe(mbps * 1e6) if mbps else File()
+            frontend.app.view_functions["process_data"] = configure(mode, sink.stream)
+            run(body, 200, args.concurrency)
+            latencies, elapsed = run(body, args.requests, args.concurrency)
+            handler = logs.HANDLER
+            if handler is not None:
+                handler.close()  # waits for the writer thread to drain the queue
+            else:
+                sink.stream.flush()
+            written = sink.close()
+            dropped = handler.stats["dropped"] if handler is not None else 0
+            print(f"  {mode:<12}{len(latencies) / elapsed:>9.0f}"
+                  f"{percentile(latencies, 50):>9.2f}{percentile(latencies, 99):>9.2f}"
+                  f"{max(latencies):>9.2f}{written:>12}{dropped:>9}")
+    frontend.app.view_functions["process_data"] = frontend.process_data
+
+
+if __name__ == "__main__":
+    main()
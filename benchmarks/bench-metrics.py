@@ -0,0 +1,119 @@
+"""
+Metrics Overhead Benchmark
+Per-request CPU of the Flask services' routes called straight through WSGI
+with all hooks, with the metrics hooks and without; then the cost of
+recording one request (start + finish + one upstream call) in the
+registry, from one thread and from many, and of rendering /metrics
+"""
+import io
+import json
+import time
+import argparse
+import threading
+
+from werkzeug.test import EnvironBuilder
+
+import _harness  # noqa: F401  (puts app/ on sys.path)
+
+import app as frontend
+import backend
+import metrics
+
+ROUTES = ["/", "/health", "/api/data", "/api/process", "/api/chain"]
+
+PROCESS_BODY = json.dumps({f"field_{i}": i for i in range(20)}).encode()
+
+# (label, app, method, path, body, headers)
+WSGI_ROUTES = [
+    ("frontend GET /health", frontend.app, "GET", "/health", None, {}),
+    ("frontend GET /", frontend.app, "GET", "/", None, {}),
+    ("frontend POST /api/process", frontend.app, "POST", "/api/process", PROCESS_BODY,
+     {"Content-Type": "application/json"}),
+    ("backend GET /health", backend.app, "GET", "/health", None, {}),
+    ("backend GET /data?items=10", backend.app, "GET", "/data?items=10", None, {}),
+]
+
+HOOKS = ("before_request_funcs", "after_request_funcs", "teardown_request_funcs")
+SAVED = {app: {name: list(getattr(app, name)[None]) for name in HOOKS}
+         for app in (frontend.app, backend.app)}
+
+
+def use_metrics(enabled):
+    """Add or remove the metrics module's request hooks on both apps"""
+    for app, saved in SAVED.items():
+        for name, funcs in saved.items():
+            getattr(app, name)[None] = [f for f in funcs
+                                        if enabled or f.__module__ != metrics.__name__]
+
+
+def request_cpu(app, method, path, body, headers, iterations):
+    """CPU µs per request through the full WSGI stack"""
+    environ = EnvironBuilder(method=method, path=path, headers=headers,
+                             data=body).get_environ()
+
+    def start_response(status, response_headers, exc_info=None):
+        pass
+
+    start = time.process_time()
+    for _ in range(iterations):
+        env = dict(environ)
+        env["wsgi.input"] = io.BytesIO(body or b"")
+        result = app(env, start_response)
+        b"".join(result)
+        result.close()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def record(registry, count):
+    for i in range(count):
+        route = ROUTES[i % len(ROUTES)]
+        registry.request_started(route)
+        registry.observe_upstream("backend", "/data", 200, 0.0042)
+        registry.request_finished(route, "GET", 200, 0.0051)
+
+
+def timed(threads, count):
+    registry = metrics.Metrics()
+    workers = [threading.Thread(target=record, args=(registry, count)) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return registry, elapsed / (threads * count) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000, help="WSGI requests per route")
+    parser.add_argument("--requests", type=int, default=200000, help="requests per thread")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"METRICS OVERHEAD - {args.iterations} WSGI requests per route, "
+          f"{args.requests} recorded requests per thread")
+    print("=" * 80)
+    print(f"\n  {'CPU us/request':<30}{'no metrics':>12}{'metrics':>12}{'overhead':>12}")
+    for label, app, method, path, body, headers in WSGI_ROUTES:
+        cpu = {}
+        for enabled in (False, True):
+            use_metrics(enabled)
+            request_cpu(app, method, path, body, headers, args.iterations // 10)
+            cpu[enabled] = request_cpu(app, method, path, body, headers, args.iterations)
+        print(f"  {label:<30}{cpu[False]:>12.1f}{cpu[True]:>12.1f}"
+              f"{cpu[True] - cpu[False]:>+12.1f}")
+
+    print("\n  registry only")
+    for threads in (1, 8, 32):
+        registry, per_request = timed(threads, args.requests // threads)
+        print(f"  {threads:>3} thread(s)   {per_request:>6.2f} us/request")
+
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"\n  render /metrics   {(time.perf_counter() - start) * 1000:>6.2f} ms "
+          f"for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
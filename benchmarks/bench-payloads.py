@@ -0,0 +1,83 @@
+"""
+Payload Size Sweep
+Backend /data?size= from 1 KB to tens of MB, split into generation (first
+request, memo miss), serving (time to first byte on a memo hit, mostly
+serialization), transfer and client-side parsing, for JSON and MessagePack.
+--mbps puts a bandwidth-limited link in between.
+"""
+import time
+import argparse
+import statistics
+
+import requests
+
+from _harness import LocalServer, ThrottledProxy
+
+import backend
+import wire
+
+SIZES = "1k,10k,100k,1m,10m,32m"
+UNITS = {"k": 1024, "m": 1024 * 1024}
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def fetch(url, fmt):
+    """(ttfb, transfer, parse) seconds and body size for one GET"""
+    headers = {"Accept": wire.accept_header(fmt), "Accept-Encoding": "identity"}
+    start = time.perf_counter()
+    resp = requests.get(url, headers=headers, stream=True, timeout=600)
+    first_byte = time.perf_counter()
+    body = resp.content
+    received = time.perf_counter()
+    wire.decode(body, resp.headers.get("Content-Type"))
+    parsed = time.perf_counter()
+    return first_byte - start, received - first_byte, parsed - received, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=SIZES, help="payload sizes, e.g. 1k,10m")
+    parser.add_argument("--formats", default=",".join(wire.FORMATS))
+    parser.add_argument("--repeat", type=int, default=3, help="memo-hit requests per size")
+    parser.add_argument("--mbps", type=float, default=0, help="throttle the link (0 = loopback)")
+    args = parser.parse_args()
+
+    link = f"{args.mbps:g} Mbps link" if args.mbps else "loopback"
+    print("=" * 80)
+    print(f"PAYLOAD SIZE SWEEP - backend /data over {link}, median of {args.repeat} memo hits")
+    print("=" * 80)
+    with LocalServer(backend.app) as server:
+        base = server.url
+        proxy = None
+        if args.mbps:
+            proxy = ThrottledProxy(server.url, args.mbps * 1e6 / 8).__enter__()
+            base = proxy.url
+        for fmt in args.formats.split(","):
+            print(f"\n  {fmt}")
+            print(f"  {'size':>8}{'body bytes':>12}{'generate':>11}{'serve':>10}"
+                  f"{'transfer':>11}{'parse':>10}{'dominant':>11}")
+            for size in (parse_size(s) for s in args.sizes.split(",")):
+                url = f"{base}/data?size={size}&seed={size}"
+                miss_ttfb = fetch(url, fmt)[0]
+                runs = [fetch(url, fmt) for _ in range(args.repeat)]
+                serve, transfer, parse = (statistics.median(run[i] for run in runs) for i in range(3))
+                phases = {"serve": serve, "transfer": transfer, "parse": parse}
+                dominant = max(phases, key=phases.get)
+                print(f"  {size:>8}{runs[0][3]:>12}{(miss_ttfb - serve) * 1000:>9.1f}ms"
+                      f"{serve * 1000:>8.1f}ms{transfer * 1000:>9.1f}ms{parse * 1000:>8.1f}ms"
+                      f"{dominant:>11}")
+        if proxy is not None:
+            proxy.__exit__()
+    stats = backend.payloads.CACHE.snapshot()
+    print(f"\n  payload memo: {stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB, "
+          f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Response Path Benchmark
+Per-request CPU of the Flask services' static and dynamic JSON routes,
+called straight through WSGI with all hooks: before (jsonify on every
+request, json module) and after (precomputed bodies, orjson provider)
+"""
+import io
+import json
+import time
+import argparse
+
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.test import EnvironBuilder
+
+import _harness  # noqa: F401  (puts app/ on sys.path)
+
+import app as frontend
+import backend
+import responses
+
+PROCESS_BODY = json.dumps({f"field_{i}": {"value": i, "tags": ["chaos", "mesh"], "note": "x" * 32}
+                           for i in range(50)}).encode()
+
+# The views as they were before static responses
+OLD_VIEWS = {
+    frontend.app: {
+        "health": lambda: jsonify({"status": "healthy", "service": "frontend"}),
+        "home": lambda: jsonify({
+            "message": "Chaos Mesh Demo App",
+            "endpoints": [
+                "/health - Health check",
+                "/api/data - Get data (calls backend)",
+                "/api/process - Process data with POST",
+                "/api/slow - Intentionally slow endpoint",
+                "/api/chain - Chain call to backend"
+            ]
+        }),
+    },
+    backend.app: {
+        "health": lambda: jsonify({"status": "healthy", "service": "backend"}),
+    },
+}
+
+# (label, app, method, path, body, headers)
+ROUTES = [
+    ("frontend GET /health", frontend.app, "GET", "/health", None, {}),
+    ("frontend GET /", frontend.app, "GET", "/", None, {}),
+    ("frontend GET /health (304)", frontend.app, "GET", "/health", None,
+     {"If-None-Match": frontend.HEALTH.etag}),
+    ("frontend GET /api/status", frontend.app, "GET", "/api/status", None, {}),
+    ("frontend POST /api/process", frontend.app, "POST", "/api/process", PROCESS_BODY,
+     {"Content-Type": "application/json"}),
+    ("backend GET /health", backend.app, "GET", "/health", None, {}),
+    ("backend GET /status", backend.app, "GET", "/status", None, {}),
+]
+
+
+def request_cpu(app, method, path, body, headers, iterations):
+    """CPU µs per request through the full WSGI stack"""
+    environ = EnvironBuilder(method=method, path=path, headers=headers,
+                             data=body).get_environ()
+
+    def start_response(status, response_headers, exc_info=None):
+        pass
+
+    start = time.process_time()
+    for _ in range(iterations):
+        env = dict(environ)
+        env["wsgi.input"] = io.BytesIO(body or b"")
+        result = app(env, start_response)
+        b"".join(result)
+        result.close()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def swap(before):
+    """Switch both apps between the old and the current response path"""
+    for app, views in OLD_VIEWS.items():
+        if before:
+            app.json = DefaultJSONProvider(app)
+            app.fast_views = {name: app.view_functions[name] for name in views}
+            app.view_functions.update(views)
+        else:
+            responses.init_app(app)
+            app.view_functions.update(app.fast_views)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"RESPONSE PATH BENCHMARK - CPU per request, best of {args.repeat} x {args.requests}"
+          + ("" if responses.orjson is not None else " (orjson not installed)"))
+    print("=" * 80)
+    print(f"  {'route':<30}{'before µs':>11}{'after µs':>11}{'saved':>9}")
+    for label, app, method, path, body, headers in ROUTES:
+        before = after = float("inf")
+        # Interleaved so that drift on a busy machine hits both sides alike
+        for _ in range(args.repeat):
+            swap(before=True)
+            before = min(before, request_cpu(app, method, path, body, headers, args.requests))
+            swap(before=False)
+            after = min(after, request_cpu(app, method, path, body, headers, args.requests))
+        print(f"  {label:<30}{before:>11.1f}{after:>11.1f}{1 - after / before:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Sample Store Benchmark
+Cost of logging one request to samplestore.py's memory-mapped log, by
+reserved slot and by append, next to keeping it in a list or a latency
+histogram; then what reading it back costs: mapping the log, taking an
+experiment's records as a view, and summarising them.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+from _harness import APP_DIR
+
+sys.path.insert(0, os.path.dirname(APP_DIR))
+import samplestore  # noqa: E402
+from histogram import LatencyHistogram  # noqa: E402
+
+
+def timed(label, count, body, baseline=0.0):
+    """Run body(count) and print ns per record, less the loop's own cost"""
+    start = time.perf_counter()
+    body(count)
+    per_record = (time.perf_counter() - start) / count * 1e9
+    print(f"  {label:<36}{per_record - baseline:>10.0f}")
+    return per_record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=1000000)
+    args = parser.parse_args()
+    count = args.records
+    latencies = [random.randint(200_000, 50_000_000) for _ in range(1024)]
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "samples.bin")
+    print("=" * 80)
+    print(f"SAMPLE STORE BENCHMARK - {count} records of {samplestore.RECORD_SIZE} bytes")
+    print("=" * 80)
+    print(f"\n  {'write one record':<36}{'ns':>10}")
+
+    def noop(slot, endpoint, status, ts, latency, size=0):
+        pass
+
+    def loop(write):
+        def body(n):
+            now = time.monotonic_ns
+            for i in range(n):
+                write(i, 1, 200, now(), latencies[i & 1023], 512)
+        return body
+
+    overhead = timed("(loop, clock read and call)", count, loop(noop))
+    with samplestore.SampleStore(path) as store:
+        slots = store.reserve("slots", ["a", "b"], count).open()
+        timed("Slots.write", count, loop(slots.write), overhead)
+        slots.close()
+
+        recording = store.begin("append", ["a", "b"])
+        timed("Recording.append (growing the file)", count,
+              loop(lambda i, endpoint, status, ts, latency, size:
+                   recording.append(endpoint, status, latency, size, ts)), overhead)
+        recording.end()
+
+        rows = []
+        timed("list.append of a tuple", count,
+              loop(lambda i, endpoint, status, ts, latency, size:
+                   rows.append((ts, latency, size, endpoint, status))), overhead)
+        del rows
+        histogram = LatencyHistogram()
+        timed("LatencyHistogram.record", count,
+              loop(lambda i, endpoint, status, ts, latency, size:
+                   histogram.record(latency / 1e6)), overhead)
+    size = os.path.getsize(path)
+
+    print(f"\n  {'read':<36}{'ms':>10}")
+    start = time.perf_counter()
+    reader = samplestore.SampleReader(path)
+    print(f"  {'open and map':<36}{(time.perf_counter() - start) * 1000:>10.3f}")
+    start = time.perf_counter()
+    records = reader.experiment("slots")
+    print(f"  {'experiment() view':<36}{(time.perf_counter() - start) * 1000:>10.3f}")
+    start = time.perf_counter()
+    stats = samplestore.stats(records)
+    print(f"  {'stats(): counts, p50, p99, max':<36}{(time.perf_counter() - start) * 1000:>10.3f}")
+    start = time.perf_counter()
+    windows = reader.windows("slots", 0.1)
+    print(f"  {'windows() of 100 ms':<36}{(time.perf_counter() - start) * 1000:>10.3f}")
+    print(f"\n  {size / 1e6:.1f} MB on disk for {len(reader.records)} records; the view "
+          f"{'shares' if np.shares_memory(records, reader.records) else 'does NOT share'} "
+          f"the mapping; {len(windows)} windows, p99 {stats[4]:.2f} ms")
+    del records
+    reader.close()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Serialization Benchmark
+Bytes on the frontend → backend hop and CPU per /api/data request for each
+wire format: JSON decoded and re-encoded by the frontend, MessagePack
+decoded and re-encoded as JSON, and JSON passed through undecoded
+"""
+import time
+import random
+import argparse
+
+import _harness  # noqa: F401  (puts app/ on sys.path)
+
+import wire
+
+
+def backend_payload(items, seed=7):
+    """/data answer with `items` entries"""
+    rng = random.Random(seed)
+    return {
+        "service": "backend",
+        "timestamp": time.time(),
+        "data": {
+            "items": [{"id": i, "name": f"Item {i}", "value": rng.randint(1, 100)}
+                      for i in range(items)],
+            "total": items
+        }
+    }
+
+
+def envelope(payload):
+    return {"source": "frontend", "backend_response": payload,
+            "cache": {"hit": False, "state": "miss", "age_ms": 0.0}, "latency_ms": 1.23}
+
+
+# (label, backend format, content type, passthrough)
+FORMATS = [
+    ("json", "json", wire.JSON, False),
+    ("msgpack", "msgpack", wire.MSGPACK, False),
+    ("json passthrough", "json", wire.JSON, True),
+]
+
+
+def cpu_per_call(fn, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", default="3,100,1000", help="items per /data answer")
+    parser.add_argument("--seconds", type=float, default=0.5, help="CPU time per measurement")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("SERIALIZATION BENCHMARK - CPU per request on each side of the internal hop")
+    print("=" * 80)
+    if "msgpack" not in wire.FORMATS:
+        print("  msgpack is not installed - MessagePack rows skipped")
+    print(f"  {'items':>6}  {'format':<18}{'hop bytes':>10}{'backend µs':>12}"
+          f"{'frontend µs':>13}{'total µs':>10}")
+    for items in (int(n) for n in args.items.split(",")):
+        payload = backend_payload(items)
+        for label, fmt, content_type, raw in FORMATS:
+            if fmt not in wire.FORMATS:
+                continue
+            body = wire.dumps(payload, fmt)
+
+            def frontend():
+                return wire.dumps_json(envelope(wire.decode(body, content_type, raw)))
+
+            # Size the loop so each measurement runs for about --seconds
+            probe = cpu_per_call(frontend, 20)
+            iterations = max(20, int(args.seconds * 1e6 / max(probe, 1.0)))
+            encode_us = cpu_per_call(lambda: wire.dumps(payload, fmt), iterations)
+            frontend_us = cpu_per_call(frontend, iterations)
+            print(f"  {items:>6}  {label:<18}{len(body):>10}{encode_us:>12.1f}"
+                  f"{frontend_us:>13.1f}{encode_us + frontend_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
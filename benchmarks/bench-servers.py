@@ -0,0 +1,44 @@
+"""
+Server Benchmark
+Throughput of each service under the Flask development server (what
+docker-compose used to run) and under app/serve.py with each worker class,
+every server in its own process tree. Frontend runs call a gthread backend.
+"""
+import os
+import argparse
+
+from _harness import Server, run_async_load, print_row
+
+# (service, route) pairs to load
+TARGETS = [("backend", "/data"), ("frontend", "/api/data")]
+MODES = ["dev", "sync", "gthread", "aiohttp"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"SERVER BENCHMARK - {args.requests} requests, {args.concurrency} in flight, "
+          f"{os.cpu_count()} CPU(s) shared with the load generator")
+    print("=" * 80)
+    for service, route in TARGETS:
+        print(f"\n  {service} {route}")
+        for mode in args.modes.split(","):
+            backend = Server("backend", "gthread") if service == "frontend" else None
+            try:
+                env = {"BACKEND_SERVICE": backend.__enter__().url} if backend else None
+                with Server(service, mode, env) as server:
+                    url = f"{server.url}{route}"
+                    run_async_load(url, 200, args.concurrency)
+                    print_row(mode, run_async_load(url, args.requests, args.concurrency))
+            finally:
+                if backend is not None:
+                    backend.__exit__()
+
+
+if __name__ == "__main__":
+    main()
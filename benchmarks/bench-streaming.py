@@ -0,0 +1,119 @@
+"""
+Streaming Body Benchmark
+Throughput and server peak RSS for POST /process and /echo on backend.py
+with one JSON document versus the same records streamed as NDJSON, across
+payload sizes. Every run gets a fresh server process so peaks do not mix.
+The client is aiohttp, which reads the streamed /echo answer while it is
+still sending the body.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+
+import aiohttp
+
+RECORD = {"name": "item", "value": 42, "tags": ["chaos", "mesh"], "payload": "x" * 96}
+
+
+def records(count):
+    for i in range(count):
+        yield dict(RECORD, id=i)
+
+
+def ndjson_chunks(count):
+    batch = []
+    for record in records(count):
+        batch.append(json.dumps(record))
+        if len(batch) == 512:
+            yield ("\n".join(batch) + "\n").encode()
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode()
+
+
+async def ndjson_body(count):
+    # Generated lazily and sent chunked, so the client never holds the body
+    for chunk in ndjson_chunks(count):
+        yield chunk
+
+
+def kib(field, pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def serve():
+    from _harness import LocalServer
+    import backend
+
+    with LocalServer(backend.app) as server:
+        print(server.url, flush=True)
+        sys.stdin.read()
+
+
+async def post(url, mode, count):
+    if mode == "json":
+        body = json.dumps({"items": list(records(count))}).encode()
+        content_type = "application/json"
+    else:
+        body = ndjson_body(count)
+        content_type = "application/x-ndjson"
+    timeout = aiohttp.ClientTimeout(total=600)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        start = time.perf_counter()
+        async with session.post(url, data=body, headers={"Content-Type": content_type}) as resp:
+            received = 0
+            async for chunk in resp.content.iter_chunked(64 * 1024):
+                received += len(chunk)
+        return received, time.perf_counter() - start, resp.status
+
+
+def run(mode, path, count):
+    env = dict(os.environ, MAX_JSON_BODY=str(1 << 30), MAX_STREAM_BODY=str(1 << 30))
+    child = subprocess.Popen([sys.executable, __file__, "--serve"], stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE, text=True, env=env)
+    try:
+        url = child.stdout.readline().strip() + path
+        asyncio.run(post(url, "json", 1))
+        baseline = kib("VmRSS", child.pid)
+        received, elapsed, status = asyncio.run(post(url, mode, count))
+        peak = kib("VmHWM", child.pid)
+        return received, elapsed, max(0, peak - baseline), status
+    finally:
+        child.stdin.close()
+        child.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1,8,32", help="payload sizes in MB")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve()
+
+    record_size = len(json.dumps(dict(RECORD, id=0))) + 1
+    print("=" * 80)
+    print("STREAMING BODY BENCHMARK - backend.py, JSON document vs NDJSON stream")
+    print("=" * 80)
+    print(f"  {'endpoint':<10}{'mode':<8}{'body MB':>9}{'resp MB':>9}{'MB/s':>9}"
+          f"{'peak RSS +MB':>14}{'status':>8}")
+    for path in ("/process", "/echo"):
+        for mb in (float(size) for size in args.sizes.split(",")):
+            count = int(mb * 1024 * 1024 / record_size)
+            size = sum(len(chunk) for chunk in ndjson_chunks(count))
+            for mode in ("json", "ndjson"):
+                received, elapsed, peak, status = run(mode, path, count)
+                print(f"  {path:<10}{mode:<8}{size / 1e6:>9.1f}{received / 1e6:>9.1f}"
+                      f"{size / 1e6 / elapsed:>9.1f}{peak / 1024:>14.1f}{status:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Tracing Benchmark
+Cost of recording a span, and the per-phase breakdown tracing reports for
+backend calls slowed down in different places (DNS, server, none)
+"""
+import time
+import argparse
+
+from _harness import LocalServer
+
+import app as frontend
+import backend
+import transport
+import tracing
+from backend_client import BackendClient
+from dns_cache import DNSCache
+
+
+def span_cost(tracer, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        span = tracer.start_span("GET /data", "client")
+        span.phases = {"dns": 0.0, "connect": 0.0, "ttfb": 0.001, "transfer": 0.0001}
+        span.finish(200)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def phase_breakdown(tracer, call, count):
+    tracer.buffer.clear()
+    for _ in range(count):
+        call()
+    spans = [span for span in tracer.buffer if span.kind == "client"]
+    totals = {}
+    for span in spans:
+        for name, seconds in span.phases.items():
+            totals[name] = totals.get(name, 0.0) + seconds
+    return {name: totals.get(name, 0.0) / len(spans) * 1000 for name in tracing.PHASES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--dns-delay", type=float, default=0.05,
+                        help="seconds added to every lookup, like 01-dns-chaos.yaml")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("TRACING BENCHMARK")
+    print("=" * 80)
+    print(f"\n  span start + finish, ring buffer only     "
+          f"{span_cost(tracing.Tracer(), args.spans):>6.2f} us/span")
+    print(f"  span start + finish, JSON-lines export   "
+          f"{span_cost(tracing.Tracer(export_path='/dev/null'), args.spans):>6.2f} us/span")
+
+    tracer = tracing.TRACER
+    with LocalServer(backend.app) as server, LocalServer(frontend.app) as slow_server:
+        dns_delay = [0.0]
+
+        def lookup(host, port):
+            time.sleep(dns_delay[0])
+            return transport.resolve(host, port)
+
+        # DNS cache off, so every new connection pays for the lookup
+        client = BackendClient(server.url, dns=DNSCache(lookup, ttl=0))
+        slow_client = BackendClient(slow_server.url)
+        client.get("/data")
+
+        # The local werkzeug server closes every connection, so each call
+        # below opens a new one and pays for DNS and connect
+        scenarios = [
+            ("no chaos", lambda: client.get("/data"), args.calls),
+            (f"DNS +{args.dns_delay * 1000:.0f}ms", lambda: client.get("/data"), args.calls),
+            ("slow server (200ms)", lambda: slow_client.get("/api/slow?delay=0.2"), 5),
+        ]
+        print(f"\n  {'mean phase (ms)':<34}" + "".join(f"{name:>10}" for name in tracing.PHASES))
+        for label, call, count in scenarios:
+            dns_delay[0] = args.dns_delay if "DNS" in label else 0.0
+            phases = phase_breakdown(tracer, call, count)
+            print(f"  {label:<34}" + "".join(f"{phases[name]:>10.2f}" for name in tracing.PHASES))
+        client.close()
+        slow_client.close()
+
+
+if __name__ == "__main__":
+    main()
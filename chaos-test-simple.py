@@ -3,14 +3,19 @@ Chaos Engineering Test Suite - 5 YAML Experiments
 Tests all 5 custom chaos experiments from YAML files
 """
 import time
-import statistics
 from datetime import datetime
 import os
 import concurrent.futures
 
+from histogram import LatencyHistogram, PERCENTILES
+from samplestore import SampleStore, SAMPLES_PATH, STATUS_ERROR
+
 class ChaosYAMLTest:
-    def __init__(self):
+    def __init__(self, samples=None):
         self.results = {}
+        # Per-request log, one experiment per YAML file
+        self.samples = samples
+        self.recording = None
         self.yaml_dir = "chaos-experiments"
         self.yaml_files = [
             "01-dns-chaos.yaml",
@@ -20,6 +25,18 @@ class ChaosYAMLTest:
             "05-advanced-workflows.yaml"
         ]
     
+    def begin(self, yaml_file):
+        """Log the following requests as experiment `yaml_file`"""
+        if self.recording is not None:
+            self.recording.end()
+        if self.samples is not None:
+            self.recording = self.samples.begin(yaml_file)
+    
+    def sample(self, endpoint, latency, status=200):
+        """Log one request's latency (ms) under the current experiment"""
+        if self.recording is not None:
+            self.recording.append(self.recording.endpoint(endpoint), status, int(latency * 1e6))
+    
     def load_yaml_files(self):
         """Load and parse YAML files"""
         print("\n📋 YAML Chaos Experiments Loaded:")
@@ -54,9 +71,10 @@ class ChaosYAMLTest:
         """Test DNS Chaos (01-dns-chaos.yaml)"""
         print("\n🌐 Test 1: DNS Chaos Experiments (01-dns-chaos.yaml)")
         print("-" * 60)
+        self.begin("01-dns-chaos.yaml")
         print("  Scenario: DNS spoofing, random responses, DNS latency")
         
-        latencies = []
+        latencies = LatencyHistogram()
         experiments = ["DNS Spoofing", "DNS Random", "DNS Latency"]
         
         for exp in experiments:
@@ -65,10 +83,11 @@ class ChaosYAMLTest:
                 start = time.time()
                 time.sleep(0.2)
                 latency = (time.time() - start) * 1000
-                latencies.append(latency)
+                latencies.record(latency)
+                self.sample(exp, latency)
                 print(f"    Request {i+1}: {latency:.2f}ms")
         
-        avg = statistics.mean(latencies)
+        avg = latencies.mean
         print(f"\n  ✅ Average DNS latency: {avg:.2f}ms")
         self.results["01-dns-chaos.yaml"] = latencies
         return latencies
@@ -77,10 +96,11 @@ class ChaosYAMLTest:
         """Test Advanced Network Chaos (02-advanced-network-chaos.yaml)"""
         print("\n📡 Test 2: Advanced Network Chaos (02-advanced-network-chaos.yaml)")
         print("-" * 60)
+        self.begin("02-advanced-network-chaos.yaml")
         print("  Scenario: High packet loss (80%), bandwidth, corruption, duplication")
         
         import random
-        latencies = []
+        latencies = LatencyHistogram()
         experiments = [
             ("High Packet Loss (80%)", 0.80),
             ("Bandwidth Limit (1Mbps)", 0.10),
@@ -96,16 +116,18 @@ class ChaosYAMLTest:
                     start = time.time()
                     time.sleep(0.05)
                     latency = (time.time() - start) * 1000
-                    latencies.append(latency)
+                    latencies.record(latency)
+                    self.sample(exp_name, latency)
                     success += 1
                     print(f"    Request {i+1}: ✓ ({latency:.2f}ms)")
                 else:
+                    self.sample(exp_name, 0, STATUS_ERROR)
                     print(f"    Request {i+1}: ✗ (loss)")
             
             success_rate = (success / 10) * 100
             print(f"    Success Rate: {success_rate:.0f}%")
         
-        avg = statistics.mean(latencies) if latencies else 0
+        avg = latencies.mean
         print(f"\n  ✅ Average latency: {avg:.2f}ms")
         self.results["02-advanced-network-chaos.yaml"] = latencies
         return latencies
@@ -114,9 +136,10 @@ class ChaosYAMLTest:
         """Test Time Chaos (03-time-chaos.yaml)"""
         print("\n⏰ Test 3: Time Chaos (03-time-chaos.yaml)")
         print("-" * 60)
+        self.begin("03-time-chaos.yaml")
         print("  Scenario: Clock skew forward, backward, clock jump")
         
-        latencies = []
+        latencies = LatencyHistogram()
         experiments = [
             ("Clock Skew Forward (+1h)", 0.3),
             ("Clock Skew Backward (-30m)", 0.3),
@@ -129,10 +152,11 @@ class ChaosYAMLTest:
                 start = time.time()
                 time.sleep(delay)
                 latency = (time.time() - start) * 1000
-                latencies.append(latency)
+                latencies.record(latency)
+                self.sample(exp_name, latency)
                 print(f"    Request {i+1}: {latency:.2f}ms")
         
-        avg = statistics.mean(latencies)
+        avg = latencies.mean
         print(f"\n  ✅ Average latency: {avg:.2f}ms")
         self.results["03-time-chaos.yaml"] = latencies
         return latencies
@@ -141,38 +165,41 @@ class ChaosYAMLTest:
         """Test Kernel Panic (04-kernel-panic.yaml)"""
         print("\n💥 Test 4: Kernel Panic / Resource Exhaustion (04-kernel-panic.yaml)")
         print("-" * 60)
+        self.begin("04-kernel-panic.yaml")
         print("  Scenario: File descriptor exhaustion, process exhaustion")
         
-        latencies = []
+        latencies = LatencyHistogram()
         
         print("\n  📍 File Descriptor Exhaustion:")
-        baseline = []
+        baseline = LatencyHistogram()
         for i in range(3):
             start = time.time()
             time.sleep(0.05)
             latency = (time.time() - start) * 1000
-            baseline.append(latency)
-            latencies.append(latency)
+            baseline.record(latency)
+            latencies.record(latency)
+            self.sample("File Descriptor Exhaustion", latency)
             print(f"    Request {i+1}: {latency:.2f}ms")
         
-        baseline_avg = statistics.mean(baseline)
+        baseline_avg = baseline.mean
         print(f"    Baseline: {baseline_avg:.2f}ms")
         
         print("\n  📍 Process Exhaustion (CPU intensive):")
-        stressed = []
+        stressed = LatencyHistogram()
         for i in range(3):
             start = time.time()
             _ = sum(j**2 for j in range(5000000))
             latency = (time.time() - start) * 1000
-            stressed.append(latency)
-            latencies.append(latency)
+            stressed.record(latency)
+            latencies.record(latency)
+            self.sample("Process Exhaustion", latency)
             print(f"    Request {i+1}: {latency:.2f}ms")
         
-        stressed_avg = statistics.mean(stressed)
+        stressed_avg = stressed.mean
         degradation = ((stressed_avg - baseline_avg) / baseline_avg) * 100
         print(f"    Degradation: {degradation:.1f}%")
         
-        print(f"\n  ✅ Average latency: {statistics.mean(latencies):.2f}ms")
+        print(f"\n  ✅ Average latency: {latencies.mean:.2f}ms")
         self.results["04-kernel-panic.yaml"] = latencies
         return latencies
     
@@ -180,9 +207,10 @@ class ChaosYAMLTest:
         """Test Advanced Workflows (05-advanced-workflows.yaml)"""
         print("\n🔗 Test 5: Advanced Workflows (05-advanced-workflows.yaml)")
         print("-" * 60)
+        self.begin("05-advanced-workflows.yaml")
         print("  Scenario: Cascade, parallel, recovery workflows")
         
-        latencies = []
+        latencies = LatencyHistogram()
         
         print("\n  📍 Cascade Workflow (Serial execution):")
         print("    Phase 1: Network degradation")
@@ -190,7 +218,8 @@ class ChaosYAMLTest:
             start = time.time()
             time.sleep(0.2)
             latency = (time.time() - start) * 1000
-            latencies.append(latency)
+            latencies.record(latency)
+            self.sample("Cascade: Network degradation", latency)
             print(f"      Step {i+1}: {latency:.2f}ms")
         
         print("    Phase 2: Resource degradation")
@@ -198,7 +227,8 @@ class ChaosYAMLTest:
             start = time.time()
             time.sleep(0.3)
             latency = (time.time() - start) * 1000
-            latencies.append(latency)
+            latencies.record(latency)
+            self.sample("Cascade: Resource degradation", latency)
             print(f"      Step {i+1}: {latency:.2f}ms")
         
         print("    Phase 3: Pod disruption")
@@ -206,7 +236,8 @@ class ChaosYAMLTest:
             start = time.time()
             time.sleep(0.1)
             latency = (time.time() - start) * 1000
-            latencies.append(latency)
+            latencies.record(latency)
+            self.sample("Cascade: Pod disruption", latency)
             print(f"      Step {i+1}: {latency:.2f}ms")
         
         print("\n  📍 Parallel Workflow (Simultaneous execution):")
@@ -220,7 +251,8 @@ class ChaosYAMLTest:
             futures = [executor.submit(parallel_task) for _ in range(3)]
             for i, future in enumerate(concurrent.futures.as_completed(futures)):
                 latency = future.result()
-                latencies.append(latency)
+                latencies.record(latency)
+                self.sample("Parallel", latency)
                 print(f"    Task {i+1}: {latency:.2f}ms")
         
         print("\n  📍 Recovery Workflow:")
@@ -228,10 +260,11 @@ class ChaosYAMLTest:
             start = time.time()
             time.sleep(0.1)
             latency = (time.time() - start) * 1000
-            latencies.append(latency)
+            latencies.record(latency)
+            self.sample("Recovery", latency)
             print(f"      Recovery {i+1}: {latency:.2f}ms")
         
-        avg = statistics.mean(latencies)
+        avg = latencies.mean
         print(f"\n  ✅ Average workflow latency: {avg:.2f}ms")
         self.results["05-advanced-workflows.yaml"] = latencies
         return latencies
@@ -244,7 +277,7 @@ class ChaosYAMLTest:
         print(f"Generated: {datetime.now().isoformat()}")
         print("="*80)
         
-        total_latencies = []
+        total_latencies = LatencyHistogram()
         yaml_names = [
             "01-dns-chaos.yaml",
             "02-advanced-network-chaos.yaml",
@@ -257,37 +290,33 @@ class ChaosYAMLTest:
             if yaml_name in self.results:
                 latencies = self.results[yaml_name]
                 if latencies:
-                    avg = statistics.mean(latencies)
-                    max_lat = max(latencies)
-                    min_lat = min(latencies)
-                    std_dev = statistics.stdev(latencies) if len(latencies) > 1 else 0
-                    
-                    total_latencies.extend(latencies)
+                    stats = latencies.summary()
+                    total_latencies.merge(latencies)
                     
                     print(f"\n📊 {yaml_name}")
-                    print(f"   Average: {avg:.2f}ms")
-                    print(f"   Maximum: {max_lat:.2f}ms")
-                    print(f"   Minimum: {min_lat:.2f}ms")
-                    print(f"   Std Dev: {std_dev:.2f}ms")
-                    print(f"   Samples: {len(latencies)}")
+                    print(f"   Average: {stats['mean']:.2f}ms")
+                    print(f"   Maximum: {stats['max']:.2f}ms")
+                    print(f"   Minimum: {stats['min']:.2f}ms")
+                    print(f"   Std Dev: {stats['stdev']:.2f}ms")
+                    print(f"   Samples: {stats['count']}")
         
         if total_latencies:
             print("\n" + "="*80)
             print("📈 OVERALL STATISTICS")
             print("="*80)
-            sorted_lat = sorted(total_latencies)
-            print(f"Total Requests: {len(total_latencies)}")
-            print(f"Average Latency: {statistics.mean(total_latencies):.2f}ms")
-            print(f"Median Latency: {statistics.median(total_latencies):.2f}ms")
-            idx_99 = int(len(sorted_lat) * 0.99)
-            idx_95 = int(len(sorted_lat) * 0.95)
-            print(f"P99 Latency: {sorted_lat[idx_99-1]:.2f}ms")
-            print(f"P95 Latency: {sorted_lat[idx_95-1]:.2f}ms")
-            print(f"Max Latency: {max(total_latencies):.2f}ms")
+            stats = total_latencies.summary()
+            print(f"Total Requests: {stats['count']}")
+            print(f"Average Latency: {stats['mean']:.2f}ms")
+            for pct in PERCENTILES:
+                label = "Median" if pct == 50 else f"P{pct:g}"
+                print(f"{label} Latency: {stats[f'p{pct:g}']:.2f}ms")
+            print(f"Max Latency: {stats['max']:.2f}ms")
         
         print("\n" + "="*80)
         print("✅ 5 YAML CHAOS EXPERIMENTS TEST SUITE COMPLETED")
         print("="*80)
+        if self.samples is not None:
+            print(f"Per-request samples: python samplestore.py {self.samples.path}")
 
 def main():
     print("\n" + "="*80)
@@ -296,9 +325,10 @@ def main():
     print("Testing 5 custom chaos experiments defined in YAML files")
     print("="*80)
     
-    tester = ChaosYAMLTest()
-    
+    samples = None
     try:
+        samples = SampleStore(SAMPLES_PATH) if SAMPLES_PATH else None
+        tester = ChaosYAMLTest(samples)
         tester.load_yaml_files()
         tester.test_dns_chaos_01()
         tester.test_advanced_network_chaos_02()
@@ -313,6 +343,9 @@ def main():
         print(f"\n\n❌ Test failed: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if samples is not None:
+            samples.close()
 
 if __name__ == "__main__":
     main()
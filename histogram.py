@@ -0,0 +1,158 @@
+"""
+Latency Histogram for Chaos Tests
+HDR-style log-linear buckets over integer microseconds: constant memory
+and O(1) recording however many samples arrive, relative error bounded by
+the chosen significant figures, and histograms from several processes
+merge by adding their counts
+"""
+import os
+import math
+from array import array
+
+# Configuration
+LATENCY_PRECISION = int(os.getenv("LATENCY_PRECISION", "3"))
+LATENCY_HIGHEST_MS = float(os.getenv("LATENCY_HIGHEST_MS", "3600000"))
+
+# Percentiles that reports show, besides min and max
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    Records latencies given in milliseconds. Values up to `highest_ms`
+    keep `significant_figures` digits of precision (2: within 1%, 3:
+    within 0.1%); larger ones are counted at `highest_ms` and in
+    `clamped`. Memory is fixed by those two settings: about 200 KB at 3
+    figures and an hour's range, 28 KB at 2. Count, mean, standard
+    deviation, min and max are exact.
+    """
+
+    def __init__(self, significant_figures=LATENCY_PRECISION, highest_ms=LATENCY_HIGHEST_MS):
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures must be between 1 and 5")
+        self.significant_figures = significant_figures
+        self.highest_ms = highest_ms
+        self.highest = int(highest_ms * 1000)
+        # Sub-buckets are wide enough to tell 2 * 10^figures values apart
+        # at unit resolution; every bucket after the first doubles the unit
+        sub_bucket_count = 2 ** math.ceil(math.log2(2 * 10 ** significant_figures))
+        self._half_magnitude = sub_bucket_count.bit_length() - 2
+        self._half_count = sub_bucket_count // 2
+        self._magnitude = self._half_magnitude + 1
+        self._mask = sub_bucket_count - 1
+        buckets = max(1, self.highest.bit_length() - self._magnitude + 1)
+        self.counts = array("Q", bytes(8 * (buckets + 1) * self._half_count))
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean (Welford)
+        self.min = math.inf
+        self.max = 0.0
+        self.clamped = 0
+
+    def _index(self, value):
+        bucket = (value | self._mask).bit_length() - self._magnitude
+        return ((bucket + 1) << self._half_magnitude) + (value >> bucket) - self._half_count
+
+    def _value(self, index):
+        """Highest microsecond value that counts at `index`"""
+        bucket = (index >> self._half_magnitude) - 1
+        sub_bucket = (index & (self._half_count - 1)) + self._half_count
+        if bucket < 0:
+            bucket, sub_bucket = 0, sub_bucket - self._half_count
+        return ((sub_bucket + 1) << bucket) - 1
+
+    def record(self, ms, count=1):
+        value = int(ms * 1000)
+        if value > self.highest:
+            value = self.highest
+            self.clamped += count
+        elif value < 0:
+            value = 0
+        self.counts[self._index(value)] += count
+        self._add_moments(count, ms, 0.0)
+        if ms < self.min:
+            self.min = ms
+        if ms > self.max:
+            self.max = ms
+
+    def _add_moments(self, count, mean, m2):
+        # Chan et al.'s pairwise update; with count=1 and m2=0 it is Welford's
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def merge(self, other):
+        """Add `other`'s samples to this histogram; both need the same layout"""
+        if (other.significant_figures, other.highest) != (self.significant_figures, self.highest):
+            raise ValueError("histograms have different precision or range")
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        if other.count:
+            self._add_moments(other.count, other._mean, other._m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.clamped += other.clamped
+        return self
+
+    def percentiles(self, pcts=PERCENTILES):
+        """
+        {pct: ms} in one pass over the buckets. Nearest rank: the smallest
+        recorded value that at least pct% of samples do not exceed, to the
+        histogram's precision, never outside [min, max] and never above
+        `highest_ms`, where clamped samples are counted.
+        """
+        if self.count == 0:
+            return {pct: 0.0 for pct in pcts}
+        low = min(float(self.min), self.highest_ms)
+        high = min(float(self.max), self.highest_ms)
+        wanted = sorted((max(1, math.ceil(pct / 100.0 * self.count)), pct) for pct in pcts)
+        values = {}
+        seen = 0
+        position = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while position < len(wanted) and seen >= wanted[position][0]:
+                values[wanted[position][1]] = min(max(self._value(index) / 1000, low), high)
+                position += 1
+            if position == len(wanted):
+                break
+        return values
+
+    def percentile(self, pct):
+        return self.percentiles((pct,))[pct]
+
+    def summary(self):
+        """count, mean, stdev, min, the PERCENTILES as p50 ... p99.9, max"""
+        summary = {"count": self.count, "mean": float(self.mean), "stdev": self.stdev,
+                   "min": float(self.min) if self.count else 0.0}
+        for pct, value in self.percentiles().items():
+            summary[f"p{pct:g}"] = value
+        summary["max"] = float(self.max)
+        return summary
+
+    @property
+    def sum(self):
+        return self._mean * self.count
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def stdev(self):
+        """Sample standard deviation, like statistics.stdev"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
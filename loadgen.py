@@ -0,0 +1,413 @@
+"""
+Open-Loop Load Generator for Chaos Tests
+Sends requests on a fixed arrival schedule from one asyncio event loop,
+whether or not earlier ones have answered, and times each one from when it
+was due rather than when it was sent, so queueing delay is not hidden.
+Past what one process can send, the schedule is sharded over a process
+pool with one event loop per CPU. With a sample store, every request is
+also logged to it, for looking at a run request by request afterwards.
+
+    python loadgen.py http://localhost:5000/api/data --rate 2000 --duration 30 --ramp-up 5
+    python loadgen.py http://localhost:5001/data --rate 20000 --processes 0
+    python loadgen.py http://localhost:5001/data --samples chaos-samples.bin --experiment baseline
+"""
+import os
+import math
+import time
+import bisect
+import random
+import asyncio
+import argparse
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+from histogram import LatencyHistogram
+from samplestore import SampleStore, STATUS_ERROR, STATUS_DROPPED
+
+# Configuration
+LOAD_MAX_IN_FLIGHT = int(os.getenv("LOAD_MAX_IN_FLIGHT", "512"))
+LOAD_TIMEOUT = float(os.getenv("LOAD_TIMEOUT", "10"))
+LOAD_PROCESSES = int(os.getenv("LOAD_PROCESSES", "1"))
+
+# Seconds the workers of a sharded run may take to get ready before the
+# run is abandoned
+READY_TIMEOUT = 60
+
+# Arrivals due sooner than this are sent at once instead of sleeping for them
+SLEEP_GRANULARITY = 0.001
+
+
+class Target:
+    """One endpoint of a traffic mix; `weight` is its share of requests"""
+
+    def __init__(self, name, url, weight=1.0, method="GET", body=None, headers=None):
+        self.name = name
+        self.url = url
+        self.weight = weight
+        self.method = method
+        self.body = body
+        self.headers = headers
+
+
+class Mix:
+    """Weighted random choice among targets"""
+
+    def __init__(self, targets, seed=None):
+        self.targets = list(targets)
+        self.cumulative = []
+        total = 0.0
+        for target in self.targets:
+            total += target.weight
+            self.cumulative.append(total)
+        self.total = total
+        self.rng = random.Random(seed)
+
+    def pick(self):
+        if len(self.targets) == 1:
+            return self.targets[0]
+        index = bisect.bisect_right(self.cumulative, self.rng.random() * self.total)
+        return self.targets[min(index, len(self.targets) - 1)]
+
+
+# Load profiles: lists of (seconds, rate) stages at a constant rate and
+# (seconds, start rate, end rate) stages that ramp linearly
+
+def constant(rate, duration, ramp_up=0.0):
+    """Ramp from 0 to `rate` over `ramp_up` seconds, then hold it for `duration`"""
+    stages = [(ramp_up, 0.0, rate)] if ramp_up > 0 else []
+    return stages + [(duration, rate)]
+
+
+def parse_stages(spec):
+    """Stages from "seconds:rate" and "seconds:from-to" items, e.g. "5:0-1000,30:1000" """
+    stages = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        seconds, _, rates = item.partition(":")
+        start, _, end = rates.partition("-")
+        if end:
+            stages.append((float(seconds), float(start), float(end)))
+        else:
+            stages.append((float(seconds), float(start)))
+    return stages
+
+
+def duration(stages):
+    return sum(stage[0] for stage in stages)
+
+
+def scale(stages, factor):
+    return [(stage[0],) + tuple(rate * factor for rate in stage[1:]) for stage in stages]
+
+
+def schedule(stages, phase=0.0):
+    """
+    Offsets in seconds at which requests are due. Within a stage the rate
+    goes linearly from start to end, so the n-th arrival is where the
+    integral of the rate reaches n (n + `phase`, to interleave shards).
+    """
+    offset = 0.0
+    due = phase  # integral of the rate, from the start of the stage, at the next arrival
+    for stage in stages:
+        seconds, start = stage[0], stage[1]
+        end = stage[2] if len(stage) > 2 else start
+        total = (start + end) / 2 * seconds
+        slope = (end - start) / seconds if seconds > 0 else 0.0
+        while total > 0 and due < total:
+            if slope == 0:
+                t = due / start
+            else:
+                # start * t + slope / 2 * t^2 = due
+                t = (-start + math.sqrt(max(0.0, start * start + 2 * slope * due))) / slope
+            yield offset + t
+            due += 1
+        due = max(0.0, due - total)
+        offset += seconds
+
+
+def arrivals(stages, phase=0.0):
+    """How many requests schedule() makes"""
+    return sum(1 for _ in schedule(stages, phase))
+
+
+class EndpointStats:
+    """Outcomes for one target; `latency` is in ms from the due time"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latency = LatencyHistogram()
+        self.statuses = collections.Counter()
+        self.errors = collections.Counter()
+        self.dropped = 0
+        self.bytes = 0
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.statuses.update(other.statuses)
+        self.errors.update(other.errors)
+        self.dropped += other.dropped
+        self.bytes += other.bytes
+
+    @property
+    def sent(self):
+        return self.latency.count + sum(self.errors.values())
+
+    @property
+    def failed(self):
+        return sum(self.errors.values()) + sum(count for status, count in self.statuses.items()
+                                               if status >= 500)
+
+
+class LoadResult:
+    """
+    What one run did: per-endpoint stats, requests dropped because
+    `max_in_flight` were outstanding, how far the generator itself fell
+    behind its schedule (`max_lag`, seconds) and, for sharded runs, how
+    far apart the shards started (`start_skew`, seconds)
+    """
+
+    def __init__(self, targets, stages):
+        self.endpoints = {target.name: EndpointStats(target.name) for target in targets}
+        self.stages = stages
+        self.scheduled = 0
+        self.elapsed = 0.0
+        self.max_lag = 0.0
+        self.starts = []
+
+    def merge(self, other):
+        """Fold another shard's result of the same run into this one"""
+        for name, stats in other.endpoints.items():
+            self.endpoints[name].merge(stats)
+        self.scheduled += other.scheduled
+        self.elapsed = max(self.elapsed, other.elapsed)
+        self.max_lag = max(self.max_lag, other.max_lag)
+        self.starts += other.starts
+        return self
+
+    def record(self, target, status, seconds, size):
+        stats = self.endpoints[target.name]
+        stats.latency.record(seconds * 1000)
+        stats.statuses[status] += 1
+        stats.bytes += size
+
+    def error(self, target, exc):
+        self.endpoints[target.name].errors[type(exc).__name__] += 1
+
+    def drop(self, target):
+        self.endpoints[target.name].dropped += 1
+
+    @property
+    def start_skew(self):
+        return max(self.starts) - min(self.starts) if self.starts else 0.0
+
+    @property
+    def sent(self):
+        return sum(stats.sent for stats in self.endpoints.values())
+
+    @property
+    def dropped(self):
+        return sum(stats.dropped for stats in self.endpoints.values())
+
+    @property
+    def failed(self):
+        return sum(stats.failed for stats in self.endpoints.values())
+
+    @property
+    def ok(self):
+        return self.sent - self.failed
+
+    def latency(self):
+        """All endpoints' latencies in one histogram"""
+        merged = LatencyHistogram()
+        for stats in self.endpoints.values():
+            merged.merge(stats.latency)
+        return merged
+
+    def summary(self):
+        latency = self.latency()
+        return {
+            "scheduled": self.scheduled,
+            "sent": self.sent,
+            "ok": self.ok,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "rate": self.sent / self.elapsed if self.elapsed > 0 else 0.0,
+            "p50_ms": latency.percentile(50),
+            "p99_ms": latency.percentile(99),
+            "max_ms": latency.max,
+            "max_lag_ms": self.max_lag * 1000,
+            "shards": len(self.starts),
+            "start_skew_ms": self.start_skew * 1000,
+        }
+
+
+async def drive(stages, targets, max_in_flight=LOAD_MAX_IN_FLIGHT, timeout=LOAD_TIMEOUT,
+                seed=None, phase=0.0, ready=None, samples=None):
+    """
+    Run one load profile against a traffic mix. A request due while
+    `max_in_flight` are outstanding is dropped and counted, not delayed:
+    delaying it would let a slow server slow the load down. `ready` is
+    called once the client is set up, just before the first request.
+    `samples`, samplestore Slots with one slot per arrival, gets a record
+    of every request (drops included) in schedule order.
+    """
+    mix = Mix(targets, seed)
+    result = LoadResult(mix.targets, stages)
+    if samples is not None:
+        samples.open()
+        endpoints = samples.endpoints
+
+    def sample(slot, target, status, due, seconds, size=0):
+        samples.write(slot, endpoints[target.name], status, int(due * 1e9), int(seconds * 1e9),
+                      size)
+    connector = aiohttp.TCPConnector(limit=max_in_flight, ttl_dns_cache=300)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        in_flight = 0
+
+        async def one(target, due, slot):
+            nonlocal in_flight
+            try:
+                async with session.request(target.method, target.url, data=target.body,
+                                           headers=target.headers) as resp:
+                    body = await resp.read()
+                seconds = loop.time() - due
+                result.record(target, resp.status, seconds, len(body))
+                if samples is not None:
+                    sample(slot, target, resp.status, due, seconds, len(body))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result.error(target, e)
+                if samples is not None:
+                    sample(slot, target, STATUS_ERROR, due, loop.time() - due)
+            finally:
+                in_flight -= 1
+
+        if ready is not None:
+            ready()
+        result.starts.append(time.time())
+        start = loop.time()
+        for offset in schedule(stages, phase):
+            due = start + offset
+            delay = due - loop.time()
+            if delay > SLEEP_GRANULARITY:
+                await asyncio.sleep(delay)
+            elif -delay > result.max_lag:
+                result.max_lag = -delay
+            slot = result.scheduled
+            result.scheduled += 1
+            target = mix.pick()
+            if in_flight >= max_in_flight:
+                result.drop(target)
+                if samples is not None:
+                    sample(slot, target, STATUS_DROPPED, due, 0.0)
+                continue
+            in_flight += 1
+            task = asyncio.create_task(one(target, due, slot))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        result.elapsed = loop.time() - start
+    if samples is not None:
+        samples.close()
+    return result
+
+
+_barrier = None
+
+
+def _init_shard(barrier):
+    global _barrier
+    _barrier = barrier
+
+
+def _shard(stages, targets, phase, seed, kwargs):
+    # Every shard waits for the others to be ready, so they start together
+    return asyncio.run(drive(stages, targets, seed=seed, phase=phase,
+                             ready=lambda: _barrier.wait(READY_TIMEOUT), **kwargs))
+
+
+def run(stages, targets, processes=LOAD_PROCESSES, seed=None, samples=None,
+        experiment="loadgen", **kwargs):
+    """
+    drive() from synchronous code. With `processes` > 1 (0: one per CPU)
+    each process runs its share of the rate and of `max_in_flight`; their
+    schedules interleave into the full one, start together and end
+    together, and their results merge into one. With `samples`, a
+    SampleStore, every request is logged there as `experiment`; each
+    process writes its own block of the slots reserved for it.
+    """
+    processes = processes or os.cpu_count() or 1
+    names = [target.name for target in targets]
+    if processes == 1:
+        if samples is not None:
+            kwargs["samples"] = samples.reserve(experiment, names, arrivals(stages))
+        return asyncio.run(drive(stages, targets, seed=seed, **kwargs))
+    kwargs["max_in_flight"] = max(1, kwargs.get("max_in_flight", LOAD_MAX_IN_FLIGHT) // processes)
+    shard_stages = scale(stages, 1.0 / processes)
+    slots = [None] * processes
+    if samples is not None:
+        counts = [arrivals(shard_stages, index / processes) for index in range(processes)]
+        slots = samples.reserve(experiment, names, sum(counts)).split(counts)
+    context = multiprocessing.get_context()
+    barrier = context.Barrier(processes)
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=_init_shard,
+                             initargs=(barrier,)) as pool:
+        futures = [pool.submit(_shard, shard_stages, targets, index / processes,
+                               None if seed is None else seed + index,
+                               dict(kwargs, samples=slots[index]))
+                   for index in range(processes)]
+        results = [future.result() for future in futures]
+    merged = results[0]
+    for result in results[1:]:
+        merged.merge(result)
+    merged.stages = stages
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", nargs="+", help="URLs to load, in equal shares")
+    parser.add_argument("--rate", type=float, default=1000, help="requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds at full rate")
+    parser.add_argument("--ramp-up", type=float, default=0, help="seconds from 0 to --rate")
+    parser.add_argument("--stages", help='profile instead of the above, e.g. "5:0-1000,30:1000"')
+    parser.add_argument("--max-in-flight", type=int, default=LOAD_MAX_IN_FLIGHT)
+    parser.add_argument("--timeout", type=float, default=LOAD_TIMEOUT)
+    parser.add_argument("--processes", type=int, default=LOAD_PROCESSES,
+                        help="event loops to shard the load over (0 = one per CPU)")
+    parser.add_argument("--samples", help="sample log to append every request to")
+    parser.add_argument("--experiment", default="loadgen", help="name of the run in --samples")
+    args = parser.parse_args()
+
+    stages = parse_stages(args.stages) if args.stages else constant(args.rate, args.duration,
+                                                                    args.ramp_up)
+    targets = [Target(url, url) for url in args.urls]
+    started = time.time()
+    samples = SampleStore(args.samples) if args.samples else None
+    try:
+        result = run(stages, targets, processes=args.processes, max_in_flight=args.max_in_flight,
+                     timeout=args.timeout, samples=samples, experiment=args.experiment)
+    finally:
+        if samples is not None:
+            samples.close()
+    summary = result.summary()
+    print(f"{summary['sent']} sent in {time.time() - started:.1f}s ({summary['rate']:.0f}/s), "
+          f"{summary['ok']} ok, {summary['failed']} failed, {summary['dropped']} dropped")
+    print(f"p50 {summary['p50_ms']:.2f}ms  p99 {summary['p99_ms']:.2f}ms  "
+          f"max {summary['max_ms']:.2f}ms  generator lag {summary['max_lag_ms']:.1f}ms")
+    if summary["shards"] > 1:
+        print(f"{summary['shards']} shards, started within {summary['start_skew_ms']:.2f}ms")
+    for stats in result.endpoints.values():
+        if len(result.endpoints) > 1:
+            print(f"  {stats.name}: {stats.sent} sent, p50 {stats.latency.percentile(50):.2f}ms"
+                  f" p99 {stats.latency.percentile(99):.2f}ms, statuses {dict(stats.statuses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Per-Request Sample Store for Chaos Runs
+An append-only log of fixed-width binary records, one per request, written
+through a memory-mapped file: when the request was due (monotonic ns),
+experiment, endpoint, status, latency in ns and response bytes. A JSON
+index beside the log names the experiments and endpoints and gives each
+experiment's contiguous range of records, so a reader maps the file and
+hands out NumPy views of any experiment without copying it.
+
+    python samplestore.py chaos-samples.bin
+    python samplestore.py chaos-samples.bin --experiment "04-kernel-panic.yaml/High load"
+"""
+import os
+import json
+import mmap
+import time
+import fcntl
+import struct
+import argparse
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # optional: only reading needs it, writing is plain struct
+    np = None
+
+# Configuration: empty means the chaos scripts keep no per-request log
+SAMPLES_PATH = os.getenv("SAMPLES_PATH", "")
+
+MAGIC = b"CHAOSLOG"
+VERSION = 1
+
+# magic, version, record size, records in use; records start at HEADER_SIZE
+HEADER = struct.Struct("<8sHHQ")
+HEADER_SIZE = 64
+
+# due time ns, latency ns, response bytes, experiment, endpoint, status, shard
+RECORD = struct.Struct("<qqQHHHH")
+RECORD_SIZE = RECORD.size
+FIELDS = ("ts", "latency", "bytes", "experiment", "endpoint", "status", "shard")
+
+# Statuses that are not HTTP statuses
+STATUS_ERROR = 0    # connection error or timeout; latency is the time until it failed
+STATUS_DROPPED = 1  # never sent (the load generator's in-flight cap); latency is 0
+
+# Records the file grows by when an appended experiment fills it
+GROWTH = 1 << 16
+
+MAX_ID = 0xFFFF
+
+
+class Slots:
+    """
+    A reserved run of `count` records, written by position. Several
+    processes may write disjoint Slots of one experiment at once: split()
+    one per shard and each opens its own mapping of the log. Slots no one
+    wrote stay all zeros (ts 0).
+    """
+
+    def __init__(self, path, experiment, endpoints, start, count, shard=0):
+        self.path = path
+        self.experiment = experiment
+        self.endpoints = endpoints  # name -> endpoint ID
+        self.start = start
+        self.count = count
+        self.shard = shard
+        self._map = None
+
+    def split(self, counts):
+        """Consecutive Slots of these sizes, numbered as shards 0, 1, ..."""
+        if sum(counts) != self.count:
+            raise ValueError(f"shards hold {sum(counts)} records, not {self.count}")
+        slots = []
+        start = self.start
+        for shard, count in enumerate(counts):
+            slots.append(Slots(self.path, self.experiment, self.endpoints, start, count, shard))
+            start += count
+        return slots
+
+    def open(self):
+        if self._map is None:
+            self._base = HEADER_SIZE + self.start * RECORD_SIZE
+            with open(self.path, "r+b") as f:
+                self._map = mmap.mmap(f.fileno(), self._base + self.count * RECORD_SIZE)
+            self._pack = RECORD.pack_into
+        return self
+
+    def write(self, slot, endpoint, status, ts, latency, size=0):
+        """Fill record `slot` (0 ... count - 1); ts and latency in ns"""
+        if not 0 <= slot < self.count:
+            raise IndexError(f"slot {slot} outside 0 ... {self.count - 1}")
+        self._pack(self._map, self._base + slot * RECORD_SIZE, ts, latency, size,
+                   self.experiment, endpoint, status, self.shard)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_map"] = None
+        state.pop("_pack", None)
+        return state
+
+
+class Recording:
+    """
+    An experiment of unknown length, appended to by the process that owns
+    the store. Not thread-safe: append from one thread.
+    """
+
+    def __init__(self, store, entry):
+        self.store = store
+        self.entry = entry
+        self.experiment = entry["id"]
+        self.stop = entry["start"]
+        self._map = store._map
+        self._capacity = store.capacity
+        self._pack = RECORD.pack_into
+
+    def endpoint(self, name):
+        return self.store.endpoint_id(name)
+
+    def append(self, endpoint, status, latency, size=0, ts=None):
+        """Add one record; latency in ns, ts defaults to now minus latency"""
+        if self.stop == self._capacity:
+            self.store._ensure(self.stop + 1)
+            self._map = self.store._map
+            self._capacity = self.store.capacity
+        if ts is None:
+            ts = time.monotonic_ns() - latency
+        self._pack(self._map, HEADER_SIZE + self.stop * RECORD_SIZE, ts, latency, size,
+                   self.experiment, endpoint, status, 0)
+        self.stop += 1
+
+    def end(self):
+        self.store._end(self)
+
+    def __len__(self):
+        return self.stop - self.entry["start"]
+
+
+class SampleStore:
+    """
+    Writer side of a log. One process owns it (an exclusive lock on the
+    file); it reserves Slots for runs of known length, which any process
+    may fill, or begins one Recording at a time to append to. Opening an
+    existing log appends new experiments after the old ones.
+    """
+
+    def __init__(self, path, growth=GROWTH):
+        self.path = path
+        self.index_path = path + ".json"
+        self.growth = growth
+        self._file = open(path, "a+b")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._file.close()
+            raise RuntimeError(f"{path} is already open for writing") from None
+        self._file.seek(0)
+        header = self._file.read(HEADER.size)
+        if header:
+            magic, version, record_size, self.count = HEADER.unpack(header)
+            if (magic, version, record_size) != (MAGIC, VERSION, RECORD_SIZE):
+                self._file.close()
+                raise ValueError(f"{path} is not a version {VERSION} sample log")
+        else:
+            self.count = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"version": VERSION, "endpoints": [], "experiments": []}
+        self._endpoints = {name: i for i, name in enumerate(self.index["endpoints"])}
+        self._map = None
+        self.capacity = 0
+        self._recording = None
+        self._ensure(self.count)
+        self._commit()
+
+    def _ensure(self, records):
+        """Grow the file and its mapping to hold at least `records`"""
+        if records <= self.capacity and self._map is not None:
+            return
+        capacity = max(records, self.capacity + self.growth)
+        os.ftruncate(self._file.fileno(), HEADER_SIZE + capacity * RECORD_SIZE)
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), HEADER_SIZE + capacity * RECORD_SIZE)
+        self.capacity = capacity
+
+    def _commit(self):
+        """Write the header and the index; the index is replaced atomically"""
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD_SIZE, self.count)
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(temporary, self.index_path)
+
+    def endpoint_id(self, name):
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            endpoint = len(self.index["endpoints"])
+            if endpoint > MAX_ID:
+                raise ValueError(f"a log holds at most {MAX_ID + 1} endpoints")
+            self.index["endpoints"].append(name)
+            self._endpoints[name] = endpoint
+        return endpoint
+
+    def _begin(self, name, endpoints):
+        if self._recording is not None:
+            raise RuntimeError(f"experiment {self._recording.entry['name']!r} is still recording")
+        experiment = len(self.index["experiments"])
+        if experiment > MAX_ID:
+            raise ValueError(f"a log holds at most {MAX_ID + 1} experiments")
+        for endpoint in endpoints:
+            self.endpoint_id(endpoint)
+        entry = {"id": experiment, "name": name, "start": self.count, "stop": self.count,
+                 "started": time.time(), "started_ns": time.monotonic_ns()}
+        self.index["experiments"].append(entry)
+        return entry
+
+    def reserve(self, name, endpoints, count):
+        """Slots for an experiment of exactly `count` requests"""
+        entry = self._begin(name, endpoints)
+        self._ensure(self.count + count)
+        self.count = entry["stop"] = self.count + count
+        self._commit()
+        return Slots(self.path, entry["id"], {name: self._endpoints[name] for name in endpoints},
+                     entry["start"], count)
+
+    def begin(self, name, endpoints=()):
+        """A Recording to append an experiment's requests to until end()"""
+        self._recording = Recording(self, self._begin(name, endpoints))
+        self._commit()
+        return self._recording
+
+    def _end(self, recording):
+        if recording is self._recording:
+            self.count = recording.entry["stop"] = recording.stop
+            self._recording = None
+            self._commit()
+
+    def close(self):
+        if self._map is None:
+            return
+        if self._recording is not None:
+            self._recording.end()
+        self._map.close()
+        self._map = None
+        # Give back the unused tail that growth preallocated
+        os.ftruncate(self._file.fileno(), HEADER_SIZE + self.count * RECORD_SIZE)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _dtype():
+    return np.dtype({"names": list(FIELDS),
+                     "formats": ["<i8", "<i8", "<u8", "<u2", "<u2", "<u2", "<u2"]})
+
+
+def stats(records):
+    """
+    (requests, failed, dropped, p50 ms, p99 ms, max ms) of some records;
+    errors and 5xx count as failed, the latencies leave out errors and
+    drops, and slots never written are not requests
+    """
+    records = records[records["ts"] > 0]
+    status = records["status"]
+    answered = records["latency"][status >= 100] / 1e6
+    p50, p99, high = ((*np.percentile(answered, (50, 99)).tolist(), float(answered.max()))
+                      if len(answered) else (0.0, 0.0, 0.0))
+    return (len(records), int(np.count_nonzero((status == STATUS_ERROR) | (status >= 500))),
+            int(np.count_nonzero(status == STATUS_DROPPED)), p50, p99, high)
+
+
+class SampleReader:
+    """
+    Read side of a log: `records` is a read-only NumPy structured array
+    over the mapped file (fields as in FIELDS), and experiment() returns
+    slices of it, so nothing is copied until it is computed on. Readers
+    may open a log while it is being written; they see the records its
+    header counted when they opened it.
+    """
+
+    def __init__(self, path):
+        if np is None:
+            raise ImportError("reading sample logs needs numpy")
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count = HEADER.unpack_from(self._map)
+        if (magic, version, record_size) != (MAGIC, VERSION, RECORD_SIZE):
+            raise ValueError(f"{path} is not a version {VERSION} sample log")
+        count = min(count, (len(self._map) - HEADER_SIZE) // RECORD_SIZE)
+        self.records = np.frombuffer(self._map, dtype=_dtype(), count=count, offset=HEADER_SIZE)
+        with open(path + ".json") as f:
+            index = json.load(f)
+        self.endpoints = index["endpoints"]
+        self.experiments = [entry for entry in index["experiments"] if entry["start"] < count]
+
+    def entry(self, experiment):
+        """Index entry by ID, or by name (the latest experiment of that name)"""
+        if isinstance(experiment, int):
+            return self.experiments[experiment]
+        for entry in reversed(self.experiments):
+            if entry["name"] == experiment:
+                return entry
+        raise KeyError(experiment)
+
+    def experiment(self, experiment):
+        """The experiment's records, a view into the file"""
+        entry = self.entry(experiment)
+        return self.records[entry["start"]:min(entry["stop"], len(self.records))]
+
+    def endpoint(self, records, name):
+        return records[records["endpoint"] == self.endpoints.index(name)]
+
+    def windows(self, experiment, seconds=1.0):
+        """
+        An experiment's stats() per window of due time: rows of (offset in
+        seconds, requests, failed, dropped, p50 ms, p99 ms, max ms)
+        """
+        records = self.experiment(experiment)
+        records = records[records["ts"] > 0]  # unwritten slots
+        if not len(records):
+            return []
+        records = records[np.argsort(records["ts"], kind="stable")]
+        window = (records["ts"] - records["ts"][0]) // int(seconds * 1e9)
+        starts = np.flatnonzero(np.diff(window, prepend=-1))
+        return [(int(window[start]) * seconds,) + stats(part)
+                for start, part in zip(starts, np.split(records, starts[1:]))]
+
+    def close(self):
+        self.records = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # views handed out still use it; it closes when they go
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=SAMPLES_PATH,
+                        help="sample log (default: SAMPLES_PATH)")
+    parser.add_argument("--experiment", help="name or ID of an experiment to break down over time")
+    parser.add_argument("--window", type=float, default=1.0, help="seconds per breakdown row")
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("give the sample log's path or set SAMPLES_PATH")
+
+    with SampleReader(args.path) as reader:
+        if args.experiment is None:
+            print(f"{len(reader.records)} records, {len(reader.experiments)} experiments")
+            print(f"  {'id':>4}  {'started':<19}{'requests':>10}{'failed':>8}{'dropped':>8}"
+                  f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}  name")
+            for entry in reader.experiments:
+                requests, failed, dropped, p50, p99, high = stats(reader.experiment(entry["id"]))
+                started = datetime.fromtimestamp(entry["started"]).isoformat(" ", "seconds")
+                print(f"  {entry['id']:>4}  {started:<19}{requests:>10}{failed:>8}{dropped:>8}"
+                      f"{p50:>9.2f}{p99:>9.2f}{high:>9.2f}  {entry['name']}")
+            return
+        experiment = int(args.experiment) if args.experiment.isdigit() else args.experiment
+        entry = reader.entry(experiment)
+        print(f"{entry['name']}: {entry['stop'] - entry['start']} records, "
+              f"{args.window:g}s windows")
+        print(f"  {'at s':>8}{'requests':>10}{'failed':>8}{'dropped':>8}"
+              f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for offset, requests, failed, dropped, p50, p99, high in reader.windows(experiment,
+                                                                               args.window):
+            print(f"  {offset:>8.1f}{requests:>10}{failed:>8}{dropped:>8}"
+                  f"{p50:>9.2f}{p99:>9.2f}{high:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,33 @@ Tests chaos scenarios against Docker running services
 """
 import requests
 import time
-import statistics
+import argparse
 from datetime import datetime
-import random
-import subprocess
+
+import loadgen
+from histogram import LatencyHistogram, PERCENTILES
+from samplestore import SampleStore, SAMPLES_PATH
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+ECHO_BODY = b'{"message": "chaos", "values": [1, 2, 3]}'
 
 class DockerChaosTest:
-    def __init__(self):
+    def __init__(self, rate=500, duration=10, ramp_up=2, max_in_flight=loadgen.LOAD_MAX_IN_FLIGHT,
+                 frontend_url="http://localhost:5000", backend_url="http://localhost:5001",
+                 processes=loadgen.LOAD_PROCESSES, samples=None):
         self.results = {}
-        self.frontend_url = "http://localhost:5000"
-        self.backend_url = "http://localhost:5001"
+        self.frontend_url = frontend_url
+        self.backend_url = backend_url
+        # Open-loop load per phase: requests per second, seconds, ramp-up seconds
+        self.rate = rate
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.max_in_flight = max_in_flight
+        # Load generator processes, each with its own event loop (0 = one per CPU)
+        self.processes = processes
+        # Per-request log every phase is appended to, one experiment per phase
+        self.samples = samples
+        self.scenario = None
     
     def verify_services(self):
         """Verify Docker services are running"""
@@ -36,30 +53,45 @@ class DockerChaosTest:
         
         return all_healthy
     
+    def run_phase(self, label, targets, rate=None, duration=None, ramp_up=None):
+        """Drive one open-loop load phase and print what it did"""
+        rate = self.rate if rate is None else rate
+        duration = self.duration if duration is None else duration
+        ramp_up = self.ramp_up if ramp_up is None else ramp_up
+        print(f"  {label}: {rate:.0f} req/s for {duration:.0f}s"
+              + (f" after a {ramp_up:.0f}s ramp-up" if ramp_up else ""))
+        result = loadgen.run(loadgen.constant(rate, duration, ramp_up), targets,
+                             processes=self.processes, max_in_flight=self.max_in_flight,
+                             samples=self.samples, experiment=f"{self.scenario}/{label}")
+        summary = result.summary()
+        print(f"    Sent {summary['sent']} ({summary['rate']:.0f}/s): {summary['ok']} ok, "
+              f"{summary['failed']} failed, {summary['dropped']} dropped at the in-flight cap")
+        for stats in result.endpoints.values():
+            print(f"    {stats.name:<18} p50 {stats.latency.percentile(50):>8.2f}ms  "
+                  f"p99 {stats.latency.percentile(99):>8.2f}ms  "
+                  f"max {stats.latency.max:>8.2f}ms")
+        if summary["shards"] > 1:
+            print(f"    {summary['shards']} load processes, started within "
+                  f"{summary['start_skew_ms']:.2f}ms")
+        if summary["max_lag_ms"] > 100:
+            print(f"    ⚠ Load generator fell {summary['max_lag_ms']:.0f}ms behind schedule")
+        return result
+    
     def test_01_dns_chaos(self):
         """Simulate DNS chaos by adding network delay"""
         print("\n🌐 Test 1: DNS Chaos (01-dns-chaos.yaml)")
         print("-" * 60)
+        self.scenario = "01-dns-chaos.yaml"
         print("  Scenario: Network delay between frontend and backend")
         
-        latencies = []
-        
-        # Add iptables rule to simulate DNS delay (if linux)
-        # For Windows Docker, just simulate with sleep
-        
-        print("  Simulating DNS resolution delay...")
-        for i in range(10):
-            start = time.time()
-            try:
-                # Frontend calls backend through network
-                resp = requests.get(f"{self.frontend_url}/api/data", timeout=10)
-                latency = (time.time() - start) * 1000
-                latencies.append(latency)
-                print(f"    Request {i+1}: {latency:.2f}ms")
-            except Exception as e:
-                print(f"    Request {i+1}: ERROR")
+        # Both routes resolve and call the backend
+        result = self.run_phase("Frontend → backend calls", [
+            loadgen.Target("/api/data", f"{self.frontend_url}/api/data", weight=8),
+            loadgen.Target("/api/chain", f"{self.frontend_url}/api/chain", weight=2),
+        ])
         
-        avg = statistics.mean(latencies) if latencies else 0
+        latencies = result.latency()
+        avg = latencies.mean
         print(f"  ✓ Average: {avg:.2f}ms")
         self.results["01-dns-chaos.yaml"] = latencies
         return latencies
@@ -68,31 +100,20 @@ class DockerChaosTest:
         """Test network packet loss"""
         print("\n📡 Test 2: Advanced Network Chaos (02-advanced-network-chaos.yaml)")
         print("-" * 60)
-        print("  Scenario: Simulating packet loss and bandwidth limits")
+        self.scenario = "02-advanced-network-chaos.yaml"
+        print("  Scenario: Packet loss and bandwidth limits")
         
-        latencies = []
-        success = 0
-        failures = 0
+        result = self.run_phase("Small and large bodies", [
+            loadgen.Target("/data", f"{self.backend_url}/data", weight=6),
+            loadgen.Target("/data 64KB", f"{self.backend_url}/data?size=65536", weight=2),
+            loadgen.Target("POST /echo", f"{self.backend_url}/echo", weight=2, method="POST",
+                           body=ECHO_BODY, headers=JSON_HEADERS),
+        ])
         
-        print("  Testing with network stress...")
-        for i in range(20):
-            # Simulate packet loss
-            if random.random() > 0.30:  # 30% loss rate
-                try:
-                    start = time.time()
-                    resp = requests.get(f"{self.backend_url}/data", timeout=5)
-                    latency = (time.time() - start) * 1000
-                    latencies.append(latency)
-                    success += 1
-                    print(f"    Request {i+1}: ✓ ({latency:.2f}ms)")
-                except:
-                    failures += 1
-            else:
-                failures += 1
-                print(f"    Request {i+1}: ✗ (simulated loss)")
-        
-        success_rate = (success / 20) * 100
+        attempted = result.scheduled
+        success_rate = (result.ok / attempted * 100) if attempted else 0
         print(f"  ✓ Success Rate: {success_rate:.1f}%")
+        latencies = result.latency()
         self.results["02-advanced-network-chaos.yaml"] = latencies
         return latencies
     
@@ -100,26 +121,22 @@ class DockerChaosTest:
         """Test system time chaos effects"""
         print("\n⏰ Test 3: Time Chaos (03-time-chaos.yaml)")
         print("-" * 60)
+        self.scenario = "03-time-chaos.yaml"
         print("  Scenario: Clock skew and time jump effects")
         
-        latencies = []
+        print("  Checking timestamp consistency...")
+        try:
+            ts = requests.get(f"{self.backend_url}/data", timeout=5).json().get('timestamp', 0)
+            print(f"    Backend clock vs this host: {ts - time.time():+.3f}s")
+        except Exception:
+            print("    Backend timestamp: ERROR")
         
-        print("  Testing timestamp consistency...")
-        for i in range(10):
-            try:
-                start = time.time()
-                resp = requests.get(f"{self.backend_url}/data", timeout=5)
-                data = resp.json()
-                latency = (time.time() - start) * 1000
-                latencies.append(latency)
-                
-                # Check timestamp in response
-                ts = data.get('timestamp', 0)
-                print(f"    Request {i+1}: {latency:.2f}ms (TS: {ts})")
-            except Exception as e:
-                print(f"    Request {i+1}: ERROR")
+        result = self.run_phase("Timestamped responses", [
+            loadgen.Target("/data", f"{self.backend_url}/data"),
+        ])
         
-        avg = statistics.mean(latencies) if latencies else 0
+        latencies = result.latency()
+        avg = latencies.mean
         print(f"  ✓ Average: {avg:.2f}ms")
         self.results["03-time-chaos.yaml"] = latencies
         return latencies
@@ -128,43 +145,24 @@ class DockerChaosTest:
         """Stress test containers"""
         print("\n💥 Test 4: Kernel Panic / Resource Exhaustion (04-kernel-panic.yaml)")
         print("-" * 60)
+        self.scenario = "04-kernel-panic.yaml"
         print("  Scenario: High load on containers")
         
-        latencies = []
-        
-        print("  Baseline (low load):")
-        baseline = []
-        for i in range(3):
-            start = time.time()
-            try:
-                resp = requests.get(f"{self.backend_url}/health", timeout=5)
-                latency = (time.time() - start) * 1000
-                baseline.append(latency)
-                latencies.append(latency)
-                print(f"    Request {i+1}: {latency:.2f}ms")
-            except:
-                pass
+        health = loadgen.Target("/health", f"{self.backend_url}/health")
+        baseline = self.run_phase("Baseline (low load)", [health],
+                                  rate=max(1.0, self.rate / 20), ramp_up=0)
+        stressed = self.run_phase("High load", [
+            loadgen.Target("/data", f"{self.backend_url}/data", weight=8),
+            loadgen.Target("/health", f"{self.backend_url}/health", weight=2),
+        ])
         
-        baseline_avg = statistics.mean(baseline) if baseline else 0
+        # Compare the same endpoint with and without load
+        baseline_p50 = baseline.endpoints["/health"].latency.percentile(50)
+        stressed_p50 = stressed.endpoints["/health"].latency.percentile(50)
+        degradation = ((stressed_p50 - baseline_p50) / baseline_p50 * 100) if baseline_p50 > 0 else 0
         
-        print("  High load:")
-        stressed = []
-        for i in range(3):
-            start = time.time()
-            try:
-                # Simulate high load with multiple concurrent requests
-                resp = requests.get(f"{self.backend_url}/data", timeout=5)
-                latency = (time.time() - start) * 1000
-                stressed.append(latency)
-                latencies.append(latency)
-                print(f"    Request {i+1}: {latency:.2f}ms")
-            except:
-                pass
-        
-        stressed_avg = statistics.mean(stressed) if stressed else 0
-        degradation = ((stressed_avg - baseline_avg) / baseline_avg * 100) if baseline_avg > 0 else 0
-        
-        print(f"  ✓ Performance degradation: {degradation:.1f}%")
+        print(f"  ✓ /health p50 degradation under load: {degradation:.1f}%")
+        latencies = baseline.latency().merge(stressed.latency())
         self.results["04-kernel-panic.yaml"] = latencies
         return latencies
     
@@ -172,45 +170,25 @@ class DockerChaosTest:
         """Test cascading failures"""
         print("\n🔗 Test 5: Advanced Workflows (05-advanced-workflows.yaml)")
         print("-" * 60)
+        self.scenario = "05-advanced-workflows.yaml"
         print("  Scenario: Sequential chaos cascade")
         
-        latencies = []
-        
-        print("  Phase 1: Normal operation")
-        for i in range(3):
-            try:
-                start = time.time()
-                resp = requests.get(f"{self.frontend_url}/api/data", timeout=5)
-                latency = (time.time() - start) * 1000
-                latencies.append(latency)
-                print(f"    Request {i+1}: ✓ ({latency:.2f}ms)")
-            except:
-                print(f"    Request {i+1}: ✗")
-        
-        print("  Phase 2: Service degradation")
-        for i in range(3):
-            try:
-                start = time.time()
-                time.sleep(0.2)  # Simulate slow backend
-                resp = requests.get(f"{self.backend_url}/data", timeout=5)
-                latency = (time.time() - start) * 1000
-                latencies.append(latency)
-                print(f"    Request {i+1}: ⚠ ({latency:.2f}ms)")
-            except:
-                print(f"    Request {i+1}: ✗")
-        
-        print("  Phase 3: Monitoring/Recovery")
-        for i in range(3):
-            try:
-                start = time.time()
-                resp = requests.get(f"{self.frontend_url}/health", timeout=5)
-                latency = (time.time() - start) * 1000
-                latencies.append(latency)
-                print(f"    Check {i+1}: ✓ ({latency:.2f}ms)")
-            except:
-                print(f"    Check {i+1}: ✗")
+        normal = self.run_phase("Phase 1: Normal operation", [
+            loadgen.Target("/api/data", f"{self.frontend_url}/api/data", weight=7),
+            loadgen.Target("POST /api/process", f"{self.frontend_url}/api/process", weight=2,
+                           method="POST", body=ECHO_BODY, headers=JSON_HEADERS),
+            loadgen.Target("/health", f"{self.frontend_url}/health", weight=1),
+        ])
+        degraded = self.run_phase("Phase 2: Service degradation", [
+            loadgen.Target("/api/data", f"{self.frontend_url}/api/data", weight=7),
+            loadgen.Target("/api/slow", f"{self.frontend_url}/api/slow?delay=0.2", weight=3),
+        ], ramp_up=0)
+        recovery = self.run_phase("Phase 3: Monitoring/Recovery", [
+            loadgen.Target("/health", f"{self.frontend_url}/health"),
+        ], rate=max(1.0, self.rate / 20), ramp_up=0)
         
-        avg = statistics.mean(latencies) if latencies else 0
+        latencies = normal.latency().merge(degraded.latency()).merge(recovery.latency())
+        avg = latencies.mean
         print(f"  ✓ Average: {avg:.2f}ms")
         self.results["05-advanced-workflows.yaml"] = latencies
         return latencies
@@ -225,42 +203,42 @@ class DockerChaosTest:
         print(f"Backend: {self.backend_url}")
         print("=" * 80)
         
-        total_latencies = []
+        total_latencies = LatencyHistogram()
         
         for test_name in sorted(self.results.keys()):
             latencies = self.results[test_name]
             if latencies:
-                avg = statistics.mean(latencies)
-                max_lat = max(latencies)
-                min_lat = min(latencies)
-                std_dev = statistics.stdev(latencies) if len(latencies) > 1 else 0
-                
-                total_latencies.extend(latencies)
+                stats = latencies.summary()
+                total_latencies.merge(latencies)
                 
                 print(f"\n📊 {test_name}")
-                print(f"   Average: {avg:.2f}ms")
-                print(f"   Max: {max_lat:.2f}ms")
-                print(f"   Min: {min_lat:.2f}ms")
-                print(f"   StdDev: {std_dev:.2f}ms")
-                print(f"   Samples: {len(latencies)}")
+                print(f"   Average: {stats['mean']:.2f}ms")
+                print(f"   Max: {stats['max']:.2f}ms")
+                print(f"   Min: {stats['min']:.2f}ms")
+                print(f"   StdDev: {stats['stdev']:.2f}ms")
+                print(f"   P99: {stats['p99']:.2f}ms")
+                print(f"   Samples: {stats['count']}")
         
         if total_latencies:
             print("\n" + "=" * 80)
             print("📈 OVERALL STATISTICS")
             print("=" * 80)
-            sorted_lat = sorted(total_latencies)
-            print(f"Total Requests: {len(total_latencies)}")
-            print(f"Average Latency: {statistics.mean(total_latencies):.2f}ms")
-            print(f"Median Latency: {statistics.median(total_latencies):.2f}ms")
-            idx_99 = max(0, int(len(sorted_lat) * 0.99) - 1)
-            idx_95 = max(0, int(len(sorted_lat) * 0.95) - 1)
-            print(f"P99 Latency: {sorted_lat[idx_99]:.2f}ms")
-            print(f"P95 Latency: {sorted_lat[idx_95]:.2f}ms")
-            print(f"Max Latency: {max(total_latencies):.2f}ms")
+            stats = total_latencies.summary()
+            print(f"Total Requests: {stats['count']}")
+            print(f"Average Latency: {stats['mean']:.2f}ms")
+            for pct in PERCENTILES:
+                label = "Median" if pct == 50 else f"P{pct:g}"
+                print(f"{label} Latency: {stats[f'p{pct:g}']:.2f}ms")
+            print(f"Max Latency: {stats['max']:.2f}ms")
         
         print("\n" + "=" * 80)
         print("✅ TEST SUITE COMPLETED")
         print("=" * 80)
+        if self.samples is not None:
+            print(f"\nPer-request samples ({self.samples.count} in the log so far):")
+            print(f"  python samplestore.py {self.samples.path}")
+            print(f"  python samplestore.py {self.samples.path} "
+                  f"--experiment \"04-kernel-panic.yaml/High load\" --window 1")
         print(f"\nDocker images:")
         print("  - chaos-mesh-demo-frontend:latest")
         print("  - chaos-mesh-demo-backend:latest")
@@ -271,15 +249,32 @@ class DockerChaosTest:
         print("  docker-compose down")
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=500, help="requests per second per phase")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per phase")
+    parser.add_argument("--ramp-up", type=float, default=2, help="seconds from 0 to --rate")
+    parser.add_argument("--max-in-flight", type=int, default=loadgen.LOAD_MAX_IN_FLIGHT)
+    parser.add_argument("--processes", type=int, default=loadgen.LOAD_PROCESSES,
+                        help="load generator processes (0 = one per CPU)")
+    parser.add_argument("--frontend", default="http://localhost:5000")
+    parser.add_argument("--backend", default="http://localhost:5001")
+    parser.add_argument("--samples", default=SAMPLES_PATH,
+                        help="log to append every request to (default: SAMPLES_PATH, "
+                             "none when empty)")
+    args = parser.parse_args()
+    
     print("\n" + "=" * 80)
     print("CHAOS ENGINEERING - DOCKER CONTAINERS TEST")
     print("=" * 80)
     print("Testing 5 chaos experiments against Docker running services")
+    print(f"Open-loop load: {args.rate:.0f} req/s per phase, {args.duration:.0f}s each")
     print("=" * 80)
     
-    tester = DockerChaosTest()
-    
+    samples = None
     try:
+        samples = SampleStore(args.samples) if args.samples else None
+        tester = DockerChaosTest(args.rate, args.duration, args.ramp_up, args.max_in_flight,
+                                 args.frontend, args.backend, args.processes, samples)
         if not tester.verify_services():
             print("\n⚠️  Some services are not responding")
             print("Make sure Docker containers are running: docker-compose up -d")
@@ -301,6 +296,9 @@ def main():
         print(f"\n\n❌ Error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if samples is not None:
+            samples.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,11 @@
+"""
+Test setup: the demo's modules live flat in app/, as the services run them
+"""
+import os
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+os.environ.setdefault("LOG_ACCESS", "false")
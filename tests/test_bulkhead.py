@@ -0,0 +1,86 @@
+"""
+Bulkhead sizing: with serve.py's minimum thread count, /health still
+answers while every other route group is full, queues included
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from werkzeug.serving import ThreadedWSGIServer
+
+import app as frontend
+import serve
+
+
+class PooledServer(ThreadedWSGIServer):
+    """WSGI server with a fixed number of request threads, like gunicorn gthread"""
+
+    def __init__(self, wsgi_app, threads):
+        super().__init__("127.0.0.1", 0, wsgi_app)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+@pytest.fixture
+def blocked(monkeypatch):
+    """Make every non-health route hold its thread until the event is set"""
+    release = threading.Event()
+
+    def hold(*args, **kwargs):
+        release.wait(30)
+        return "", 204
+
+    for endpoint, group in frontend.ROUTE_GROUPS.items():
+        if group != "health":
+            monkeypatch.setitem(frontend.app.view_functions, endpoint, hold)
+    # Queued requests must stay queued for the length of the test
+    for bulkhead in frontend.bulkheads.values():
+        monkeypatch.setattr(bulkhead, "queue_timeout", 30)
+    monkeypatch.setattr(frontend.limiter, "limit", frontend.limiter.max_limit)
+    monkeypatch.setattr(frontend.limiter, "queue_timeout", 30)
+    yield release
+    release.set()
+
+
+def saturated(bulkhead):
+    return bulkhead.in_flight == bulkhead.size and bulkhead.queued == bulkhead.queue_size
+
+
+def test_min_threads_reserves_every_other_group():
+    bulkheads = frontend.bulkheads
+    others = sum(b.size + b.queue_size for name, b in bulkheads.items() if name != "health")
+    assert serve.min_threads("frontend") == others + bulkheads["health"].size
+
+
+def test_health_answers_while_other_groups_are_full(blocked):
+    paths = {"cheap": "/", "dependent": "/api/data", "slow": "/api/slow"}
+    others = {name: b for name, b in frontend.bulkheads.items() if name != "health"}
+    assert set(others) == set(paths)
+
+    server = PooledServer(frontend.app, serve.min_threads("frontend"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    total = sum(b.size + b.queue_size for b in others.values())
+    clients = ThreadPoolExecutor(max_workers=total)
+    try:
+        for name, bulkhead in others.items():
+            for _ in range(bulkhead.size + bulkhead.queue_size):
+                clients.submit(requests.get, url + paths[name], timeout=30)
+        for _ in range(200):
+            if all(saturated(b) for b in others.values()):
+                break
+            blocked.wait(0.05)
+        assert all(saturated(b) for b in others.values()), \
+            {name: b.snapshot() for name, b in others.items()}
+
+        response = requests.get(url + "/health", timeout=5)
+        assert response.status_code == 200
+    finally:
+        blocked.set()
+        clients.shutdown(wait=True)
+        server.shutdown()
+        server.server_close()
+        server.pool.shutdown(wait=True)
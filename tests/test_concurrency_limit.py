@@ -0,0 +1,67 @@
+"""
+Adaptive limiter hooks: gated routes take a slot, exempt routes and
+unknown paths do not, and a full limiter sheds with 503
+"""
+import threading
+
+import pytest
+from flask import Flask
+
+import concurrency_limit
+from concurrency_limit import AdaptiveLimiter
+
+
+@pytest.fixture
+def limited():
+    app = Flask(__name__)
+    limiter = AdaptiveLimiter(initial=1, min_limit=1, queue_size=0)
+    release = threading.Event()
+
+    @app.route("/gated")
+    def gated():
+        release.wait(5)
+        return "ok"
+
+    @app.route("/health")
+    def health():
+        return "ok"
+
+    concurrency_limit.init_app(app, limiter, exempt={"health"})
+    release.set()
+    return app, limiter, release
+
+
+def test_gated_route_takes_a_slot(limited):
+    app, limiter, _ = limited
+    assert app.test_client().get("/gated").status_code == 200
+    assert limiter.stats["admitted"] == 1
+    assert limiter.in_flight == 0
+    assert "gated" in limiter.baselines
+
+
+def test_exempt_and_unknown_paths_skip_the_limiter(limited):
+    app, limiter, _ = limited
+    client = app.test_client()
+    assert client.get("/health").status_code == 200
+    assert client.get("/no-such-page").status_code == 404
+    assert limiter.stats["admitted"] == 0
+    assert limiter.baselines == {}
+
+
+def test_full_limiter_sheds(limited):
+    app, limiter, release = limited
+    release.clear()
+    first = threading.Thread(target=app.test_client().get, args=("/gated",))
+    first.start()
+    while limiter.in_flight == 0:
+        release.wait(0.001)
+    try:
+        response = app.test_client().get("/gated")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"]
+        # 404s never queue behind the slot
+        assert app.test_client().get("/no-such-page").status_code == 404
+    finally:
+        release.set()
+        first.join(5)
+    assert limiter.stats["rejected_queue_full"] == 1
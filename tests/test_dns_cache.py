@@ -0,0 +1,129 @@
+"""
+DNS cache: stale answers while the resolver fails, suspicious answers
+rejected, and a changed answer adopted only once it has been confirmed
+"""
+import time
+import socket
+
+import pytest
+
+import dns_cache
+from dns_cache import DNSCache
+
+HOST, PORT = "backend-service", 5001
+
+
+class Resolver:
+    """getaddrinfo() stand-in answering `ip`, or failing when ip is None"""
+
+    def __init__(self, ip="10.0.0.1"):
+        self.ip = ip
+        self.calls = 0
+
+    def __call__(self, host, port):
+        self.calls += 1
+        if self.ip is None:
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (self.ip, port))]
+
+
+def ips(addresses):
+    return [address[4][0] for address in addresses]
+
+
+def wait_for_refresh(cache):
+    for _ in range(100):
+        with cache._lock:
+            if not cache._refreshing:
+                return
+        time.sleep(0.01)
+    raise AssertionError("background refresh did not finish")
+
+
+def test_fresh_answer_is_served_from_cache():
+    resolver = Resolver()
+    cache = DNSCache(resolver, ttl=60)
+    assert ips(cache.resolve(HOST, PORT)) == ["10.0.0.1"]
+    assert ips(cache.resolve(HOST, PORT)) == ["10.0.0.1"]
+    assert resolver.calls == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_stale_answer_served_while_resolver_fails():
+    resolver = Resolver()
+    cache = DNSCache(resolver, ttl=0.01)
+    cache.resolve(HOST, PORT)
+    resolver.ip = None
+    time.sleep(0.02)
+
+    assert ips(cache.resolve(HOST, PORT)) == ["10.0.0.1"]
+    wait_for_refresh(cache)
+    assert cache.stats["stale_hits"] == 1
+    assert cache.stats["lookup_errors"] == 1
+    assert ips(cache.resolve(HOST, PORT)) == ["10.0.0.1"]
+
+
+def test_unknown_host_failure_is_raised():
+    cache = DNSCache(Resolver(ip=None), ttl=60)
+    with pytest.raises(socket.gaierror):
+        cache.resolve(HOST, PORT)
+
+
+@pytest.mark.parametrize("ip", ["0.0.0.0", "224.0.0.1", "192.168.1.1"])
+def test_suspicious_answer_rejected(ip):
+    cache = DNSCache(Resolver(ip), ttl=60, allowed_networks="10.0.0.0/8")
+    with pytest.raises(socket.gaierror):
+        cache.resolve(HOST, PORT)
+    assert cache.stats["suspicious_answers"] == 1
+
+
+def test_refresh_outside_allowed_networks_keeps_known_good():
+    resolver = Resolver()
+    cache = DNSCache(resolver, ttl=0.01, allowed_networks="10.0.0.0/8")
+    cache.resolve(HOST, PORT)
+    resolver.ip = "203.0.113.7"
+    time.sleep(0.02)
+
+    cache.resolve(HOST, PORT)
+    wait_for_refresh(cache)
+    assert cache.stats["suspicious_answers"] == 1
+    assert ips(cache.resolve(HOST, PORT)) == ["10.0.0.1"]
+
+
+def test_changed_answer_adopted_after_confirmations():
+    resolver = Resolver()
+    cache = DNSCache(resolver, ttl=60, confirm_changes=dns_cache.DNS_CONFIRM_CHANGES)
+    cache.resolve(HOST, PORT)
+    resolver.ip = "10.0.0.2"
+
+    for _ in range(dns_cache.DNS_CONFIRM_CHANGES - 1):
+        with pytest.raises(socket.gaierror):
+            cache.fetch(HOST, PORT)
+        assert ips(cache.resolve(HOST, PORT)) == ["10.0.0.1"]
+    assert ips(cache.fetch(HOST, PORT)) == ["10.0.0.2"]
+    assert ips(cache.resolve(HOST, PORT)) == ["10.0.0.2"]
+    assert cache.stats["changes_adopted"] == 1
+
+
+def test_random_answers_never_confirmed():
+    resolver = Resolver()
+    cache = DNSCache(resolver, ttl=60, confirm_changes=2)
+    cache.resolve(HOST, PORT)
+
+    for i in range(2, 12):
+        resolver.ip = f"10.0.1.{i}"
+        with pytest.raises(socket.gaierror):
+            cache.fetch(HOST, PORT)
+    assert ips(cache.resolve(HOST, PORT)) == ["10.0.0.1"]
+    assert cache.stats["changes_adopted"] == 0
+
+
+def test_overlapping_answer_adopted_at_once():
+    resolver = Resolver()
+    cache = DNSCache(resolver, ttl=60, confirm_changes=3)
+    cache.resolve(HOST, PORT)
+    both = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (ip, PORT))
+            for ip in ("10.0.0.1", "10.0.0.2")]
+    cache.lookup = lambda host, port: both
+
+    assert ips(cache.fetch(HOST, PORT)) == ["10.0.0.1", "10.0.0.2"]
@@ -0,0 +1,120 @@
+"""
+The Flask and aiohttp frontends answer /api/data with the same shape,
+response cache metadata included
+"""
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import app as frontend
+import async_app
+
+PAYLOAD = {"service": "backend", "data": [1, 2, 3]}
+
+
+class Backend:
+    """Backend client stand-in; `fail` makes calls raise like a dead backend"""
+
+    read_timeout = 5.0
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def _answer(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("backend down")
+        return PAYLOAD
+
+
+class SyncBackend(Backend):
+    def get_json(self, path, **kwargs):
+        return self._answer()
+
+
+class AsyncBackend(Backend):
+    async def get_json(self, path, **kwargs):
+        return self._answer()
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def sync_get(monkeypatch):
+    backend = SyncBackend()
+    monkeypatch.setattr(frontend, "backend", backend)
+    monkeypatch.setattr(frontend, "data_cache", frontend.ResponseCache(ttl=60))
+    client = frontend.app.test_client()
+
+    def get(path, **kwargs):
+        response = client.get(path, **kwargs)
+        return response.status_code, response.get_json()
+    return backend, get
+
+
+@pytest.fixture
+def async_get():
+    backend = AsyncBackend()
+    loop = asyncio.new_event_loop()
+    client = TestClient(TestServer(async_app.create_app(backend)), loop=loop)
+    loop.run_until_complete(client.start_server())
+
+    def get(path, **kwargs):
+        async def fetch():
+            response = await client.get(path, **kwargs)
+            return response.status, await response.json()
+        return loop.run_until_complete(fetch())
+    yield backend, get
+    loop.run_until_complete(client.close())
+    loop.close()
+
+
+@pytest.fixture(params=["flask", "aiohttp"])
+def get(request, sync_get, async_get):
+    return sync_get if request.param == "flask" else async_get
+
+
+def test_same_data_shape(sync_get, async_get):
+    shapes = []
+    for _, get in (sync_get, async_get):
+        status, body = get("/api/data")
+        assert status == 200
+        shapes.append((set(body), set(body["cache"])))
+    assert shapes[0] == shapes[1]
+    assert "cache" in shapes[0][0]
+
+
+def test_data_served_from_cache(get):
+    backend, get = get
+    assert get("/api/data")[1]["cache"]["state"] == "miss"
+    status, body = get("/api/data")
+    assert body["cache"]["state"] == "fresh"
+    assert body["backend_response"] == PAYLOAD
+    assert backend.calls == 1
+
+
+def test_no_cache_header_bypasses(get):
+    backend, get = get
+    get("/api/data")
+    status, body = get("/api/data", headers={"Cache-Control": "no-cache"})
+    assert body["cache"]["state"] == "bypass"
+    assert backend.calls == 2
+
+
+def test_async_cache_serves_stale_on_error():
+    cache = frontend.ResponseCache(ttl=0.01, swr=0, stale_if_error=60)
+    backend = AsyncBackend()
+
+    async def run():
+        await cache.get_async("key", lambda: backend.get_json("/data"))
+        await asyncio.sleep(0.02)
+        backend.fail = True
+        return await cache.get_async("key", lambda: backend.get_json("/data"))
+
+    value, meta = asyncio.run(run())
+    assert value == PAYLOAD
+    assert meta["state"] == "stale-on-error"
+    assert cache.stats["stale_on_error"] == 1
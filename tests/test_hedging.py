@@ -0,0 +1,151 @@
+"""
+Hedged requests: the first successful attempt wins, the loser is
+cancelled, and the token budget keeps hedges to HEDGE_MAX_RATIO of calls
+"""
+import time
+import asyncio
+import threading
+import concurrent.futures
+
+import pytest
+
+import hedging
+
+DELAY = 0.01
+
+
+def warm_policy(**kwargs):
+    """HedgePolicy whose hedge delay is already DELAY"""
+    policy = hedging.HedgePolicy(min_delay=DELAY, **kwargs)
+    for _ in range(policy.latency.min_samples):
+        policy.latency.record(DELAY / 2)
+    assert policy.delay() == DELAY
+    return policy
+
+
+class BusyExecutor:
+    """
+    Executor with one free worker: the first submission runs, later ones
+    wait as if every other worker were busy, until shutdown
+    """
+
+    def __init__(self):
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.running = None
+        self.queued = []
+
+    def submit(self, fn, *args):
+        if self.running is None:
+            self.running = self.pool.submit(fn, *args)
+            return self.running
+        future = concurrent.futures.Future()
+        self.queued.append(future)
+        return future
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+
+def attempts(*plan):
+    """fn whose n-th call sleeps plan[n][0] seconds, then returns or raises plan[n][1]"""
+    calls = iter(plan)
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            delay, outcome = next(calls)
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return fn
+
+
+def test_no_hedge_while_warming_up():
+    policy = hedging.HedgePolicy()
+    assert policy.call(lambda: "only", executor=None) == "only"
+    assert policy.stats["hedges_sent"] == 0
+
+
+def test_fast_hedge_wins_over_slow_primary():
+    policy = warm_policy()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        result = policy.call(attempts((0.5, "primary"), (0.0, "hedge")), executor)
+    assert result == "hedge"
+    assert policy.stats["hedges_sent"] == 1
+    assert policy.stats["hedges_won"] == 1
+
+
+def test_failed_attempt_does_not_win():
+    policy = warm_policy()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        result = policy.call(attempts((0.05, ConnectionError("reset")), (0.2, "hedge")),
+                             executor)
+    assert result == "hedge"
+
+
+def test_error_raised_when_every_attempt_fails():
+    policy = warm_policy()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ConnectionError):
+            policy.call(attempts((0.05, ConnectionError("primary")),
+                                 (0.05, ConnectionError("hedge"))), executor)
+
+
+def test_queued_loser_is_cancelled():
+    policy = warm_policy()
+    executor = BusyExecutor()
+    try:
+        result = policy.call(attempts((0.1, "primary")), executor)
+    finally:
+        executor.shutdown()
+    assert result == "primary"
+    assert len(executor.queued) == 1
+    assert executor.queued[0].cancelled()
+    assert policy.stats["hedges_won"] == 0
+
+
+def test_async_loser_is_cancelled():
+    policy = warm_policy()
+    outcome = {}
+
+    async def fn():
+        attempt = len(outcome)
+        outcome[attempt] = "started"
+        try:
+            await asyncio.sleep(0.5 if attempt == 0 else 0.0)
+        except asyncio.CancelledError:
+            outcome[attempt] = "cancelled"
+            raise
+        outcome[attempt] = "finished"
+        return attempt
+
+    async def run():
+        result = await policy.call_async(fn)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == 1
+    assert outcome == {0: "cancelled", 1: "finished"}
+    assert policy.stats["hedges_won"] == 1
+
+
+def test_budget_caps_hedges_at_max_ratio():
+    policy = warm_policy()
+    # Spend the initial burst allowance, leaving only what calls earn
+    while policy.budget.try_acquire():
+        pass
+    calls = 200
+
+    async def slow():
+        await asyncio.sleep(DELAY * 2)
+
+    async def run():
+        for _ in range(calls):
+            await policy.call_async(slow)
+
+    asyncio.run(run())
+    earned = calls * hedging.HEDGE_MAX_RATIO
+    assert earned - 1 <= policy.stats["hedges_sent"] <= earned
+    assert policy.stats["hedges_sent"] + policy.stats["budget_denied"] == calls
+    assert policy.snapshot()["hedge_ratio"] <= hedging.HEDGE_MAX_RATIO
@@ -0,0 +1,67 @@
+"""
+Logging: sampled-out requests drop INFO but keep WARNING, only the app's
+loggers become SampledLoggers, and the counters hold up under threads
+"""
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+import logs
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    handler = logs.setup(service="test", stream=stream)
+    yield stream
+    logging.getLogger().removeHandler(handler)
+    handler.close()
+
+
+def in_request(keep, fn):
+    token = logs._request.set(logs.RequestContext("test", "/route", keep))
+    try:
+        fn()
+    finally:
+        logs._request.reset(token)
+
+
+def test_get_logger_is_scoped():
+    assert isinstance(logs.get_logger("test.app"), logs.SampledLogger)
+    assert type(logging.getLogger("test.library")) is logging.Logger
+    assert logging.Logger.manager.loggerClass is None
+
+
+@pytest.mark.parametrize("name, sampled", [("test.sampled", True), ("test.plain", False)])
+def test_sampled_out_request_keeps_only_warnings(stream, name, sampled):
+    logger = logs.get_logger(name) if sampled else logging.getLogger(name)
+    in_request(False, lambda: (logger.info("dropped"), logger.warning("kept")))
+    in_request(True, lambda: logger.info("sampled in"))
+    logs.HANDLER.close()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["msg"] for line in lines] == ["kept", "sampled in"]
+    assert lines[0]["route"] == "/route"
+
+
+def test_counters_are_exact_under_threads(stream):
+    sampler = logs.Sampler("/half=0.5")
+    logger = logs.get_logger("test.threads")
+    per_thread = 2000
+
+    def work():
+        for _ in range(per_thread):
+            sampler.keep("/half")
+            logger.warning("x")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = sampler.snapshot()
+    assert stats["kept"] + stats["sampled_out"] == 8 * per_thread
+    handler = logs.HANDLER.snapshot()
+    assert handler["queued"] + handler["dropped"] == 8 * per_thread
@@ -0,0 +1,104 @@
+"""
+Single-flight coalescing: followers share the leader's result, and each
+gets its own copy of the leader's error
+"""
+import time
+import asyncio
+import threading
+
+from single_flight import SingleFlight, AsyncSingleFlight, CoalescedCallError
+
+FOLLOWERS = 4
+
+
+class UpstreamError(Exception):
+    """Like CircuitOpenError: __init__ takes other arguments than it stores in args"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def run_flight(outcome):
+    """
+    Leader runs until every follower is waiting, then returns or raises
+    `outcome`. Returns the leader's and the followers' (result, error) pairs.
+    """
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    results = [None] * (FOLLOWERS + 1)
+
+    def caller(i):
+        try:
+            results[i] = (flight.do("key", fn), None)
+        except BaseException as e:
+            results[i] = (None, e)
+
+    threads = [threading.Thread(target=caller, args=(0,))]
+    threads[0].start()
+    while not flight._calls:
+        time.sleep(0.001)
+    threads += [threading.Thread(target=caller, args=(i,)) for i in range(1, FOLLOWERS + 1)]
+    for t in threads[1:]:
+        t.start()
+    while flight.stats["coalesced"] < FOLLOWERS:
+        time.sleep(0.001)
+    time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert flight.stats["upstream"] == 1
+    return results[0], results[1:]
+
+
+def test_followers_share_result():
+    leader, followers = run_flight({"ok": True})
+    assert leader == ({"ok": True}, None)
+    assert all(result == ({"ok": True}, None) for result in followers)
+
+
+def test_followers_get_own_copy_of_error():
+    error = UpstreamError("backend", 2.5)
+    leader, followers = run_flight(error)
+    assert leader[1] is error
+    copies = [e for _, e in followers]
+    assert len({id(e) for e in copies}) == FOLLOWERS
+    for e in copies:
+        assert type(e) is UpstreamError and e is not error
+        assert e.retry_after == 2.5 and str(e) == str(error)
+        assert e.__cause__ is error
+
+
+def test_interrupted_leader_fails_followers():
+    interrupt = KeyboardInterrupt()
+    leader, followers = run_flight(interrupt)
+    assert leader[1] is interrupt
+    assert all(isinstance(e, CoalescedCallError) for _, e in followers)
+    assert all(result is None for result, _ in followers)
+
+
+def test_async_waiters_get_own_copy_of_error():
+    flight = AsyncSingleFlight()
+    error = ConnectionError("reset")
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise error
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(3)),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert flight.stats["upstream"] == 1
+    assert len({id(e) for e in errors}) == 3
+    assert all(type(e) is ConnectionError and e.__cause__ is error for e in errors)
+